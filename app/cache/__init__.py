@@ -0,0 +1 @@
+# Caching package
\ No newline at end of file
@@ -0,0 +1,138 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis is only needed when a shared L2 cache is configured
+    aioredis = None
+
+
+class SharedCacheBackend(ABC):
+    """Minimal Redis-protocol surface used by the shared (L2) cache tier"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """Get a raw value"""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl_seconds: Optional[int] = None):
+        """Store a raw value with an optional expiry"""
+
+    @abstractmethod
+    async def delete(self, *keys: str):
+        """Delete keys"""
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        """Atomically increment a counter and return the new value"""
+
+    @abstractmethod
+    async def publish(self, channel: str, message: str):
+        """Publish a message to every subscriber of a channel"""
+
+    @abstractmethod
+    def subscribe(self, channel: str) -> AsyncIterator[str]:
+        """Iterate over messages published to a channel"""
+
+    async def close(self):
+        """Release connections"""
+
+
+class RedisCacheBackend(SharedCacheBackend):
+    """Shared cache tier on any Redis-protocol server"""
+
+    def __init__(self, url: str):
+        if aioredis is None:
+            raise RuntimeError("The redis package is required for a shared cache (pip install redis)")
+        self.client = aioredis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: Optional[int] = None):
+        await self.client.set(key, value, ex=ttl_seconds or None)
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*keys)
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(key)
+
+    async def publish(self, channel: str, message: str):
+        await self.client.publish(channel, message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[str]:
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                data = message["data"]
+                yield data.decode("utf-8") if isinstance(data, bytes) else data
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.close()
+
+    async def close(self):
+        await self.client.close()
+
+
+class InProcessCacheBackend(SharedCacheBackend):
+    """
+    Redis stand-in that lives in this process. Share one instance between several caches
+    to simulate workers; set available=False to simulate an outage.
+    """
+
+    def __init__(self):
+        self.available = True
+        self._values: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def _check_available(self):
+        if not self.available:
+            raise ConnectionError("Shared cache backend unavailable")
+
+    async def get(self, key: str) -> Optional[bytes]:
+        self._check_available()
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl_seconds: Optional[int] = None):
+        self._check_available()
+        self._values[key] = (value, time.monotonic() + ttl_seconds if ttl_seconds else None)
+
+    async def delete(self, *keys: str):
+        self._check_available()
+        for key in keys:
+            self._values.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        self._check_available()
+        value = int((await self.get(key)) or 0) + 1
+        self._values[key] = (str(value).encode(), None)
+        return value
+
+    async def publish(self, channel: str, message: str):
+        self._check_available()
+        for queue in self._subscribers.get(channel, ()):
+            queue.put_nowait(message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[str]:
+        self._check_available()
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers[channel].discard(queue)
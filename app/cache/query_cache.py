@@ -0,0 +1,138 @@
+import hashlib
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+from bson import ObjectId
+from .tiered import TieredCache, shared_cache
+from ..config.settings import settings
+
+# Set by routes that opt in to query caching
+_query_cache_enabled: ContextVar[bool] = ContextVar("query_cache_enabled", default=False)
+
+
+def _normalize(value: Any) -> Hashable:
+    # Canonical, hashable form of a filter/sort/projection; dict key order does not matter
+    if isinstance(value, dict):
+        return ("d", tuple(sorted((str(key), _normalize(item)) for key, item in value.items())))
+    if isinstance(value, (list, tuple)):
+        return ("l", tuple(_normalize(item) for item in value))
+    if isinstance(value, ObjectId):
+        return ("oid", str(value))
+    if isinstance(value, datetime):
+        return ("dt", value.isoformat())
+    return (type(value).__name__, value)
+
+
+class QueryCache:
+    """Caches query results per collection; a write bumps the collection's generation in O(1)"""
+
+    def __init__(self, cache: TieredCache):
+        self.cache = cache
+
+    async def make_key(
+        self,
+        collection_name: str,
+        filters: Optional[Dict[str, Any]] = None,
+        sort: Any = None,
+        projection: Optional[Dict[str, Any]] = None,
+        skip: int = 0,
+        limit: int = 0
+    ) -> str:
+        """Build a normalized key that embeds the collection's current generation"""
+        shape = (_normalize(filters or {}), _normalize(sort), _normalize(projection), skip, limit)
+        digest = hashlib.sha1(repr(shape).encode("utf-8")).hexdigest()
+        generation = await self.cache.get_generation(collection_name)
+        return f"query:{collection_name}:{generation}:{digest}"
+
+    async def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Get a cached result list"""
+        documents = await self.cache.get(key)
+        return list(documents) if documents is not None else None
+
+    async def set(self, key: str, documents: List[Dict[str, Any]]):
+        """Cache a result list"""
+        await self.cache.set(key, tuple(documents))
+
+    async def invalidate(self, collection_name: str):
+        """Make every cached result of a collection unreachable"""
+        await self.cache.bump_generation(collection_name)
+
+
+class EntityCache:
+    """
+    Read-through cache of single documents by ID. Invalidations of a key while it is being read
+    are counted, so a read that fetched the document before a write does not cache the old version.
+    """
+
+    def __init__(self, cache: TieredCache):
+        self.cache = cache
+        # Only keys with reads in flight are tracked: key -> [readers, invalidations]
+        self._reads: Dict[str, List[int]] = {}
+        cache.add_invalidation_listener(self._on_invalidation)
+
+    def make_key(self, collection_name: str, document_id: str) -> str:
+        return f"document:{collection_name}:{ObjectId(document_id)}"
+
+    async def get(self, collection_name: str, document_id: str) -> Optional[Dict[str, Any]]:
+        """Get a cached document"""
+        if not settings.entity_cache_enabled:
+            return None
+        return await self.cache.get(self.make_key(collection_name, document_id))
+
+    async def load(
+        self,
+        collection_name: str,
+        document_id: str,
+        fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[Dict[str, Any]]:
+        """Fetch a document that was not cached, and cache it unless it was invalidated meanwhile"""
+        if not settings.entity_cache_enabled:
+            return await fetch()
+        
+        key = self.make_key(collection_name, document_id)
+        reads = self._reads.setdefault(key, [0, 0])
+        reads[0] += 1
+        invalidations = reads[1]
+        try:
+            document = await fetch()
+        finally:
+            reads[0] -= 1
+            if reads[0] == 0:
+                del self._reads[key]
+        
+        if document is not None and reads[1] == invalidations:
+            await self.cache.set(key, document)
+        return document
+
+    async def invalidate(self, collection_name: str, document_id: str):
+        """Drop a document from every worker's cache"""
+        if settings.entity_cache_enabled:
+            key = self.make_key(collection_name, document_id)
+            # Before the first await, so a read finishing meanwhile sees it
+            self._on_invalidation([key])
+            await self.cache.invalidate(key)
+
+    def _on_invalidation(self, keys: List[str]):
+        for key in keys:
+            reads = self._reads.get(key)
+            if reads is not None:
+                reads[1] += 1
+
+
+def enable_query_cache():
+    """Opt the current request in to query result caching"""
+    _query_cache_enabled.set(True)
+
+
+def query_cache_enabled() -> bool:
+    """Check if the current request opted in to query result caching"""
+    return settings.query_cache_enabled and _query_cache_enabled.get()
+
+
+async def use_query_cache():
+    """Route dependency that opts the request in to query result caching"""
+    enable_query_cache()
+
+
+query_cache = QueryCache(shared_cache)
+entity_cache = EntityCache(shared_cache)
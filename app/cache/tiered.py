@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import bson
+from .backends import SharedCacheBackend, RedisCacheBackend
+from .lru import LRUCache
+from ..config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+GenerationListener = Callable[[str, int], Any]
+InvalidationListener = Callable[[List[str]], Any]
+
+
+class TieredCache:
+    """
+    In-process L1 LRU in front of an optional shared L2 (Redis protocol). Invalidations and
+    generation bumps are broadcast over pub/sub so every worker drops stale L1 entries.
+    When L2 is unreachable the cache degrades to L1 only and retries after retry_seconds.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: Optional[int] = None,
+        channel: str = "cache-invalidation",
+        retry_seconds: float = 5.0
+    ):
+        self.l1 = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.l2: Optional[SharedCacheBackend] = None
+        self.ttl_seconds = ttl_seconds
+        self.channel = channel
+        self.retry_seconds = retry_seconds
+        self.origin = uuid.uuid4().hex
+        self._l2_down_until = 0.0
+        self._generations: Dict[str, int] = {}
+        self._generation_listeners: List[GenerationListener] = []
+        self._invalidation_listeners: List[InvalidationListener] = []
+        self._subscriber_task: Optional[asyncio.Task] = None
+
+    @property
+    def l2_available(self) -> bool:
+        return self.l2 is not None and time.monotonic() >= self._l2_down_until
+
+    async def start(self, backend: Optional[SharedCacheBackend] = None):
+        """Attach a shared backend and start listening for invalidations from other workers"""
+        self.l2 = backend
+        if backend is not None:
+            self._subscriber_task = asyncio.create_task(self._listen())
+
+    async def close(self):
+        """Stop listening and release the shared backend"""
+        if self._subscriber_task is not None:
+            self._subscriber_task.cancel()
+            try:
+                await self._subscriber_task
+            except asyncio.CancelledError:
+                pass
+            self._subscriber_task = None
+        if self.l2 is not None:
+            await self.l2.close()
+            self.l2 = None
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Get a value from L1, falling back to L2 and filling L1 on an L2 hit"""
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+
+        raw = await self._call_l2(lambda l2: l2.get(key))
+        if raw is None:
+            return None
+        value = bson.decode(raw)["v"]
+        self.l1.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any):
+        """Store a value in both tiers"""
+        self.l1.set(key, value)
+        await self._call_l2(lambda l2: l2.set(key, bson.encode({"v": value}), self.ttl_seconds))
+
+    async def invalidate(self, *keys: str):
+        """Drop keys from both tiers and tell other workers to drop them from their L1"""
+        for key in keys:
+            self.l1.delete(key)
+        await self._call_l2(lambda l2: l2.delete(*keys))
+        await self._publish({"type": "keys", "keys": list(keys)})
+
+    async def get_generation(self, name: str) -> int:
+        """Current generation counter of a namespace (e.g. a collection)"""
+        if name not in self._generations:
+            raw = await self._call_l2(lambda l2: l2.get(f"generation:{name}"))
+            self._generations[name] = max(self._generations.get(name, 0), int(raw or 0))
+        return self._generations[name]
+
+    async def bump_generation(self, name: str) -> int:
+        """Advance a namespace's generation so every key built from the old one is unreachable"""
+        generation = await self._call_l2(lambda l2: l2.incr(f"generation:{name}"))
+        if generation is None:
+            generation = self._generations.get(name, 0) + 1
+        self._generations[name] = max(self._generations.get(name, 0), generation)
+        await self._publish({"type": "generation", "name": name, "value": self._generations[name]})
+        return self._generations[name]
+
+    def add_generation_listener(self, listener: GenerationListener):
+        """Call listener(name, generation) when another worker bumps a generation"""
+        self._generation_listeners.append(listener)
+
+    def add_invalidation_listener(self, listener: InvalidationListener):
+        """Call listener(keys) when another worker invalidates keys"""
+        self._invalidation_listeners.append(listener)
+
+    async def _call_l2(self, operation: Callable[[SharedCacheBackend], Awaitable[Any]]) -> Any:
+        if not self.l2_available:
+            return None
+        try:
+            return await operation(self.l2)
+        except Exception as e:
+            self._mark_l2_down(e)
+            return None
+
+    def _mark_l2_down(self, error: Exception):
+        if time.monotonic() >= self._l2_down_until:
+            logger.warning("Shared cache unavailable, using in-process cache only: %s", error)
+        self._l2_down_until = time.monotonic() + self.retry_seconds
+
+    async def _publish(self, message: Dict[str, Any]):
+        message["origin"] = self.origin
+        await self._call_l2(lambda l2: l2.publish(self.channel, json.dumps(message)))
+
+    async def _listen(self):
+        while True:
+            try:
+                async for raw in self.l2.subscribe(self.channel):
+                    self._handle_message(json.loads(raw))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._mark_l2_down(e)
+
+            # Invalidations may have been missed while disconnected
+            await asyncio.sleep(self.retry_seconds)
+            self.l1.clear()
+            self._generations.clear()
+
+    def _handle_message(self, message: Dict[str, Any]):
+        if message.get("type") == "keys":
+            keys = message.get("keys", [])
+            for key in keys:
+                self.l1.delete(key)
+            if message.get("origin") != self.origin:
+                for listener in self._invalidation_listeners:
+                    listener(keys)
+        elif message.get("type") == "generation":
+            name, generation = message["name"], message["value"]
+            self._generations[name] = max(self._generations.get(name, 0), generation)
+            if message.get("origin") != self.origin:
+                for listener in self._generation_listeners:
+                    listener(name, generation)
+
+
+def create_shared_backend() -> Optional[SharedCacheBackend]:
+    """Build the configured shared backend, or None for an in-process cache only"""
+    if not settings.cache_redis_url:
+        return None
+    return RedisCacheBackend(settings.cache_redis_url)
+
+
+shared_cache = TieredCache(
+    max_entries=settings.cache_max_entries,
+    ttl_seconds=settings.cache_ttl_seconds
+)
@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from fastapi import HTTPException
+from .config.database import connect_to_mongo, close_mongo_connection, get_database
+from .config.settings import settings
+from .models.bulk import ImportResult
+from .repositories.brand_repository import BrandRepository
+from .repositories.product_repository import ProductRepository
+from .repositories.user_repository import UserRepository
+from .services.brand_service import BrandService
+from .services.product_service import ProductService
+from .services.user_service import UserService
+from .utils.bulk_io import detect_format, iter_file, iter_records
+from .utils.security import shutdown_password_hashing
+
+FORMAT_EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+def format_for_path(path: str, requested: str = None) -> str:
+    """Import/export format from an explicit choice or the file extension"""
+    if requested:
+        return detect_format(requested, None)
+    extension = os.path.splitext(path.removesuffix(".gz"))[1].lower()
+    if extension not in FORMAT_EXTENSIONS:
+        raise SystemExit(f"Cannot tell the format of {path}; pass --format csv or --format ndjson")
+    return FORMAT_EXTENSIONS[extension]
+
+
+def print_progress(result: ImportResult):
+    print(
+        f"processed={result.processed} inserted={result.inserted} updated={result.updated} failed={result.failed}",
+        file=sys.stderr
+    )
+
+
+async def import_products(args):
+    database = await get_database()
+    product_service = ProductService(ProductRepository(database), BrandRepository(database))
+    records = iter_records(iter_file(args.path), format_for_path(args.path, args.format))
+    result = await product_service.import_products(
+        records,
+        upsert=args.upsert,
+        chunk_size=args.chunk_size,
+        max_errors=settings.import_max_errors,
+        progress=print_progress
+    )
+    print(json.dumps(result.model_dump(), indent=2))
+
+
+async def import_users(args):
+    database = await get_database()
+    user_service = UserService(UserRepository(database))
+    records = iter_records(iter_file(args.path), format_for_path(args.path, args.format))
+    try:
+        result = await user_service.import_users(
+            records,
+            chunk_size=args.chunk_size,
+            max_errors=settings.import_max_errors,
+            progress=print_progress
+        )
+    finally:
+        shutdown_password_hashing()
+    print(json.dumps(result.model_dump(), indent=2))
+
+
+async def export_collection(args):
+    database = await get_database()
+    if args.collection == "products":
+        service = ProductService(ProductRepository(database))
+        export = service.export_products
+    elif args.collection == "brands":
+        service = BrandService(BrandRepository(database))
+        export = service.export_brands
+    else:
+        service = UserService(UserRepository(database))
+        export = service.export_users
+    
+    to_stdout = args.path == "-"
+    export_format = args.format or ("ndjson" if to_stdout else format_for_path(args.path))
+    compress = args.gzip or (not to_stdout and args.path.endswith(".gz"))
+    body = export(
+        export_format,
+        fields=args.fields,
+        active_only=args.active_only,
+        compress=compress,
+        batch_size=args.batch_size
+    )
+    
+    output = sys.stdout.buffer if to_stdout else open(args.path, "wb")
+    try:
+        async for chunk in body:
+            output.write(chunk)
+    finally:
+        if to_stdout:
+            output.flush()
+        else:
+            output.close()
+
+
+async def refresh_low_stock(args):
+    database = await get_database()
+    updated = await ProductRepository(database).refresh_low_stock_flags()
+    print(json.dumps({"threshold": settings.low_stock_threshold, "updated": updated}, indent=2))
+
+
+async def run(args):
+    await connect_to_mongo()
+    try:
+        await args.handler(args)
+    except HTTPException as e:
+        raise SystemExit(f"Error: {e.detail}")
+    finally:
+        await close_mongo_connection()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Bulk data tools for the API database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import-products", help="Import products from a CSV or NDJSON file")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension")
+    import_parser.add_argument("--upsert", action="store_true", help="Update products with the same name instead of rejecting them")
+    import_parser.add_argument("--chunk-size", type=int, default=settings.import_chunk_size)
+    import_parser.set_defaults(handler=import_products)
+
+    users_parser = subparsers.add_parser("import-users", help="Create users from a CSV or NDJSON file of username, email and password")
+    users_parser.add_argument("path")
+    users_parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension")
+    users_parser.add_argument("--chunk-size", type=int, default=settings.import_chunk_size)
+    users_parser.set_defaults(handler=import_users)
+
+    export_parser = subparsers.add_parser("export", help="Export a collection to a CSV or NDJSON file")
+    export_parser.add_argument("collection", choices=["products", "brands", "users"])
+    export_parser.add_argument("path", help="Output file, or - for standard output")
+    export_parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension")
+    export_parser.add_argument("--gzip", action="store_true", help="Gzip the output; implied by a .gz file name")
+    export_parser.add_argument("--fields", help="Comma-separated fields to export; defaults to all")
+    export_parser.add_argument("--active-only", action="store_true")
+    export_parser.add_argument("--batch-size", type=int, default=settings.export_batch_size)
+    export_parser.set_defaults(handler=export_collection)
+
+    low_stock_parser = subparsers.add_parser(
+        "refresh-low-stock",
+        help="Recompute every product's low-stock flag; run after changing LOW_STOCK_THRESHOLD or upgrading"
+    )
+    low_stock_parser.set_defaults(handler=refresh_low_stock)
+
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,12 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from .settings import settings
+from ..repositories.product_repository import ProductRepository
+from ..repositories.brand_repository import BrandRepository
+from ..repositories.user_repository import UserRepository
+from ..repositories.memory import InMemoryDatabase
+from ..monitoring.pool import pool_monitor
+from ..monitoring.request_context import database_timer
+from ..monitoring.slow_queries import slow_query_recorder
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,16 +26,38 @@ async def get_database():
 
 async def connect_to_mongo():
     """Create database connection"""
+    if settings.database_backend == "memory":
+        db.client = None
+        db.database = InMemoryDatabase(settings.database_name)
+        logger.info("Using the in-memory database backend")
+        return
+    
     try:
-        db.client = AsyncIOMotorClient(settings.mongodb_url)
+        db.client = AsyncIOMotorClient(
+            settings.mongodb_url,
+            maxPoolSize=settings.mongodb_max_pool_size,
+            event_listeners=[pool_monitor, database_timer, slow_query_recorder]
+        )
         db.database = db.client[settings.database_name]
         
         # Test the connection
         await db.client.admin.command('ping')
-        logger.info(f"Connected to MongoDB at {settings.mongodb_url}")
+        logger.info("Connected to MongoDB at %s", settings.mongodb_url)
         
     except Exception as e:
-        logger.error(f"Could not connect to MongoDB: {e}")
+        logger.error("Could not connect to MongoDB: %s", e)
+        raise
+
+
+async def ensure_indexes():
+    """Create the indexes the repositories rely on"""
+    try:
+        await ProductRepository(db.database).ensure_indexes()
+        await BrandRepository(db.database).ensure_indexes()
+        await UserRepository(db.database).ensure_indexes()
+        logger.info("Database indexes ensured")
+    except Exception as e:
+        logger.error("Could not create database indexes: %s", e)
         raise
 
 
@@ -39,7 +68,7 @@ async def close_mongo_connection():
             db.client.close()
             logger.info("Disconnected from MongoDB")
     except Exception as e:
-        logger.error(f"Error closing MongoDB connection: {e}")
+        logger.error("Error closing MongoDB connection: %s", e)
 
 
 async def get_collection(collection_name: str):
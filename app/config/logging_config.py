@@ -0,0 +1,141 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+from ..monitoring.request_context import current_request
+
+# Attributes every LogRecord has; anything else was passed through extra= and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the request ID and route of the request that logged them"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        stats = current_request()
+        if stats is not None:
+            if not hasattr(record, "request_id"):
+                record.request_id = stats.request_id
+            if not hasattr(record, "route") and stats.route:
+                record.route = stats.route
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most max_per_second records per logger and message template, so an error
+    storm logs a bounded number of lines. The next record let through carries the count it replaced.
+    The access log is exempt; it is sampled where it is written.
+    """
+
+    def __init__(self, max_per_second: int, exempt_loggers=("app.access",)):
+        super().__init__()
+        self.max_per_second = max_per_second
+        self.exempt_loggers = set(exempt_loggers)
+        self._windows: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.max_per_second or record.name in self.exempt_loggers:
+            return True
+        key = (record.name, str(record.msg))
+        second = int(time.monotonic())
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or window[0] != second:
+                suppressed = window[2] if window is not None else 0
+                if len(self._windows) > 10000:
+                    self._windows.clear()
+                window = self._windows[key] = [second, 0, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+            if window[1] >= self.max_per_second:
+                window[2] += 1
+                return False
+            window[1] += 1
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the standard fields plus any extra= fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class StructuredQueueHandler(QueueHandler):
+    """QueueHandler that keeps extra fields and the traceback separate instead of folding them into the message"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        # Formatting happens here, on the caller's thread, so mutable arguments are captured as they were
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(level: str = "INFO", log_format: str = "json", max_per_second: int = 0) -> QueueListener:
+    """
+    Route every log record through a queue to a listener thread that does the formatting
+    and writing, so request handlers never block on log I/O.
+    """
+    global _listener
+    stop_logging()
+
+    output = logging.StreamHandler(sys.stderr)
+    if log_format == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s", defaults={"request_id": "-"}))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = StructuredQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(RateLimitFilter(max_per_second))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        if isinstance(existing, StructuredQueueHandler):
+            root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Write out queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -1,11 +1,13 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
     # Database Configuration
     mongodb_url: str = "mongodb://localhost:27017"
     database_name: str = "python_web_api"
+    mongodb_max_pool_size: int = 100
+    database_backend: str = "mongodb"
     
     # JWT Configuration
     secret_key: str = "your-secret-key-here-change-in-production"
@@ -17,6 +19,96 @@ class Settings(BaseSettings):
     api_v1_str: str = "/api/v1"
     project_name: str = "Python Web API with MongoDB"
     
+    # Inventory Configuration
+    low_stock_threshold: int = 10
+    
+    # Cache Configuration
+    query_cache_enabled: bool = True
+    entity_cache_enabled: bool = True
+    cache_max_entries: int = 1000
+    cache_ttl_seconds: int = 30
+    cache_redis_url: Optional[str] = None
+    
+    # Brand Catalog Configuration
+    brand_catalog_enabled: bool = True
+    brand_catalog_refresh_seconds: int = 30
+    
+    # Autocomplete Configuration
+    autocomplete_index_enabled: bool = True
+    autocomplete_index_max_names: int = 50000
+    autocomplete_index_refresh_seconds: int = 60
+    
+    # Fuzzy Search Configuration
+    fuzzy_index_enabled: bool = True
+    fuzzy_index_max_names: int = 1000000
+    fuzzy_min_similarity: float = 0.3
+    fuzzy_max_postings: int = 100000
+    
+    # Delta Sync Configuration
+    sync_tombstone_retention_days: int = 30
+    sync_settle_seconds: int = 2
+    
+    # Deadline Configuration
+    request_deadline_seconds: float = 10.0
+    search_deadline_seconds: float = 2.0
+    
+    # Bulk Import/Export Configuration
+    import_chunk_size: int = 1000
+    import_max_chunk_size: int = 10000
+    import_max_errors: int = 1000
+    export_batch_size: int = 1000
+    export_max_batch_size: int = 10000
+    password_hash_workers: int = 0
+    bulk_deadline_seconds: float = 3600.0
+    
+    # Admission Control Configuration
+    admission_control_enabled: bool = True
+    admission_auth_concurrency: int = 20
+    admission_read_concurrency: int = 100
+    admission_write_concurrency: int = 50
+    admission_queue_size: int = 200
+    admission_queue_timeout_seconds: float = 2.0
+    admission_max_pool_wait_ms: int = 250
+    admission_max_loop_lag_ms: int = 250
+    admission_retry_after_seconds: int = 1
+    
+    # Logging Configuration
+    log_level: str = "INFO"
+    log_format: str = "json"
+    log_access_sample_rate: float = 1.0
+    log_slow_request_ms: int = 1000
+    log_rate_limit_per_second: int = 100
+    
+    # Slow Query Configuration
+    slow_query_log_enabled: bool = False
+    slow_query_threshold_ms: int = 100
+    slow_query_sink: str = "mongodb"
+    slow_query_collection: str = "slow_queries"
+    slow_query_collection_size_mb: int = 16
+    slow_query_file_path: str = "slow_queries.jsonl"
+    slow_query_max_records: int = 10000
+    slow_query_explain_interval_seconds: int = 300
+    slow_query_admin_token: Optional[str] = None
+    
+    # Event Loop Monitoring Configuration
+    loop_block_detection_enabled: bool = False
+    loop_block_threshold_ms: int = 100
+    
+    # Profiling Configuration
+    profiler_enabled: bool = False
+    profiler_token: Optional[str] = None
+    profiler_sample_rate: float = 0.0
+    profiler_max_per_minute: int = 6
+    profiler_max_artifacts: int = 200
+    profiler_output_dir: str = "profiles"
+    profiler_backend: str = "auto"
+    
+    # Tracing Configuration
+    tracing_enabled: bool = False
+    tracing_sample_rate: float = 1.0
+    tracing_exporter: str = "console"
+    tracing_file_path: str = "traces.jsonl"
+    
     # CORS Configuration
     backend_cors_origins: List[str] = ["http://localhost:3000", "http://localhost:8080"]
     
@@ -1,13 +1,33 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import logging
+from pymongo.errors import ExecutionTimeout
 from .config.settings import settings
-from .config.database import connect_to_mongo, close_mongo_connection
+from .config.logging_config import setup_logging
+from .config.database import connect_to_mongo, close_mongo_connection, ensure_indexes, get_database
+from .repositories.brand_repository import BrandRepository
+from .services.brand_catalog import brand_catalog
+from .services.name_index import product_names, brand_names
+from .repositories.product_repository import ProductRepository
+from .cache.tiered import shared_cache, create_shared_backend
+from .middleware.dataloader_middleware import DataLoaderMiddleware
+from .middleware.admission_middleware import AdmissionControlMiddleware, AdmissionGroup
+from .middleware.profiler_middleware import ProfilerMiddleware
+from .middleware.tracing_middleware import TracingMiddleware
+from .middleware.request_logging_middleware import RequestLoggingMiddleware
+from .monitoring.loop_lag import loop_lag_monitor
+from .monitoring.metrics import render_metrics
+from .monitoring.tracing import OTLPJsonExporter, tracer
+from .monitoring.slow_queries import create_slow_query_sink, slow_query_recorder
+from .monitoring.overload import overload_reason
+from .utils.deadline import DeadlineExceeded, request_deadline
+from .utils.dependencies import admin_token_required
+from .utils.security import shutdown_password_hashing
 from .routes import auth, users, products, brands
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging; records are written by a listener thread, never on the event loop
+setup_logging(settings.log_level, settings.log_format, settings.log_rate_limit_per_second)
 logger = logging.getLogger(__name__)
 
 # Create FastAPI application
@@ -16,9 +36,46 @@ app = FastAPI(
     description="A Python Web API with MongoDB, JWT Authentication, and CRUD operations for Users and Products",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # Default deadline for every request; routes may set a tighter one
+    dependencies=[Depends(request_deadline(settings.request_deadline_seconds))]
 )
 
+# Opt-in request profiling; added first so shed requests are never profiled
+if settings.profiler_enabled:
+    app.add_middleware(
+        ProfilerMiddleware,
+        output_dir=settings.profiler_output_dir,
+        token=settings.profiler_token,
+        sample_rate=settings.profiler_sample_rate,
+        max_per_minute=settings.profiler_max_per_minute,
+        max_artifacts=settings.profiler_max_artifacts,
+        backend=settings.profiler_backend
+    )
+
+# Shed load before requests pile up waiting for a database connection.
+# Added before CORS so that 503 responses still carry CORS headers.
+if settings.admission_control_enabled:
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        groups={
+            name: AdmissionGroup(
+                name,
+                max_concurrency,
+                settings.admission_queue_size,
+                settings.admission_queue_timeout_seconds
+            )
+            for name, max_concurrency in (
+                ("auth", settings.admission_auth_concurrency),
+                ("reads", settings.admission_read_concurrency),
+                ("writes", settings.admission_write_concurrency),
+            )
+        },
+        auth_prefix=f"{settings.api_v1_str}/auth",
+        overload_check=overload_reason,
+        retry_after_seconds=settings.admission_retry_after_seconds
+    )
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -28,6 +85,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Batch repository lookups made within the same request
+app.add_middleware(DataLoaderMiddleware)
+
+# Request IDs, DB time and the access log; outside admission control so shed requests are logged too
+app.add_middleware(
+    RequestLoggingMiddleware,
+    sample_rate=settings.log_access_sample_rate,
+    slow_request_ms=settings.log_slow_request_ms
+)
+
+# Outermost, so the root span covers admission control and every other middleware
+if settings.tracing_enabled:
+    app.add_middleware(TracingMiddleware)
+
 
 # Global exception handlers
 @app.exception_handler(HTTPException)
@@ -43,10 +114,25 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     )
 
 
+@app.exception_handler(DeadlineExceeded)
+@app.exception_handler(ExecutionTimeout)
+async def deadline_exception_handler(request: Request, exc: Exception):
+    """Handle database operations cut off by the request deadline"""
+    logger.warning("Request deadline exceeded for %s %s: %s", request.method, request.url.path, exc)
+    return JSONResponse(
+        status_code=504,
+        content={
+            "error": "Gateway Timeout",
+            "message": "The request took too long and was cancelled, try narrowing it down",
+            "status_code": 504
+        }
+    )
+
+
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """Handle general exceptions"""
-    logger.error(f"Unhandled exception: {exc}")
+    logger.error("Unhandled exception: %s", exc, exc_info=exc)
     return JSONResponse(
         status_code=500,
         content={
@@ -62,10 +148,41 @@ async def general_exception_handler(request: Request, exc: Exception):
 async def startup_event():
     """Initialize database connection on startup"""
     try:
+        if settings.tracing_enabled:
+            tracer.configure(
+                OTLPJsonExporter(
+                    settings.project_name,
+                    settings.tracing_file_path if settings.tracing_exporter == "file" else None
+                ),
+                settings.tracing_sample_rate
+            )
         await connect_to_mongo()
+        await ensure_indexes()
+        if settings.slow_query_log_enabled:
+            database = await get_database()
+            await slow_query_recorder.start(
+                create_slow_query_sink(database),
+                database,
+                settings.slow_query_threshold_ms,
+                settings.slow_query_explain_interval_seconds
+            )
+        await shared_cache.start(create_shared_backend())
+        loop_lag_monitor.start(settings.loop_block_threshold_ms if settings.loop_block_detection_enabled else 0)
+        if settings.brand_catalog_enabled:
+            database = await get_database()
+            await brand_catalog.start(BrandRepository(database), settings.brand_catalog_refresh_seconds)
+        if settings.autocomplete_index_enabled or settings.fuzzy_index_enabled:
+            database = await get_database()
+            for names, repository in ((product_names, ProductRepository(database)), (brand_names, BrandRepository(database))):
+                await names.start(
+                    repository,
+                    settings.autocomplete_index_max_names if settings.autocomplete_index_enabled else 0,
+                    settings.fuzzy_index_max_names if settings.fuzzy_index_enabled else 0,
+                    settings.autocomplete_index_refresh_seconds
+                )
         logger.info("Application startup completed")
     except Exception as e:
-        logger.error(f"Failed to start application: {e}")
+        logger.error("Failed to start application: %s", e)
         raise
 
 
@@ -73,10 +190,18 @@ async def startup_event():
 async def shutdown_event():
     """Close database connection on shutdown"""
     try:
+        await brand_catalog.stop()
+        await product_names.stop()
+        await brand_names.stop()
+        await loop_lag_monitor.stop()
+        await shared_cache.close()
+        shutdown_password_hashing()
+        tracer.shutdown()
+        await slow_query_recorder.stop()
         await close_mongo_connection()
         logger.info("Application shutdown completed")
     except Exception as e:
-        logger.error(f"Error during shutdown: {e}")
+        logger.error("Error during shutdown: %s", e)
 
 
 # Health check endpoint
@@ -90,6 +215,24 @@ async def health_check():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: event loop lag histogram, blocked loop count and MongoDB pool waits"""
+    return render_metrics()
+
+
+@app.get("/admin/slow-queries", dependencies=[Depends(admin_token_required("slow_query_admin_token"))])
+async def slow_queries(limit: int = Query(20, ge=1, le=200, description="Number of query shapes to list")):
+    """Query shapes that spent the most time above the slow query threshold, with their latest explain"""
+    return {
+        "enabled": slow_query_recorder.enabled,
+        "threshold_ms": slow_query_recorder.threshold_ms,
+        "recorded": slow_query_recorder.recorded,
+        "dropped": slow_query_recorder.dropped,
+        "shapes": await slow_query_recorder.top(limit)
+    }
+
+
 # Include routers
 app.include_router(
     auth.router,
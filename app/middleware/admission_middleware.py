@@ -0,0 +1,133 @@
+import asyncio
+import json
+import logging
+from typing import Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+EXEMPT_PATHS = ("/", "/health", "/metrics", "/docs", "/redoc", "/openapi.json")
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class AdmissionGroup:
+    """Concurrency limit with a bounded wait queue for one group of routes"""
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout_seconds: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+        self._waiters: Dict[asyncio.Future, None] = {}
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if needed; False if the request should be shed"""
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[waiter] = None
+        self.queued = len(self._waiters)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout_seconds)
+            return True
+        except asyncio.TimeoutError:
+            # The slot may have been handed over just as the wait timed out
+            return waiter.done() and not waiter.cancelled()
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            self._waiters.pop(waiter, None)
+            self.queued = len(self._waiters)
+            waiter.cancel()
+
+    def release(self):
+        """Hand the slot to the oldest waiter, or free it"""
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class AdmissionControlMiddleware:
+    """
+    Limits concurrent requests per route group (auth, reads, writes) and sheds load with
+    503 + Retry-After when a group's queue is full or the database pool / event loop is saturated.
+    """
+
+    def __init__(
+        self,
+        app,
+        groups: Dict[str, AdmissionGroup],
+        auth_prefix: str,
+        overload_check: Optional[Callable[[], Optional[str]]] = None,
+        retry_after_seconds: int = 1,
+        exempt_paths: Iterable[str] = EXEMPT_PATHS
+    ):
+        self.app = app
+        self.groups = groups
+        self.auth_prefix = auth_prefix
+        self.overload_check = overload_check
+        self.retry_after_seconds = retry_after_seconds
+        self.exempt_paths = set(exempt_paths)
+
+    def classify(self, method: str, path: str) -> Optional[str]:
+        """Route group of a request, or None if it is exempt"""
+        if path in self.exempt_paths:
+            return None
+        if path.startswith(self.auth_prefix):
+            return "auth"
+        return "reads" if method in READ_METHODS else "writes"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        group_name = self.classify(scope["method"], scope["path"])
+        group = self.groups.get(group_name) if group_name else None
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Check if the database pool or event loop is already saturated
+        reason = self.overload_check() if self.overload_check else None
+        if reason is not None:
+            await self._reject(group, reason, send)
+            return
+
+        if not await group.acquire():
+            await self._reject(group, f"Too many concurrent {group.name} requests", send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            group.release()
+
+    async def _reject(self, group: AdmissionGroup, reason: str, send):
+        group.rejected += 1
+        logger.warning("Shedding %s request: %s", group.name, reason)
+        body = json.dumps({
+            "error": "Service Unavailable",
+            "message": "Server is overloaded, please retry later",
+            "status_code": 503
+        }).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(self.retry_after_seconds).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,16 @@
+from ..utils.dataloader import request_loader_scope
+
+
+class DataLoaderMiddleware:
+    """Gives every HTTP request its own DataLoaders so repository lookups can be batched"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with request_loader_scope():
+            await self.app(scope, receive, send)
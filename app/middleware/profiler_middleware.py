@@ -0,0 +1,151 @@
+import asyncio
+import cProfile
+import hmac
+import logging
+import os
+import pstats
+import random
+import re
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Optional
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:  # pyinstrument is only needed for sampling profiles with an HTML flame view
+    SamplingProfiler = None
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+
+
+class RequestProfile:
+    """One profiler run; pyinstrument samples awaiting coroutines, cProfile traces the loop thread"""
+
+    def __init__(self, backend: str):
+        if backend == "pyinstrument" or (backend == "auto" and SamplingProfiler is not None):
+            if SamplingProfiler is None:
+                raise RuntimeError("The pyinstrument package is required for sampling profiles (pip install pyinstrument)")
+            self.extension = "html"
+            self._profiler = SamplingProfiler(async_mode="enabled")
+        else:
+            self.extension = "pstats"
+            self._profiler = cProfile.Profile()
+
+    def start(self):
+        if self.extension == "html":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self):
+        if self.extension == "html":
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def write(self, path: str):
+        if self.extension == "html":
+            with open(path, "w") as file:
+                file.write(self._profiler.output_html())
+        else:
+            pstats.Stats(self._profiler).dump_stats(path)
+
+
+class ProfilerMiddleware:
+    """
+    Profiles selected requests and writes one artifact per request, named after the route and
+    its duration. A request is profiled when it carries the admin X-Profile token or is picked by
+    the sample rate, at most max_per_minute times a minute and one request at a time.
+    """
+
+    def __init__(
+        self,
+        app,
+        output_dir: str,
+        token: Optional[str] = None,
+        sample_rate: float = 0.0,
+        max_per_minute: int = 6,
+        max_artifacts: int = 200,
+        backend: str = "auto"
+    ):
+        self.app = app
+        self.output_dir = output_dir
+        self.token = token
+        self.sample_rate = sample_rate
+        self.max_per_minute = max_per_minute
+        self.max_artifacts = max_artifacts
+        self.backend = backend
+        self.profiled = 0
+        self.skipped = 0
+        self._active = False
+        self._recent: Deque[float] = deque()
+
+    def requested(self, scope) -> bool:
+        """Whether the request asks to be profiled with a valid admin token, or is sampled"""
+        if self.token:
+            for name, value in scope.get("headers", []):
+                if name == PROFILE_HEADER:
+                    return hmac.compare_digest(value.decode("latin-1"), self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _admit(self) -> bool:
+        # Profiling slows the whole loop down, so only one request runs under it at a time
+        if self._active:
+            return False
+        now = time.monotonic()
+        while self._recent and self._recent[0] < now - 60:
+            self._recent.popleft()
+        if len(self._recent) >= self.max_per_minute:
+            return False
+        self._recent.append(now)
+        return True
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.requested(scope):
+            await self.app(scope, receive, send)
+            return
+        if not self._admit():
+            self.skipped += 1
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(self.backend)
+        self._active = True
+        started = time.perf_counter()
+        profile.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profile.stop()
+            self._active = False
+            duration_ms = (time.perf_counter() - started) * 1000
+            await self._save(profile, scope, duration_ms)
+
+    async def _save(self, profile: RequestProfile, scope, duration_ms: float):
+        # The router has stored the matched endpoint in the scope by now
+        endpoint = scope.get("endpoint")
+        route = getattr(endpoint, "__name__", None) or scope["path"]
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", f"{scope['method']}_{route}").strip("_")
+        timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        path = os.path.join(self.output_dir, f"{timestamp}_{name}_{duration_ms:.0f}ms.{profile.extension}")
+        try:
+            # Rendering and writing the artifact stay off the event loop
+            await asyncio.to_thread(self._write, profile, path)
+            self.profiled += 1
+            logger.info("Profiled %s %s in %.1fms: %s", scope["method"], scope["path"], duration_ms, path)
+        except Exception as e:
+            logger.error("Could not write profile for %s %s: %s", scope["method"], scope["path"], e)
+
+    def _write(self, profile: RequestProfile, path: str):
+        os.makedirs(self.output_dir, exist_ok=True)
+        profile.write(path)
+        artifacts = sorted(
+            entry.path for entry in os.scandir(self.output_dir)
+            if entry.name.endswith((".pstats", ".html"))
+        )
+        # Artifact names start with a timestamp, so the oldest sort first
+        for stale in artifacts[:max(0, len(artifacts) - self.max_artifacts)]:
+            os.remove(stale)
@@ -0,0 +1,82 @@
+import logging
+import random
+import re
+import time
+import uuid
+from ..monitoring.request_context import RequestStats, reset_current_request, set_current_request
+
+access_logger = logging.getLogger("app.access")
+
+REQUEST_ID_HEADER = b"x-request-id"
+VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+
+class RequestLoggingMiddleware:
+    """
+    Gives every request an ID (the caller's X-Request-ID if valid), tracks its database time
+    and writes one access log line with route, status, duration and DB time. Successful fast
+    requests are sampled; errors and slow requests are always logged.
+    """
+
+    def __init__(self, app, sample_rate: float = 1.0, slow_request_ms: float = 1000):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = dict(scope.get("headers", [])).get(REQUEST_ID_HEADER, b"").decode("latin-1")
+        if not VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        stats = RequestStats(request_id, scope["method"], scope["path"])
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (REQUEST_ID_HEADER, request_id.encode("latin-1"))]}
+            await send(message)
+
+        token = set_current_request(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            reset_current_request(token)
+            self._log(scope, stats, status, duration_ms)
+
+    def _log(self, scope, stats: RequestStats, status: int, duration_ms: float):
+        if status >= 500:
+            level = logging.ERROR
+        elif duration_ms >= self.slow_request_ms:
+            level = logging.WARNING
+        elif random.random() < self.sample_rate:
+            level = logging.INFO
+        else:
+            return
+        # The router stores the matched endpoint in the scope
+        endpoint = scope.get("endpoint")
+        route = scope.get("route_path") or getattr(endpoint, "__name__", None) or stats.path
+        access_logger.log(
+            level,
+            "%s %s %s %.1fms",
+            stats.method,
+            stats.path,
+            status,
+            duration_ms,
+            extra={
+                "request_id": stats.request_id,
+                "method": stats.method,
+                "path": stats.path,
+                "route": route,
+                "status": status,
+                "duration_ms": round(duration_ms, 2),
+                "db_ms": round(stats.db_ms, 2),
+                "db_commands": stats.db_commands,
+            }
+        )
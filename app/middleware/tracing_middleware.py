@@ -0,0 +1,50 @@
+from typing import Optional
+from ..monitoring.tracing import STATUS_ERROR, Tracer, tracer as default_tracer
+
+
+class TracingMiddleware:
+    """
+    Starts the root span of every sampled request, continuing the trace of an incoming
+    traceparent header, and returns the request's traceparent so callers can find the trace.
+    """
+
+    def __init__(self, app, tracer: Optional[Tracer] = None):
+        self.app = app
+        self.tracer = tracer or default_tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        traceparent = headers.get(b"traceparent")
+        span = self.tracer.start_root(
+            f"{scope['method']} {scope['path']}",
+            traceparent.decode("latin-1") if traceparent else None,
+            {"http.method": scope["method"], "http.target": scope["path"]}
+        )
+        if span is None:
+            await self.app(scope, receive, send)
+            return
+
+        tracestate = headers.get(b"tracestate")
+
+        async def send_with_trace_context(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.status = STATUS_ERROR
+                extra = [(b"traceparent", span.traceparent.encode("latin-1"))]
+                if tracestate:
+                    extra.append((b"tracestate", tracestate))
+                message = {**message, "headers": [*message.get("headers", []), *extra]}
+            await send(message)
+
+        with self.tracer.activate(span):
+            await self.app(scope, receive, send_with_trace_context)
+            # Name the span after the route template once routing has found it
+            route_path = scope.get("route_path")
+            if route_path:
+                span.name = f"{scope['method']} {route_path}"
+                span.set_attribute("http.route", route_path)
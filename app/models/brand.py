@@ -38,4 +38,11 @@ class BrandResponse(BaseModel):
     description: Optional[str]
     is_active: bool
     created_at: datetime
-    updated_at: Optional[datetime]
\ No newline at end of file
+    updated_at: Optional[datetime]
+
+
+class BrandSuggestion(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+    
+    id: str = Field(alias="_id")
+    name: str
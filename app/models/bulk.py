@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class ImportRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class ImportResult(BaseModel):
+    processed: int = 0
+    inserted: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+    errors_truncated: bool = False
+
+    def add_error(self, row: int, errors: List[str], max_errors: int):
+        """Count a failed row; only the first max_errors are listed"""
+        self.failed += 1
+        if len(self.errors) < max_errors:
+            self.errors.append(ImportRowError(row=row, errors=errors))
+        else:
+            self.errors_truncated = True
@@ -1,7 +1,8 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
+from .brand import BrandResponse
 
 
 class Product(BaseModel):
@@ -17,6 +18,7 @@ class Product(BaseModel):
     price: float = Field(..., gt=0)
     category: str = Field(..., min_length=1, max_length=100)
     stock_quantity: int = Field(..., ge=0)
+    brand_id: Optional[str] = None
     is_active: bool = True
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: Optional[datetime] = None
@@ -28,6 +30,7 @@ class ProductCreate(BaseModel):
     price: float = Field(..., gt=0)
     category: str = Field(..., min_length=1, max_length=100)
     stock_quantity: int = Field(..., ge=0)
+    brand_id: Optional[str] = None
 
 
 class ProductUpdate(BaseModel):
@@ -36,6 +39,7 @@ class ProductUpdate(BaseModel):
     price: Optional[float] = Field(None, gt=0)
     category: Optional[str] = Field(None, min_length=1, max_length=100)
     stock_quantity: Optional[int] = Field(None, ge=0)
+    brand_id: Optional[str] = None
     is_active: Optional[bool] = None
 
 
@@ -48,6 +52,27 @@ class ProductResponse(BaseModel):
     price: float
     category: str
     stock_quantity: int
+    brand_id: Optional[str] = None
+    brand: Optional[BrandResponse] = None
     is_active: bool
     created_at: datetime
-    updated_at: Optional[datetime]
\ No newline at end of file
+    updated_at: Optional[datetime]
+
+
+class ProductChanges(BaseModel):
+    changed: List[ProductResponse]
+    deleted: List[str]
+    next_token: str
+    has_more: bool
+
+
+class ProductPage(BaseModel):
+    items: List[ProductResponse]
+    next_cursor: Optional[str] = None
+
+
+class ProductSuggestion(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+    
+    id: str = Field(alias="_id")
+    name: str
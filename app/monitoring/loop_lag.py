@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the lag histogram buckets, in milliseconds
+LAG_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LagHistogram:
+    """Cumulative histogram of loop lag samples, in the shape Prometheus expects"""
+
+    def __init__(self, buckets_ms: Tuple[float, ...] = LAG_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, lag_ms: float):
+        for position, upper_bound in enumerate(self.buckets_ms):
+            if lag_ms <= upper_bound:
+                break
+        else:
+            position = len(self.buckets_ms)
+        self.counts[position] += 1
+        self.count += 1
+        self.sum_ms += lag_ms
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(upper bound, samples at or below it) pairs, ending with +Inf"""
+        total = 0
+        buckets = []
+        for upper_bound, count in zip([*map(str, self.buckets_ms), "+Inf"], self.counts):
+            total += count
+            buckets.append((upper_bound, total))
+        return buckets
+
+
+def request_of(frames) -> Optional[str]:
+    """Method and path of the ASGI request a stack is serving, from the scope passed down the middleware"""
+    for frame in frames:
+        scope = frame.f_locals.get("scope")
+        if isinstance(scope, dict) and scope.get("type") == "http":
+            return f"{scope.get('method')} {scope.get('path')}"
+    return None
+
+
+class LoopLagMonitor:
+    """
+    Measures event loop lag as the overshoot of a periodic sleep. With a block threshold set,
+    a watchdog thread also notices when the loop has not woken the probe for that long and
+    logs the loop thread's stack, which shows the call that is holding the loop.
+    """
+
+    def __init__(self, interval_seconds: float = 0.1):
+        self.interval_seconds = interval_seconds
+        self.lag_seconds = 0.0
+        self.histogram = LagHistogram()
+        self.blocked_count = 0
+        self._task: Optional[asyncio.Task] = None
+        self._expected_wake = 0.0
+        self._loop_thread_id: Optional[int] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def current_lag_ms(self) -> float:
+        """Most recently measured lag"""
+        return self.lag_seconds * 1000
+
+    def start(self, block_threshold_ms: float = 0):
+        """Start probing the running loop, and watching it for blocking calls if a threshold is given"""
+        if self._task is None:
+            self._expected_wake = time.monotonic() + self.interval_seconds
+            self._task = asyncio.create_task(self._probe())
+        if block_threshold_ms and self._watchdog is None:
+            self._loop_thread_id = threading.get_ident()
+            self._stopping.clear()
+            self._watchdog = threading.Thread(
+                target=self._watch,
+                args=(block_threshold_ms / 1000,),
+                name="loop-block-watchdog",
+                daemon=True
+            )
+            self._watchdog.start()
+
+    async def stop(self):
+        """Stop probing"""
+        if self._watchdog is not None:
+            self._stopping.set()
+            self._watchdog.join()
+            self._watchdog = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.lag_seconds = 0.0
+
+    async def _probe(self):
+        while True:
+            started = time.monotonic()
+            self._expected_wake = started + self.interval_seconds
+            await asyncio.sleep(self.interval_seconds)
+            self.lag_seconds = max(0.0, time.monotonic() - started - self.interval_seconds)
+            self.histogram.observe(self.lag_seconds * 1000)
+
+    def _watch(self, threshold_seconds: float):
+        reported_wake = None
+        while not self._stopping.wait(min(threshold_seconds / 2, self.interval_seconds)):
+            expected_wake = self._expected_wake
+            overdue = time.monotonic() - expected_wake
+            # One report per stall: the probe resets expected_wake once the loop gets going again
+            if overdue > threshold_seconds and expected_wake != reported_wake:
+                reported_wake = expected_wake
+                self._report_block(overdue)
+
+    def _report_block(self, overdue_seconds: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        self.blocked_count += 1
+        stack = traceback.extract_stack(frame)
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        request = request_of(frames) or "outside a request"
+        logger.warning(
+            "Event loop blocked for %.0fms+ (%s), loop thread stack:\n%s",
+            overdue_seconds * 1000,
+            request,
+            "".join(traceback.format_list(stack))
+        )
+
+
+loop_lag_monitor = LoopLagMonitor()
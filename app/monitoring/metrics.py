@@ -0,0 +1,28 @@
+from typing import List
+from .loop_lag import loop_lag_monitor
+from .pool import pool_monitor
+
+
+def _metric(lines: List[str], name: str, metric_type: str, help_text: str):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {metric_type}")
+
+
+def render_metrics() -> str:
+    """Process metrics in the Prometheus text exposition format"""
+    lines: List[str] = []
+    histogram = loop_lag_monitor.histogram
+    _metric(lines, "event_loop_lag_milliseconds", "histogram", "Overshoot of the loop lag probe's periodic sleep")
+    for upper_bound, count in histogram.cumulative():
+        lines.append(f'event_loop_lag_milliseconds_bucket{{le="{upper_bound}"}} {count}')
+    lines.append(f"event_loop_lag_milliseconds_sum {histogram.sum_ms:.3f}")
+    lines.append(f"event_loop_lag_milliseconds_count {histogram.count}")
+
+    _metric(lines, "event_loop_blocked_total", "counter", "Times the loop was held longer than the block threshold")
+    lines.append(f"event_loop_blocked_total {loop_lag_monitor.blocked_count}")
+
+    _metric(lines, "mongodb_pool_wait_milliseconds", "gauge", "Longest recent wait for a pooled MongoDB connection")
+    lines.append(f"mongodb_pool_wait_milliseconds {pool_monitor.current_wait_ms():.3f}")
+    _metric(lines, "mongodb_pool_waiting", "gauge", "Operations waiting for a pooled MongoDB connection")
+    lines.append(f"mongodb_pool_waiting {pool_monitor.waiting()}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,17 @@
+from typing import Optional
+from .loop_lag import loop_lag_monitor
+from .pool import pool_monitor
+from ..config.settings import settings
+
+
+def overload_reason() -> Optional[str]:
+    """Why new requests should be shed right now, or None if the server can take them"""
+    pool_wait_ms = pool_monitor.current_wait_ms()
+    if settings.admission_max_pool_wait_ms and pool_wait_ms > settings.admission_max_pool_wait_ms:
+        return f"MongoDB pool wait {pool_wait_ms:.0f}ms"
+
+    loop_lag_ms = loop_lag_monitor.current_lag_ms()
+    if settings.admission_max_loop_lag_ms and loop_lag_ms > settings.admission_max_loop_lag_ms:
+        return f"Event loop lag {loop_lag_ms:.0f}ms"
+
+    return None
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Tuple
+from pymongo import monitoring
+
+
+class PoolWaitMonitor(monitoring.ConnectionPoolListener):
+    """
+    Measures how long operations wait for a pooled MongoDB connection.
+    Motor runs pymongo in executor threads, so checkouts are tracked per thread.
+    """
+
+    def __init__(self, window_seconds: float = 5.0):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._pending: Dict[int, float] = {}
+        self._recent_waits: Deque[Tuple[float, float]] = deque()
+
+    def current_wait_ms(self) -> float:
+        """Longest wait among checkouts still in progress or finished within the window"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            waits = [wait for _, wait in self._recent_waits]
+            waits.extend(now - started for started in self._pending.values())
+        return max(waits, default=0.0) * 1000
+
+    def waiting(self) -> int:
+        """Number of operations currently waiting for a connection"""
+        with self._lock:
+            return len(self._pending)
+
+    def _expire(self, now: float):
+        while self._recent_waits and self._recent_waits[0][0] < now - self.window_seconds:
+            self._recent_waits.popleft()
+
+    def _finish_checkout(self, record_wait: bool):
+        now = time.monotonic()
+        with self._lock:
+            started = self._pending.pop(threading.get_ident(), None)
+            if started is not None and record_wait:
+                self._recent_waits.append((now, now - started))
+            self._expire(now)
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self._pending[threading.get_ident()] = time.monotonic()
+
+    def connection_checked_out(self, event):
+        self._finish_checkout(record_wait=True)
+
+    def connection_check_out_failed(self, event):
+        # A timed out checkout is the strongest saturation signal there is
+        self._finish_checkout(record_wait=True)
+
+    def connection_checked_in(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+
+pool_monitor = PoolWaitMonitor()
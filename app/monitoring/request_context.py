@@ -0,0 +1,63 @@
+import threading
+from contextvars import ContextVar
+from typing import Optional
+from pymongo import monitoring
+
+
+class RequestStats:
+    """Identity and database time of the request being served"""
+
+    def __init__(self, request_id: str, method: str, path: str):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.db_ms = 0.0
+        self.db_commands = 0
+        self._lock = threading.Lock()
+
+    def add_command(self, duration_ms: float):
+        # Commands of one request can finish concurrently on Motor's executor threads
+        with self._lock:
+            self.db_ms += duration_ms
+            self.db_commands += 1
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def current_request() -> Optional[RequestStats]:
+    """Stats of the request being served in this context, if any"""
+    return _current_request.get()
+
+
+def set_current_request(stats: Optional[RequestStats]):
+    return _current_request.set(stats)
+
+
+def reset_current_request(token):
+    _current_request.reset(token)
+
+
+class DatabaseTimer(monitoring.CommandListener):
+    """
+    Adds the duration of every MongoDB command to the request that issued it. Motor runs
+    commands on executor threads with a copy of the caller's context, so the request is visible here.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    def _record(self, event):
+        stats = _current_request.get()
+        if stats is not None:
+            stats.add_command(event.duration_micros / 1000)
+
+
+database_timer = DatabaseTimer()
@@ -0,0 +1,331 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid
+from .request_context import current_request
+from ..config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Commands that read or match documents and can be explained; inserts and getMores are left out
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+# Pipeline stages without user values, kept verbatim in a shape
+VERBATIM_STAGES = {"$sort", "$project", "$lookup", "$unset"}
+# Fields of a recorded command that belong to the session or cluster, not the query
+SESSION_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction"}
+REDACTED = "?"
+
+
+def redact(value: Any) -> Any:
+    """Shape of a filter: field names and operators are kept, every value is replaced with ?"""
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Lists of conditions ($or, $and) keep their structure; lists of values collapse to one
+        if value and all(isinstance(item, dict) for item in value):
+            return [redact(item) for item in value]
+        return [REDACTED]
+    return REDACTED
+
+
+def _pipeline_shape(pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    shape = []
+    for stage in pipeline:
+        name, body = next(iter(stage.items()))
+        shape.append({name: body if name in VERBATIM_STAGES else redact(body)})
+    return shape
+
+
+def query_shape(command: Dict[str, Any]) -> Dict[str, Any]:
+    """What identifies a query regardless of its values: command, collection, filter and sort"""
+    name = next(iter(command))
+    shape: Dict[str, Any] = {"command": name, "collection": command[name]}
+    if name == "find":
+        shape["filter"] = redact(command.get("filter", {}))
+        if command.get("sort"):
+            shape["sort"] = dict(command["sort"])
+    elif name == "aggregate":
+        shape["pipeline"] = _pipeline_shape(command.get("pipeline", []))
+    elif name in ("count", "findAndModify"):
+        shape["filter"] = redact(command.get("query", {}))
+    elif name == "distinct":
+        shape["key"] = command.get("key")
+        shape["filter"] = redact(command.get("query", {}))
+    elif name == "update":
+        updates = command.get("updates", [])
+        shape["filter"] = redact(updates[0].get("q", {})) if updates else {}
+    elif name == "delete":
+        deletes = command.get("deletes", [])
+        shape["filter"] = redact(deletes[0].get("q", {})) if deletes else {}
+    return shape
+
+
+def shape_id(shape: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(shape, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def plain_command(command: Dict[str, Any]) -> Dict[str, Any]:
+    """A recorded command without its session and cluster fields, so it can be explained"""
+    return {key: value for key, value in command.items() if not key.startswith("$") and key not in SESSION_FIELDS}
+
+
+def _walk(node: Any):
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def summarize_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """The parts of an executionStats explain that say why a query is slow"""
+    plans = [node["winningPlan"] for node in _walk(explain) if "winningPlan" in node]
+    stages = [node["stage"] for plan in plans for node in _walk(plan) if "stage" in node]
+    stats = [node for node in _walk(explain) if "totalDocsExamined" in node]
+    return {
+        "stages": stages,
+        "collection_scan": "COLLSCAN" in stages,
+        "docs_examined": sum(node.get("totalDocsExamined", 0) for node in stats),
+        "keys_examined": sum(node.get("totalKeysExamined", 0) for node in stats),
+        "returned": sum(node.get("nReturned", 0) for node in stats),
+        "execution_ms": max((node.get("executionTimeMillis", 0) for node in stats), default=0),
+    }
+
+
+def top_shapes(records: List[Dict[str, Any]], limit: int = 20) -> List[Dict[str, Any]]:
+    """Slow query records grouped by shape, costliest in total first"""
+    groups: Dict[str, Dict[str, Any]] = {}
+    # Newest first, so each shape shows its latest explain
+    for record in sorted(records, key=lambda record: str(record["timestamp"]), reverse=True):
+        group = groups.get(record["shape_id"])
+        if group is None:
+            group = groups[record["shape_id"]] = {
+                "shape_id": record["shape_id"],
+                "shape": record["shape"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "routes": [],
+                "last_seen": record["timestamp"],
+                "explain": None,
+            }
+        group["count"] += 1
+        group["total_ms"] += record["duration_ms"]
+        group["max_ms"] = max(group["max_ms"], record["duration_ms"])
+        if record.get("route") and record["route"] not in group["routes"]:
+            group["routes"].append(record["route"])
+        if group["explain"] is None:
+            group["explain"] = record.get("explain")
+    ranked = sorted(groups.values(), key=lambda group: group["total_ms"], reverse=True)[:limit]
+    for group in ranked:
+        group["total_ms"] = round(group["total_ms"], 3)
+        group["avg_ms"] = round(group["total_ms"] / group["count"], 3)
+    return ranked
+
+
+class FileSlowQuerySink:
+    """Appends slow query records to a JSON lines file"""
+
+    def __init__(self, path: str, max_records: int = 10000):
+        self.path = path
+        self.max_records = max_records
+
+    async def open(self):
+        pass
+
+    async def write(self, record: Dict[str, Any]):
+        await asyncio.to_thread(self._append, json.dumps(record, default=str))
+
+    async def recent(self) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._read)
+
+    def _append(self, line: str):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a") as file:
+            file.write(line + "\n")
+
+    def _read(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as file:
+            return [json.loads(line) for line in deque(file, maxlen=self.max_records) if line.strip()]
+
+
+class MongoSlowQuerySink:
+    """Inserts slow query records into a capped collection, which keeps only the newest ones"""
+
+    def __init__(self, database, collection_name: str, size_bytes: int, max_records: int = 10000):
+        self.database = database
+        self.collection_name = collection_name
+        self.size_bytes = size_bytes
+        self.max_records = max_records
+
+    async def open(self):
+        try:
+            await self.database.create_collection(self.collection_name, capped=True, size=self.size_bytes, max=self.max_records)
+        except CollectionInvalid:
+            pass  # Already created by this or another worker
+
+    async def write(self, record: Dict[str, Any]):
+        await self.database[self.collection_name].insert_one(dict(record))
+
+    async def recent(self) -> List[Dict[str, Any]]:
+        cursor = self.database[self.collection_name].find({}, {"_id": 0}).sort("$natural", -1)
+        return await cursor.to_list(length=self.max_records)
+
+
+class SlowQueryRecorder(monitoring.CommandListener):
+    """
+    Records MongoDB commands slower than the threshold with their redacted shape and the route that
+    issued them. Events arrive on Motor's executor threads and are handed to a task on the loop,
+    which explains each shape at most once per explain_interval_seconds and writes the record to the sink.
+    """
+
+    def __init__(self, queue_size: int = 1000):
+        self.threshold_ms = 0.0
+        self.explain_interval_seconds = 300.0
+        self.sink = None
+        self.recorded = 0
+        self.dropped = 0
+        self._database = None
+        self._queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[Tuple[Any, int], Tuple[Dict[str, Any], str]] = {}
+        self._explained_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._task is not None and self.threshold_ms > 0
+
+    async def start(self, sink, database, threshold_ms: float, explain_interval_seconds: float = 300.0):
+        """Start recording commands slower than threshold_ms into sink, explaining them against database"""
+        await sink.open()
+        self.sink = sink
+        self._database = database
+        self.threshold_ms = threshold_ms
+        self.explain_interval_seconds = explain_interval_seconds
+        self._queue = asyncio.Queue(self._queue_size)
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop recording; records still queued are dropped"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        with self._lock:
+            self._pending.clear()
+
+    async def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most costly query shapes among the stored records"""
+        if self.sink is None:
+            return []
+        return top_shapes(await self.sink.recent(), limit)
+
+    def started(self, event):
+        if not self.enabled or event.command_name not in EXPLAINABLE_COMMANDS:
+            return
+        command = event.command
+        if command.get(event.command_name) == getattr(self.sink, "collection_name", None):
+            return
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (dict(command), event.database_name)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        if not self._pending:
+            return
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms:
+            return
+        command, database_name = pending
+        shape = query_shape(command)
+        # Motor runs listeners with a copy of the issuing coroutine's context
+        stats = current_request()
+        record = {
+            "timestamp": datetime.utcnow().isoformat(timespec="milliseconds"),
+            "shape_id": shape_id(shape),
+            "shape": shape,
+            "duration_ms": round(duration_ms, 3),
+            "failed": failed,
+            "database": database_name,
+            "route": f"{stats.method} {stats.route or stats.path}" if stats is not None else None,
+            "request_id": stats.request_id if stats is not None else None,
+        }
+        try:
+            self._loop.call_soon_threadsafe(self._enqueue, record, command)
+        except RuntimeError:
+            pass  # The loop is closing
+
+    def _enqueue(self, record: Dict[str, Any], command: Dict[str, Any]):
+        try:
+            self._queue.put_nowait((record, command))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _run(self):
+        while True:
+            record, command = await self._queue.get()
+            record["explain"] = await self._explain(record["shape_id"], command)
+            try:
+                await self.sink.write(record)
+                self.recorded += 1
+            except Exception as e:
+                self.dropped += 1
+                logger.warning("Could not store slow query record: %s", e)
+
+    async def _explain(self, shape: str, command: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Explaining with executionStats runs the query again, so a hot shape is explained only now and then
+        now = time.monotonic()
+        if now - self._explained_at.get(shape, float("-inf")) < self.explain_interval_seconds:
+            return None
+        self._explained_at[shape] = now
+        try:
+            explain = await self._database.command({"explain": plain_command(command), "verbosity": "executionStats"})
+        except Exception as e:
+            logger.warning("Could not explain slow %s command: %s", next(iter(command)), e)
+            return None
+        return summarize_explain(explain)
+
+
+def create_slow_query_sink(database):
+    """Build the configured slow query sink"""
+    if settings.slow_query_sink == "file":
+        return FileSlowQuerySink(settings.slow_query_file_path, settings.slow_query_max_records)
+    return MongoSlowQuerySink(
+        database,
+        settings.slow_query_collection,
+        settings.slow_query_collection_size_mb * 1024 * 1024,
+        settings.slow_query_max_records
+    )
+
+
+slow_query_recorder = SlowQueryRecorder()
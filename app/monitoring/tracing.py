@@ -0,0 +1,285 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from fastapi.routing import APIRoute
+from .request_context import current_request
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+MAX_SPANS_PER_TRACE = 1000
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """One timed operation of a trace; spans of a trace share the root's buffer until it ends"""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        trace_spans: Optional[List["Span"]] = None
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.status = STATUS_OK
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.trace_spans = trace_spans if trace_spans is not None else []
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": self.status, "message": self.status_message},
+        }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """The innermost span of the running request, if it is being traced"""
+    return _current_span.get()
+
+
+class OTLPJsonExporter:
+    """
+    Writes each finished trace as one line of OTLP/JSON (an ExportTraceServiceRequest), to a
+    file or stdout. Lines are written by a background thread so requests never wait on the disk.
+    """
+
+    def __init__(self, service_name: str, path: Optional[str] = None):
+        self.service_name = service_name
+        self.path = path
+        self._queue: "queue.SimpleQueue[Optional[List[Span]]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, spans: List[Span]):
+        self._queue.put(spans)
+
+    def shutdown(self):
+        """Write the queued traces and stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def encode(self, spans: List[Span]) -> str:
+        return json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "app"}, "spans": [span.to_otlp() for span in spans]}],
+            }]
+        })
+
+    def _run(self):
+        file = open(self.path, "a") if self.path else sys.stdout
+        try:
+            while True:
+                spans = self._queue.get()
+                if spans is None:
+                    break
+                file.write(self.encode(spans) + "\n")
+                file.flush()
+        except Exception as e:
+            logger.error("Trace exporter stopped: %s", e)
+        finally:
+            if file is not sys.stdout:
+                file.close()
+
+
+class Tracer:
+    """Starts spans in the current context; traces are sampled once, at the root"""
+
+    def __init__(self):
+        self.sample_rate = 1.0
+        self.exporter: Optional[OTLPJsonExporter] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def configure(self, exporter: Optional[OTLPJsonExporter], sample_rate: float = 1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def shutdown(self):
+        if self.exporter is not None:
+            self.exporter.shutdown()
+            self.exporter = None
+
+    def start_root(self, name: str, traceparent: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """Root span of a request, continuing the caller's trace; None if the trace is not sampled"""
+        if not self.enabled:
+            return None
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+            # The caller already decided whether this trace is sampled
+            if not sampled:
+                return None
+        elif random.random() < self.sample_rate:
+            trace_id, parent_id = os.urandom(16).hex(), None
+        else:
+            return None
+        return Span(name, trace_id, parent_id, SPAN_KIND_SERVER, attributes)
+
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> "SpanScope":
+        """Child span of the current span; a no-op outside a sampled trace"""
+        parent = _current_span.get()
+        if parent is None:
+            return SpanScope(None)
+        return SpanScope(Span(name, parent.trace_id, parent.span_id, SPAN_KIND_INTERNAL, attributes, parent.trace_spans))
+
+    def activate(self, span: Span) -> "SpanScope":
+        return SpanScope(span)
+
+    def finish(self, span: Span):
+        span.end_ns = time.time_ns()
+        if len(span.trace_spans) < MAX_SPANS_PER_TRACE:
+            span.trace_spans.append(span)
+        if span.kind == SPAN_KIND_SERVER and self.exporter is not None:
+            self.exporter.export(span.trace_spans)
+
+
+tracer = Tracer()
+
+
+class SpanScope:
+    """Makes a span current for the duration of a with block and ends it afterwards"""
+
+    def __init__(self, span: Optional[Span]):
+        self.span = span
+        self._token = None
+
+    def __enter__(self) -> Optional[Span]:
+        if self.span is not None:
+            self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, error_type, error, traceback):
+        if self.span is None:
+            return
+        if error is not None:
+            self.span.record_error(error)
+        _current_span.reset(self._token)
+        tracer.finish(self.span)
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace id, parent span id, sampled) of a W3C traceparent header, or None if absent or invalid"""
+    if not value:
+        return None
+    match = TRACEPARENT.match(value.strip().lower())
+    if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+def traced(name: Optional[str] = None):
+    """Run a function in a child span of the current trace; costs one context lookup when not traced"""
+    def decorator(function: Callable):
+        span_name = name or function.__qualname__
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await function(*args, **kwargs)
+                with tracer.span(span_name):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return function(*args, **kwargs)
+            with tracer.span(span_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_methods(cls):
+    """Trace the public coroutine methods a class defines itself"""
+    for attribute, value in list(vars(cls).items()):
+        if not attribute.startswith("_") and inspect.iscoroutinefunction(value):
+            setattr(cls, attribute, traced()(value))
+    return cls
+
+
+class TracedRoute(APIRoute):
+    """
+    Route that records its template on the request, with a span around the whole handler (dependencies, endpoint and response
+    serialization) and one around the endpoint function, so the time between them shows.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        self.dependant.call = traced(f"endpoint {endpoint.__name__}")(self.dependant.call)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        span_name = f"handler {self.path}"
+
+        async def traced_handler(request):
+            # The route template names the request in spans and log lines
+            request.scope["route_path"] = self.path
+            stats = current_request()
+            if stats is not None:
+                stats.route = self.path
+            if _current_span.get() is None:
+                return await handler(request)
+            with tracer.span(span_name, {"http.route": self.path}):
+                return await handler(request)
+
+        return traced_handler
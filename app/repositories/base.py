@@ -1,48 +1,259 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, DESCENDING, UpdateOne
 from datetime import datetime
+from ..utils.dataloader import get_request_loader
+from ..utils.deadline import remaining_ms
+from ..utils.text import normalize_name, prefix_upper_bound
+from ..cache.query_cache import query_cache, query_cache_enabled, entity_cache
+from ..monitoring.tracing import trace_methods
 
 
+@trace_methods
 class BaseRepository(ABC):
+    # Collections holding secrets keep their documents out of the query and entity caches, which workers share
+    cacheable = True
+
+    def __init_subclass__(cls, **kwargs):
+        # Every repository's own operations get a span too
+        super().__init_subclass__(**kwargs)
+        trace_methods(cls)
+
     def __init__(self, database, collection_name: str):
         self.database = database
         self.collection_name = collection_name
         self.collection: AsyncIOMotorCollection = database[collection_name]
 
+    async def ensure_indexes(self):
+        """Create the indexes this repository relies on"""
+
+    def _find(self, query: Dict[str, Any], projection: Dict[str, Any] = None, collection=None):
+        """Start a find cursor bounded by the request deadline"""
+        cursor = (collection if collection is not None else self.collection).find(query, projection)
+        max_time_ms = remaining_ms()
+        if max_time_ms is not None:
+            cursor = cursor.max_time_ms(max_time_ms)
+        return cursor
+
+    async def _find_one(self, query: Dict[str, Any], projection: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        """Find a single document within the request deadline"""
+        documents = await self._find(query, projection).limit(1).to_list(length=1)
+        return documents[0] if documents else None
+
+    def _aggregate(self, pipeline: List[Dict[str, Any]]):
+        """Start an aggregation cursor bounded by the request deadline"""
+        max_time_ms = remaining_ms()
+        if max_time_ms is not None:
+            return self.collection.aggregate(pipeline, maxTimeMS=max_time_ms)
+        return self.collection.aggregate(pipeline)
+
+    async def _count(self, query: Dict[str, Any], **kwargs) -> int:
+        """Count documents within the request deadline"""
+        max_time_ms = remaining_ms()
+        if max_time_ms is not None:
+            kwargs["maxTimeMS"] = max_time_ms
+        return await self.collection.count_documents(query, **kwargs)
+
     async def create(self, document: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new document"""
-        document["created_at"] = datetime.utcnow()
+        document.setdefault("created_at", datetime.utcnow())
+        self._set_name_lower(document)
         result = await self.collection.insert_one(document)
-        created_document = await self.collection.find_one({"_id": result.inserted_id})
+        await query_cache.invalidate(self.collection_name)
+        created_document = await self._find_one({"_id": result.inserted_id})
         return created_document
 
+    async def create_many(self, documents: List[Dict[str, Any]]) -> List[ObjectId]:
+        """Insert documents with one unordered insert_many; each document gets its _id set"""
+        now = datetime.utcnow()
+        for document in documents:
+            document.setdefault("created_at", now)
+            self._set_name_lower(document)
+        try:
+            result = await self.collection.insert_many(documents, ordered=False)
+        finally:
+            # Some documents may have been written even if the batch failed
+            await query_cache.invalidate(self.collection_name)
+        return result.inserted_ids
+
+    async def upsert_many(self, key_field: str, documents: List[Dict[str, Any]], defaults: Optional[Dict[str, Any]] = None):
+        """Insert or update documents matched on key_field with one unordered bulk write; defaults only apply to inserts"""
+        keys = [document[key_field] for document in documents]
+        existing = await self._find({key_field: {"$in": keys}}, {"_id": 1}).to_list(length=None)
+        
+        now = datetime.utcnow()
+        operations = []
+        for document in documents:
+            self._set_name_lower(document)
+            operations.append(UpdateOne(
+                {key_field: document[key_field]},
+                {
+                    "$set": {**document, "updated_at": now},
+                    # A field cannot be in both $set and $setOnInsert
+                    "$setOnInsert": {
+                        **{field: value for field, value in (defaults or {}).items() if field not in document},
+                        "created_at": now
+                    }
+                },
+                upsert=True
+            ))
+        try:
+            return await self.collection.bulk_write(operations, ordered=False)
+        finally:
+            await query_cache.invalidate(self.collection_name)
+            for document in existing:
+                await entity_cache.invalidate(self.collection_name, str(document["_id"]))
+
+    async def get_existing_values(self, field: str, values: List[Any]) -> List[Any]:
+        """Which of the given values of a field are already taken, with a single $in query"""
+        if not values:
+            return []
+        documents = await self._find({field: {"$in": values}}, {field: 1}).to_list(length=None)
+        return [document[field] for document in documents]
+
     async def get_by_id(self, document_id: str) -> Optional[Dict[str, Any]]:
         """Get document by ID"""
         if not ObjectId.is_valid(document_id):
             return None
-        return await self.collection.find_one({"_id": ObjectId(document_id)})
+        
+        if self.cacheable:
+            cached = await entity_cache.get(self.collection_name, document_id)
+            if cached is not None:
+                return cached
+        
+        # Coalesce lookups made in the same event-loop tick of a request into one $in query
+        loader = get_request_loader(f"{self.collection_name}.get_by_id", self._batch_get_by_id)
+        if loader is not None:
+            fetch = lambda: loader.load(document_id)
+        else:
+            fetch = lambda: self._find_one({"_id": ObjectId(document_id)})
+        if not self.cacheable:
+            return await fetch()
+        return await entity_cache.load(self.collection_name, document_id, fetch)
+
+    async def get_many(self, document_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get documents by a list of IDs with a single $in query, preserving the input order"""
+        object_ids = list(dict.fromkeys(
+            ObjectId(document_id) for document_id in document_ids if ObjectId.is_valid(document_id)
+        ))
+        if not object_ids:
+            return []
+        
+        cursor = self._find({"_id": {"$in": object_ids}})
+        documents = await cursor.to_list(length=len(object_ids))
+        documents_by_id = {document["_id"]: document for document in documents}
+        return [documents_by_id[object_id] for object_id in object_ids if object_id in documents_by_id]
+
+    async def get_version(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Get only the _id and timestamps of a document, for cheap conditional requests"""
+        if not ObjectId.is_valid(document_id):
+            return None
+        return await self._find_one(
+            {"_id": ObjectId(document_id)},
+            {"created_at": 1, "updated_at": 1}
+        )
+
+    async def _batch_get_by_id(self, document_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Batch function for the per-request get_by_id loader"""
+        documents = await self.get_many(document_ids)
+        documents_by_id = {document["_id"]: document for document in documents}
+        return [documents_by_id.get(ObjectId(document_id)) for document_id in document_ids]
 
     async def get_all(self, skip: int = 0, limit: int = 100, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """Get all documents with pagination and optional filters"""
         query = filters or {}
-        cursor = self.collection.find(query).skip(skip).limit(limit)
+        
+        # Routes that opt in get results cached until the next write to the collection
+        cache_key = None
+        if self.cacheable and query_cache_enabled():
+            cache_key = await query_cache.make_key(self.collection_name, query, skip=skip, limit=limit)
+            cached = await query_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        cursor = self._find(query).skip(skip).limit(limit)
+        documents = await cursor.to_list(length=limit)
+        if cache_key is not None:
+            await query_cache.set(cache_key, documents)
+        return documents
+
+    def iter_documents(
+        self,
+        filters: Dict[str, Any] = None,
+        projection: Dict[str, Any] = None,
+        batch_size: int = 1000
+    ):
+        """Cursor over every matching document in _id order, fetched from the server batch_size at a time"""
+        cursor = self._find(filters or {}, projection).sort("_id", ASCENDING)
+        return cursor.batch_size(batch_size)
+
+    async def get_by_prefix(
+        self,
+        field: str,
+        prefix: str,
+        limit: int = 10,
+        filters: Dict[str, Any] = None,
+        projection: Dict[str, Any] = None
+    ) -> List[Dict[str, Any]]:
+        """Get documents whose field starts with prefix, as an anchored range scan on the field's index"""
+        bounds = {"$gte": prefix}
+        upper_bound = prefix_upper_bound(prefix)
+        if upper_bound is not None:
+            bounds["$lt"] = upper_bound
+        query = {**(filters or {}), field: bounds}
+        cursor = self._find(query, projection).sort(field, ASCENDING).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def get_active_names(self, limit: int) -> List[Dict[str, Any]]:
+        """Get _id, name and name_lower of up to limit active documents"""
+        cursor = self._find({"is_active": True}, {"name": 1, "name_lower": 1}).limit(limit)
         return await cursor.to_list(length=limit)
 
+    async def get_change_marker(self) -> Tuple[int, Any, Any]:
+        """Document count, newest _id and latest updated_at; any insert, update or delete changes one of them"""
+        newest = await self._find({}, {"_id": 1}).sort("_id", DESCENDING).limit(1).to_list(length=1)
+        latest = await self._find({}, {"updated_at": 1}).sort("updated_at", DESCENDING).limit(1).to_list(length=1)
+        count = await self.collection.estimated_document_count()
+        return count, newest[0]["_id"] if newest else None, latest[0].get("updated_at") if latest else None
+
+    def _set_name_lower(self, data: Dict[str, Any]):
+        # Keep the normalized copy used by autocomplete in step with name
+        if data.get("name") is not None:
+            data["name_lower"] = normalize_name(data["name"])
+
+    async def _backfill_name_lower(self, batch_size: int = 1000):
+        # Normalized in Python so existing documents match what writes store
+        cursor = self.collection.find({"name_lower": None}, {"name": 1})
+        updates = []
+        async for document in cursor:
+            updates.append(UpdateOne(
+                {"_id": document["_id"]},
+                {"$set": {"name_lower": normalize_name(document.get("name") or "")}}
+            ))
+            if len(updates) >= batch_size:
+                await self.collection.bulk_write(updates, ordered=False)
+                updates = []
+        if updates:
+            await self.collection.bulk_write(updates, ordered=False)
+
     async def update(self, document_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update document by ID"""
         if not ObjectId.is_valid(document_id):
             return None
         
         update_data["updated_at"] = datetime.utcnow()
+        self._set_name_lower(update_data)
         result = await self.collection.update_one(
             {"_id": ObjectId(document_id)},
             {"$set": update_data}
         )
         
         if result.modified_count:
-            return await self.collection.find_one({"_id": ObjectId(document_id)})
+            await query_cache.invalidate(self.collection_name)
+            await entity_cache.invalidate(self.collection_name, document_id)
+            return await self._find_one({"_id": ObjectId(document_id)})
         return None
 
     async def delete(self, document_id: str) -> bool:
@@ -51,16 +262,19 @@ class BaseRepository(ABC):
             return False
         
         result = await self.collection.delete_one({"_id": ObjectId(document_id)})
+        if result.deleted_count:
+            await query_cache.invalidate(self.collection_name)
+            await entity_cache.invalidate(self.collection_name, document_id)
         return result.deleted_count > 0
 
     async def count(self, filters: Dict[str, Any] = None) -> int:
         """Count documents with optional filters"""
         query = filters or {}
-        return await self.collection.count_documents(query)
+        return await self._count(query)
 
     async def exists(self, filters: Dict[str, Any]) -> bool:
         """Check if document exists with given filters"""
-        count = await self.collection.count_documents(filters, limit=1)
+        count = await self._count(filters, limit=1)
         return count > 0
 
     def convert_objectid_to_str(self, document: Dict[str, Any]) -> Dict[str, Any]:
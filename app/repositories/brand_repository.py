@@ -6,9 +6,19 @@ class BrandRepository(BaseRepository):
     def __init__(self, database):
         super().__init__(database, "brand")
 
+    async def ensure_indexes(self):
+        """Create the indexes used by autocomplete and name lookups"""
+        await self.collection.create_index("name_lower")
+        await self.collection.create_index("name")
+        await self._backfill_name_lower()
+
     async def get_by_name(self, name: str) -> Optional[Dict[str, Any]]:
         """Get brand by name"""
-        return await self.collection.find_one({"name": name})
+        return await self._find_one({"name": name})
+
+    async def get_all_for_snapshot(self) -> List[Dict[str, Any]]:
+        """Get every brand, for the in-process brand catalog"""
+        return await self._find({}).to_list(length=None)
 
     async def get_active_brands(self, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
         """Get all active brands"""
@@ -24,6 +34,16 @@ class BrandRepository(BaseRepository):
         }
         return await self.get_all(skip=skip, limit=limit, filters=query)
 
+    async def autocomplete(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get active brands whose normalized name starts with prefix, in name order"""
+        return await self.get_by_prefix(
+            "name_lower",
+            prefix,
+            limit=limit,
+            filters={"is_active": True},
+            projection={"name": 1, "name_lower": 1}
+        )
+
     async def name_exists(self, name: str) -> bool:
         """Check if brand name already exists"""
         return await self.exists({"name": name})
\ No newline at end of file
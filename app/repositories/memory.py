@@ -0,0 +1,856 @@
+import re
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from bson import ObjectId
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError, ExecutionTimeout, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+MISSING = object()
+
+# Documents a find or aggregate returns with its reply when the cursor has no batch size
+FIRST_BATCH_SIZE = 101
+# Commands each kind of bulk write request is sent as
+BULK_COMMANDS = {
+    "InsertOne": "insert", "UpdateOne": "update", "UpdateMany": "update", "ReplaceOne": "update",
+    "DeleteOne": "delete", "DeleteMany": "delete",
+}
+
+# BSON comparison order of the types documents hold here
+_TYPE_ORDER = (
+    (type(None), 1), (bool, 8), (int, 2), (float, 2), (str, 3), (dict, 4), (list, 5),
+    (bytes, 6), (ObjectId, 7), (datetime, 9), (re.Pattern, 11),
+)
+
+
+def _type_order(value) -> int:
+    if value is MISSING:
+        return 1
+    for value_type, order in _TYPE_ORDER:
+        if isinstance(value, value_type):
+            return order
+    return 100
+
+
+def _sort_key(value):
+    """Key that orders values the way MongoDB orders BSON values"""
+    order = _type_order(value)
+    if order == 1:
+        return (order, 0)
+    if order == 4:
+        return (order, [(key, _sort_key(item)) for key, item in value.items()])
+    if order == 5:
+        return (order, [_sort_key(item) for item in value])
+    if order == 11:
+        return (order, value.pattern)
+    return (order, value)
+
+
+def _copy(value):
+    """Copy nested dicts and lists; scalars are immutable and shared"""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+def _get_path(document, path: str):
+    value = document
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return MISSING
+    return value
+
+
+def _set_path(document, path: str, value):
+    *parents, last = path.split(".")
+    for part in parents:
+        document = document.setdefault(part, {})
+    document[last] = value
+
+
+def _unset_path(document, path: str):
+    *parents, last = path.split(".")
+    for part in parents:
+        document = document.get(part)
+        if not isinstance(document, dict):
+            return
+    document.pop(last, None)
+
+
+def _equals(value, expected) -> bool:
+    if value is MISSING:
+        return expected is None
+    if isinstance(expected, re.Pattern):
+        return isinstance(value, str) and expected.search(value) is not None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return any(_equals(item, expected) for item in value)
+    # True == 1 in Python but a boolean never equals a number in MongoDB
+    return _type_order(value) == _type_order(expected) and value == expected
+
+
+def _compare(value, expected, operator: Callable[[Any, Any], bool]) -> bool:
+    if isinstance(value, list):
+        return any(_compare(item, expected, operator) for item in value)
+    if value is MISSING or _type_order(value) != _type_order(expected):
+        # Range operators only match values of the same type bracket
+        return value is MISSING and expected is None and operator(0, 0)
+    return operator(_sort_key(value), _sort_key(expected))
+
+
+def _regex(pattern, options: str = ""):
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    flags = 0
+    for option, flag in (("i", re.IGNORECASE), ("m", re.MULTILINE), ("s", re.DOTALL), ("x", re.VERBOSE)):
+        if option in options:
+            flags |= flag
+    return re.compile(pattern, flags)
+
+
+_RANGE_OPERATORS = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b,
+}
+
+
+def _match_operators(value, operators: Dict[str, Any]) -> bool:
+    for operator, operand in operators.items():
+        if operator == "$eq":
+            matched = _equals(value, operand)
+        elif operator == "$ne":
+            matched = not _equals(value, operand)
+        elif operator in _RANGE_OPERATORS:
+            matched = _compare(value, operand, _RANGE_OPERATORS[operator])
+        elif operator == "$in":
+            matched = any(_equals(value, item) for item in operand)
+        elif operator == "$nin":
+            matched = not any(_equals(value, item) for item in operand)
+        elif operator == "$exists":
+            matched = (value is not MISSING) == bool(operand)
+        elif operator == "$regex":
+            pattern = _regex(operand, operators.get("$options", ""))
+            matched = _equals(value, pattern)
+        elif operator == "$options":
+            continue
+        elif operator == "$not":
+            matched = not _match_condition(value, operand)
+        else:
+            raise OperationFailure(f"unknown operator: {operator}")
+        if not matched:
+            return False
+    return True
+
+
+def _is_operator_dict(condition) -> bool:
+    return isinstance(condition, dict) and bool(condition) and all(key.startswith("$") for key in condition)
+
+
+def _match_condition(value, condition) -> bool:
+    if _is_operator_dict(condition):
+        return _match_operators(value, condition)
+    return _equals(value, condition)
+
+
+def matches(document: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    """Whether a document matches a MongoDB query filter"""
+    for key, condition in query.items():
+        if key == "$or":
+            matched = any(matches(document, clause) for clause in condition)
+        elif key == "$and":
+            matched = all(matches(document, clause) for clause in condition)
+        elif key == "$nor":
+            matched = not any(matches(document, clause) for clause in condition)
+        elif key == "$expr":
+            matched = _truthy(evaluate(document, condition))
+        elif key.startswith("$"):
+            raise OperationFailure(f"unknown top level operator: {key}")
+        else:
+            matched = _match_condition(_get_path(document, key), condition)
+        if not matched:
+            return False
+    return True
+
+
+def _truthy(value) -> bool:
+    return value is not MISSING and value is not None and value is not False and value != 0
+
+
+_EXPRESSION_COMPARISONS = {
+    "$eq": lambda a, b: a == b,
+    "$ne": lambda a, b: a != b,
+    **_RANGE_OPERATORS,
+}
+
+
+def evaluate(document: Dict[str, Any], expression):
+    """Evaluate the subset of aggregation expressions used by $expr, $set stages and pipeline updates"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return _get_path(document, expression[1:])
+    if isinstance(expression, list):
+        return [evaluate(document, item) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+    if not _is_operator_dict(expression):
+        return {key: evaluate(document, item) for key, item in expression.items()}
+
+    (operator, operand), = expression.items()
+    if operator == "$literal":
+        return operand
+    arguments = operand if isinstance(operand, list) else [operand]
+    values = [evaluate(document, argument) for argument in arguments]
+    if operator in _EXPRESSION_COMPARISONS:
+        # Aggregation comparisons order values of different types instead of failing
+        left, right = (_sort_key(None if value is MISSING else value) for value in values)
+        return _EXPRESSION_COMPARISONS[operator](left, right)
+    if operator == "$and":
+        return all(_truthy(value) for value in values)
+    if operator == "$or":
+        return any(_truthy(value) for value in values)
+    if operator == "$not":
+        return not _truthy(values[0])
+    if operator == "$first":
+        return values[0][0] if isinstance(values[0], list) and values[0] else MISSING
+    if operator == "$ifNull":
+        return next((value for value in values if value is not MISSING and value is not None), None)
+    raise OperationFailure(f"Unrecognized expression '{operator}'")
+
+
+def _sort_spec(key_or_list, direction=None) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or ASCENDING)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [(key, key_direction) for key, key_direction in key_or_list]
+
+
+def sort_documents(documents: List[Dict[str, Any]], spec: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    # Stable sorts from the last key to the first give a multi-key sort with mixed directions
+    for field, direction in reversed(spec):
+        documents.sort(key=lambda document: _sort_key(_get_path(document, field)), reverse=direction < 0)
+    return documents
+
+
+def project(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply an inclusion or exclusion projection to a copy of the document"""
+    if not projection:
+        return _copy(document)
+    included = [field for field, value in projection.items() if value and field != "_id"]
+    if included:
+        result = {}
+        if projection.get("_id", 1) and "_id" in document:
+            result["_id"] = document["_id"]
+        for field in included:
+            value = _get_path(document, field)
+            if value is not MISSING:
+                _set_path(result, field, _copy(value))
+        return result
+    result = _copy(document)
+    for field, value in projection.items():
+        if not value:
+            _unset_path(result, field)
+    return result
+
+
+def _apply_set_stage(document: Dict[str, Any], fields: Dict[str, Any]):
+    values = {field: evaluate(document, expression) for field, expression in fields.items()}
+    for field, value in values.items():
+        if value is MISSING:
+            _unset_path(document, field)
+        else:
+            _set_path(document, field, _copy(value))
+
+
+def apply_update(document: Dict[str, Any], update, inserting: bool = False):
+    """Apply update operators or an update pipeline to a document in place"""
+    if isinstance(update, list):
+        for stage in update:
+            (name, argument), = stage.items()
+            if name in ("$set", "$addFields"):
+                _apply_set_stage(document, argument)
+            elif name == "$unset":
+                for field in [argument] if isinstance(argument, str) else argument:
+                    _unset_path(document, field)
+            else:
+                raise OperationFailure(f"{name} is not allowed to be used within an update")
+        return
+
+    for operator, fields in update.items():
+        if operator == "$set" or (operator == "$setOnInsert" and inserting):
+            for field, value in fields.items():
+                _set_path(document, field, _copy(value))
+        elif operator == "$setOnInsert":
+            continue
+        elif operator == "$unset":
+            for field in fields:
+                _unset_path(document, field)
+        elif operator == "$inc":
+            for field, amount in fields.items():
+                current = _get_path(document, field)
+                _set_path(document, field, (0 if current is MISSING else current) + amount)
+        elif operator == "$push":
+            for field, value in fields.items():
+                current = _get_path(document, field)
+                _set_path(document, field, ([] if current is MISSING else current) + [_copy(value)])
+        elif operator == "$currentDate":
+            for field in fields:
+                _set_path(document, field, datetime.utcnow())
+        else:
+            raise OperationFailure(f"Unknown modifier: {operator}")
+
+
+def _get_more_count(returned: int, limit: int = 0, batch_size: int = 0) -> int:
+    """getMore round trips a server cursor needs after its first batch; later batches without a size fill 16MB"""
+    first_batch = batch_size or FIRST_BATCH_SIZE
+    if limit:
+        first_batch = min(first_batch, limit)
+    remaining = max(0, returned - first_batch)
+    if not remaining:
+        return 0
+    return -(-remaining // batch_size) if batch_size else 1
+
+
+def _hashable(value) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+class HashIndex:
+    """Equality index on the first key of a MongoDB index: field value -> set of _ids"""
+
+    def __init__(self, name: str, field: str, unique: bool = False, partial_filter: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.field = field
+        self.unique = unique
+        self.partial_filter = partial_filter
+        self.entries: Dict[Any, Set[Any]] = defaultdict(set)
+        # Documents whose value cannot be hashed (arrays, subdocuments) are always candidates
+        self.unhashable: Set[Any] = set()
+
+    def _key(self, document):
+        value = _get_path(document, self.field)
+        return None if value is MISSING else value
+
+    def _covers(self, document) -> bool:
+        return self.partial_filter is None or matches(document, self.partial_filter)
+
+    def add(self, document):
+        if not self._covers(document):
+            return
+        key = self._key(document)
+        if not _hashable(key):
+            self.unhashable.add(document["_id"])
+            return
+        if self.unique and key is not None and self.entries.get(key):
+            raise DuplicateKeyError(f"E11000 duplicate key error index: {self.name} dup key: {{ {self.field}: {key!r} }}", 11000)
+        self.entries[key].add(document["_id"])
+
+    def remove(self, document):
+        key = self._key(document)
+        self.unhashable.discard(document["_id"])
+        if _hashable(key) and key in self.entries:
+            self.entries[key].discard(document["_id"])
+            if not self.entries[key]:
+                del self.entries[key]
+
+    def lookup(self, values: Iterable[Any]) -> Set[Any]:
+        ids = set(self.unhashable)
+        for value in values:
+            if _hashable(value):
+                ids |= self.entries.get(value, set())
+        return ids
+
+
+class InMemoryCursor:
+    """Motor cursor stand-in; the query runs on first read, once sort, skip and limit are known"""
+
+    def __init__(self, collection: "InMemoryCollection", query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None):
+        self.collection = collection
+        self.query = query or {}
+        self.projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._max_time_ms: Optional[int] = None
+        self._batch_size = 0
+        self._results: Optional[List[Dict[str, Any]]] = None
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = _sort_spec(key_or_list, direction)
+        return self
+
+    def skip(self, skip: int):
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int):
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int):
+        self._batch_size = batch_size
+        return self
+
+    def max_time_ms(self, max_time_ms: Optional[int]):
+        self._max_time_ms = max_time_ms
+        return self
+
+    def _execute(self) -> List[Dict[str, Any]]:
+        if self._results is None:
+            documents = self.collection._select(self.query, self._max_time_ms)
+            if self._sort:
+                documents = sort_documents(documents, self._sort)
+            documents = documents[self._skip:]
+            if self._limit:
+                documents = documents[:self._limit]
+            self._results = [project(document, self.projection) for document in documents]
+            self.collection.database.log_command("find", self.collection.name, _get_more_count(len(self._results), self._limit, self._batch_size))
+        return self._results
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        results = self._execute()
+        return results if length is None else results[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self._execute():
+            yield document
+
+
+class InMemoryCommandCursor:
+    """Motor aggregation cursor stand-in over precomputed results"""
+
+    def __init__(self, collection: "InMemoryCollection", run: Callable[[], List[Dict[str, Any]]]):
+        self.collection = collection
+        self._run = run
+        self._batch_size = 0
+        self._results: Optional[List[Dict[str, Any]]] = None
+
+    def _execute(self) -> List[Dict[str, Any]]:
+        if self._results is None:
+            self._results = self._run()
+            self.collection.database.log_command("aggregate", self.collection.name, _get_more_count(len(self._results), batch_size=self._batch_size))
+        return self._results
+
+    def batch_size(self, batch_size: int):
+        self._batch_size = batch_size
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        results = self._execute()
+        return results if length is None else results[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self._execute():
+            yield document
+
+
+class InMemoryCollection:
+    """
+    A collection kept in a dict keyed by _id, with the Motor collection methods the
+    repositories use. Indexes are hash maps from a field's value to _ids, so equality
+    and $in filters on indexed fields touch only the matching documents.
+    """
+
+    def __init__(self, database: "InMemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self.documents: Dict[Any, Dict[str, Any]] = {}
+        # Insertion sequence of each _id, so index lookups return documents in natural order
+        self.positions: Dict[Any, int] = {}
+        self._next_position = 0
+        self.indexes: Dict[str, HashIndex] = {}
+        self.index_specs: Dict[str, Dict[str, Any]] = {}
+
+    # Indexes
+
+    async def create_index(self, keys, **kwargs) -> str:
+        spec = _sort_spec(keys)
+        name = kwargs.get("name") or "_".join(f"{field}_{direction}" for field, direction in spec)
+        if name in self.index_specs:
+            return name
+        self.index_specs[name] = {"key": spec, **kwargs}
+        # TTL expiry is not emulated; documents stay until deleted
+        index = HashIndex(name, spec[0][0], kwargs.get("unique", False), kwargs.get("partialFilterExpression"))
+        for document in self.documents.values():
+            index.add(document)
+        self.indexes[name] = index
+        return name
+
+    async def drop_indexes(self):
+        self.indexes.clear()
+        self.index_specs.clear()
+
+    async def index_information(self) -> Dict[str, Dict[str, Any]]:
+        return {"_id_": {"key": [("_id", ASCENDING)]}, **{name: dict(spec) for name, spec in self.index_specs.items()}}
+
+    def _index_for(self, field: str) -> Optional[HashIndex]:
+        for index in self.indexes.values():
+            if index.field == field and index.partial_filter is None:
+                return index
+        return None
+
+    # Reads
+
+    def _candidates(self, query: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+        """Documents that may match: narrowed by _id or an indexed equality/$in filter when there is one"""
+        for field, condition in query.items():
+            if field.startswith("$"):
+                continue
+            if _is_operator_dict(condition):
+                if set(condition) - {"$in", "$eq"}:
+                    continue
+                values = condition.get("$in", []) if "$in" in condition else [condition["$eq"]]
+            elif isinstance(condition, (dict, list, re.Pattern)):
+                continue
+            else:
+                values = [condition]
+
+            if field == "_id":
+                ids = {value for value in values if _hashable(value)}
+            else:
+                index = self._index_for(field)
+                if index is None:
+                    continue
+                ids = index.lookup(values)
+            # Natural order, which is what an unsorted collection scan returns
+            found = sorted((document_id for document_id in ids if document_id in self.documents), key=self.positions.__getitem__)
+            return [self.documents[document_id] for document_id in found]
+        return self.documents.values()
+
+    def _select(self, query: Dict[str, Any], max_time_ms: Optional[int] = None) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        documents = [document for document in self._candidates(query or {}) if matches(document, query or {})]
+        if max_time_ms is not None and (time.perf_counter() - started) * 1000 > max_time_ms:
+            raise ExecutionTimeout("operation exceeded time limit", 50)
+        return documents
+
+    def find(self, filter: Dict[str, Any] = None, projection: Dict[str, Any] = None) -> InMemoryCursor:
+        return InMemoryCursor(self, filter, projection)
+
+    async def find_one(self, filter: Dict[str, Any] = None, projection: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        documents = await self.find(filter, projection).limit(1).to_list(length=1)
+        return documents[0] if documents else None
+
+    async def count_documents(self, filter: Dict[str, Any], skip: int = 0, limit: int = 0, maxTimeMS: Optional[int] = None, **kwargs) -> int:
+        # The driver counts with an aggregation
+        self.database.log_command("aggregate", self.name)
+        count = max(0, len(self._select(filter, maxTimeMS)) - skip)
+        return min(count, limit) if limit else count
+
+    async def estimated_document_count(self) -> int:
+        self.database.log_command("count", self.name)
+        return len(self.documents)
+
+    async def distinct(self, key: str, filter: Dict[str, Any] = None) -> List[Any]:
+        self.database.log_command("distinct", self.name)
+        values = []
+        for document in self._select(filter or {}):
+            value = _get_path(document, key)
+            if value is not MISSING and value not in values:
+                values.append(value)
+        return values
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], maxTimeMS: Optional[int] = None, **kwargs) -> InMemoryCommandCursor:
+        return InMemoryCommandCursor(self, lambda: self._run_pipeline(pipeline, maxTimeMS))
+
+    def _run_pipeline(self, pipeline: List[Dict[str, Any]], max_time_ms: Optional[int]) -> List[Dict[str, Any]]:
+        stages = list(pipeline)
+        # A leading $match can use the indexes, as it would on the server
+        query = stages.pop(0)["$match"] if stages and "$match" in stages[0] else {}
+        documents = [_copy(document) for document in self._select(query, max_time_ms)]
+        for stage in stages:
+            (name, argument), = stage.items()
+            if name == "$match":
+                documents = [document for document in documents if matches(document, argument)]
+            elif name == "$sort":
+                documents = sort_documents(documents, _sort_spec(argument))
+            elif name == "$skip":
+                documents = documents[argument:]
+            elif name == "$limit":
+                documents = documents[:argument]
+            elif name == "$project":
+                documents = [project(document, argument) for document in documents]
+            elif name in ("$set", "$addFields"):
+                for document in documents:
+                    _apply_set_stage(document, argument)
+            elif name == "$unset":
+                for document in documents:
+                    for field in [argument] if isinstance(argument, str) else argument:
+                        _unset_path(document, field)
+            elif name == "$lookup":
+                documents = self._lookup(documents, argument)
+            elif name == "$count":
+                documents = [{argument: len(documents)}] if documents else []
+            else:
+                raise OperationFailure(f"Unrecognized pipeline stage name: '{name}'")
+        return documents
+
+    def _lookup(self, documents: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+        foreign = self.database[spec["from"]]
+        for document in documents:
+            value = _get_path(document, spec["localField"])
+            values = value if isinstance(value, list) else [None if value is MISSING else value]
+            joined = foreign._select({spec["foreignField"]: {"$in": values}})
+            _set_path(document, spec["as"], [_copy(item) for item in joined])
+        return documents
+
+    # Writes
+
+    def _insert(self, document: Dict[str, Any]):
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        if document["_id"] in self.documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_ dup key: {{ _id: {document['_id']!r} }}", 11000)
+        stored = _copy(document)
+        added = []
+        try:
+            for index in self.indexes.values():
+                index.add(stored)
+                added.append(index)
+        except DuplicateKeyError:
+            for index in added:
+                index.remove(stored)
+            raise
+        self.documents[stored["_id"]] = stored
+        self.positions[stored["_id"]] = self._next_position
+        self._next_position += 1
+
+    def _replace(self, old: Dict[str, Any], new: Dict[str, Any]):
+        for index in self.indexes.values():
+            index.remove(old)
+        added = []
+        try:
+            for index in self.indexes.values():
+                index.add(new)
+                added.append(index)
+        except DuplicateKeyError:
+            for index in added:
+                index.remove(new)
+            for index in self.indexes.values():
+                index.add(old)
+            raise
+        self.documents[new["_id"]] = new
+
+    def _delete(self, document: Dict[str, Any]):
+        for index in self.indexes.values():
+            index.remove(document)
+        del self.documents[document["_id"]]
+        del self.positions[document["_id"]]
+
+    async def insert_one(self, document: Dict[str, Any], **kwargs) -> InsertOneResult:
+        self.database.log_command("insert", self.name)
+        self._insert(document)
+        return InsertOneResult(document["_id"], True)
+
+    async def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True, **kwargs) -> InsertManyResult:
+        self.database.log_command("insert", self.name)
+        write_errors = []
+        inserted = 0
+        for position, document in enumerate(documents):
+            try:
+                self._insert(document)
+                inserted += 1
+            except DuplicateKeyError as error:
+                write_errors.append({"index": position, "code": 11000, "errmsg": str(error), "op": document})
+                if ordered:
+                    break
+        if write_errors:
+            raise BulkWriteError(_bulk_result(n_inserted=inserted, write_errors=write_errors))
+        return InsertManyResult([document["_id"] for document in documents], True)
+
+    def _update(self, filter: Dict[str, Any], update, upsert: bool, multi: bool) -> Dict[str, Any]:
+        matched = self._select(filter)
+        if not multi:
+            matched = matched[:1]
+        modified = 0
+        for document in matched:
+            updated = _copy(document)
+            apply_update(updated, update)
+            if updated.get("_id") != document["_id"]:
+                raise OperationFailure("Performing an update on the path '_id' would modify the immutable field '_id'", 66)
+            if updated != document:
+                self._replace(document, updated)
+                modified += 1
+        result = {"n": len(matched), "nModified": modified}
+        if not matched and upsert:
+            document = {
+                field: _copy(condition) for field, condition in filter.items()
+                if not field.startswith("$") and not _is_operator_dict(condition)
+            }
+            apply_update(document, update, inserting=True)
+            self._insert(document)
+            result.update({"n": 1, "upserted": document["_id"]})
+        return result
+
+    async def update_one(self, filter: Dict[str, Any], update, upsert: bool = False, **kwargs) -> UpdateResult:
+        self.database.log_command("update", self.name)
+        return UpdateResult(self._update(filter, update, upsert, multi=False), True)
+
+    async def update_many(self, filter: Dict[str, Any], update, upsert: bool = False, **kwargs) -> UpdateResult:
+        self.database.log_command("update", self.name)
+        return UpdateResult(self._update(filter, update, upsert, multi=True), True)
+
+    async def replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False, **kwargs) -> UpdateResult:
+        self.database.log_command("update", self.name)
+        return self._replace_one(filter, replacement, upsert)
+
+    def _replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool) -> UpdateResult:
+        matched = self._select(filter)[:1]
+        if matched:
+            new = {**_copy(replacement), "_id": matched[0]["_id"]}
+            modified = int(new != matched[0])
+            self._replace(matched[0], new)
+            return UpdateResult({"n": 1, "nModified": modified}, True)
+        if upsert:
+            document = _copy(replacement)
+            self._insert(document)
+            return UpdateResult({"n": 1, "nModified": 0, "upserted": document["_id"]}, True)
+        return UpdateResult({"n": 0, "nModified": 0}, True)
+
+    async def delete_one(self, filter: Dict[str, Any], **kwargs) -> DeleteResult:
+        self.database.log_command("delete", self.name)
+        matched = self._select(filter)[:1]
+        for document in matched:
+            self._delete(document)
+        return DeleteResult({"n": len(matched)}, True)
+
+    async def delete_many(self, filter: Dict[str, Any], **kwargs) -> DeleteResult:
+        self.database.log_command("delete", self.name)
+        matched = self._select(filter)
+        for document in matched:
+            self._delete(document)
+        return DeleteResult({"n": len(matched)}, True)
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs) -> BulkWriteResult:
+        """Apply pymongo write models (InsertOne, UpdateOne, UpdateMany, DeleteOne, DeleteMany, ReplaceOne)"""
+        # The driver sends one command per run of same-kind requests, or per kind when unordered
+        kinds = [BULK_COMMANDS.get(type(request).__name__) for request in requests]
+        runs = [kind for position, kind in enumerate(kinds) if position == 0 or kind != kinds[position - 1]]
+        for kind in runs if ordered else dict.fromkeys(kinds):
+            self.database.log_command(kind or "unknown", self.name)
+        
+        counts = defaultdict(int)
+        upserted = []
+        write_errors = []
+        for position, request in enumerate(requests):
+            operation = type(request).__name__
+            document = request._doc if operation == "InsertOne" else None
+            filter = getattr(request, "_filter", None)
+            try:
+                if operation == "InsertOne":
+                    self._insert(document)
+                    counts["nInserted"] += 1
+                elif operation in ("UpdateOne", "UpdateMany"):
+                    result = self._update(filter, request._doc, bool(request._upsert), multi=operation == "UpdateMany")
+                    if "upserted" in result:
+                        counts["nUpserted"] += 1
+                        upserted.append({"index": position, "_id": result["upserted"]})
+                    else:
+                        counts["nMatched"] += result["n"]
+                        counts["nModified"] += result["nModified"]
+                elif operation == "ReplaceOne":
+                    result = self._replace_one(filter, request._doc, bool(request._upsert))
+                    if result.upserted_id is not None:
+                        counts["nUpserted"] += 1
+                        upserted.append({"index": position, "_id": result.upserted_id})
+                    else:
+                        counts["nMatched"] += result.matched_count
+                        counts["nModified"] += result.modified_count
+                elif operation in ("DeleteOne", "DeleteMany"):
+                    matched = self._select(filter)
+                    for match in matched if operation == "DeleteMany" else matched[:1]:
+                        self._delete(match)
+                        counts["nRemoved"] += 1
+                else:
+                    raise OperationFailure(f"Unsupported bulk write operation: {operation}")
+            except DuplicateKeyError as error:
+                write_errors.append({"index": position, "code": 11000, "errmsg": str(error), "op": document or filter})
+                if ordered:
+                    break
+        result = _bulk_result(
+            n_inserted=counts["nInserted"],
+            n_upserted=counts["nUpserted"],
+            n_matched=counts["nMatched"],
+            n_modified=counts["nModified"],
+            n_removed=counts["nRemoved"],
+            upserted=upserted,
+            write_errors=write_errors
+        )
+        if write_errors:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    async def drop(self):
+        self.documents.clear()
+        self.positions.clear()
+        self.indexes.clear()
+        self.index_specs.clear()
+
+
+def _bulk_result(
+    n_inserted: int = 0,
+    n_upserted: int = 0,
+    n_matched: int = 0,
+    n_modified: int = 0,
+    n_removed: int = 0,
+    upserted: Optional[List[Dict[str, Any]]] = None,
+    write_errors: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    return {
+        "writeErrors": write_errors or [],
+        "writeConcernErrors": [],
+        "nInserted": n_inserted,
+        "nUpserted": n_upserted,
+        "nMatched": n_matched,
+        "nModified": n_modified,
+        "nRemoved": n_removed,
+        "upserted": upserted or [],
+    }
+
+
+class InMemoryDatabase:
+    """Motor database stand-in holding InMemoryCollections, for tests and benchmarks without a MongoDB server"""
+
+    def __init__(self, name: str = "test"):
+        self.name = name
+        self.collections: Dict[str, InMemoryCollection] = {}
+        # (command, collection) of each round trip a server would have seen, while set to a list
+        self.command_log: Optional[List[Tuple[str, str]]] = None
+
+    def log_command(self, command: str, collection: str, get_mores: int = 0):
+        if self.command_log is not None:
+            self.command_log.append((command, collection))
+            self.command_log.extend(("getMore", collection) for _ in range(get_mores))
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        if name not in self.collections:
+            self.collections[name] = InMemoryCollection(self, name)
+        return self.collections[name]
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self.collections)
+
+    async def drop_collection(self, name: str):
+        self.collections.pop(name, None)
+
+    async def command(self, command, *args, **kwargs) -> Dict[str, Any]:
+        if command == "ping":
+            self.log_command("ping", "")
+            return {"ok": 1.0}
+        raise OperationFailure(f"no such command: '{command}'", 59)
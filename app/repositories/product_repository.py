@@ -1,14 +1,107 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
 from .base import BaseRepository
+from ..config.settings import settings
+
+PRODUCT_KIND = "p"
+TOMBSTONE_KIND = "t"
 
 
 class ProductRepository(BaseRepository):
     def __init__(self, database):
         super().__init__(database, "products")
+        self.tombstones = database["product_tombstones"]
+
+    async def ensure_indexes(self):
+        """Create the indexes used by the delta sync feed, price browsing, autocomplete, name and category lookups and the low-stock view"""
+        await self.collection.create_index([("updated_at", ASCENDING), ("_id", ASCENDING)])
+        await self.collection.create_index([("price", ASCENDING), ("_id", ASCENDING)])
+        await self.collection.create_index("name_lower")
+        await self.collection.create_index("name")
+        await self.collection.create_index("category")
+        await self.tombstones.create_index([("deleted_at", ASCENDING), ("_id", ASCENDING)])
+        await self.tombstones.create_index(
+            "deleted_at",
+            name="deleted_at_ttl",
+            expireAfterSeconds=settings.sync_tombstone_retention_days * 24 * 3600
+        )
+        
+        # Products created before the feed existed have no updated_at yet
+        await self.collection.update_many(
+            {"updated_at": None},
+            [{"$set": {"updated_at": "$created_at"}}]
+        )
+        
+        # Products created before autocomplete existed have no normalized name yet
+        await self._backfill_name_lower()
+        
+        # Low-stock view: only flagged active products are kept in this partial index
+        await self.collection.create_index(
+            [("stock_quantity", ASCENDING), ("_id", ASCENDING)],
+            name="low_stock_view",
+            partialFilterExpression={"low_stock": True, "is_active": True}
+        )
+
+    async def refresh_low_stock_flags(self) -> int:
+        """
+        Recompute every product's low-stock flag against the current threshold, for products written
+        before the flag existed or after the threshold changed. Scans the whole collection, so it is
+        run on demand (python -m app.cli refresh-low-stock) rather than on startup.
+        """
+        is_low_stock = {"$lte": ["$stock_quantity", settings.low_stock_threshold]}
+        result = await self.collection.update_many(
+            {"$expr": {"$ne": ["$low_stock", is_low_stock]}},
+            [{"$set": {"low_stock": is_low_stock}}]
+        )
+        return result.modified_count
+
+    async def create(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new product; updated_at starts at created_at so the change feed sees it"""
+        now = datetime.utcnow()
+        document["created_at"] = now
+        document["updated_at"] = now
+        self._set_low_stock_flag(document)
+        return await super().create(document)
+
+    async def create_many(self, documents: List[Dict[str, Any]]) -> List[ObjectId]:
+        """Insert products in one batch, with the same derived fields as create"""
+        now = datetime.utcnow()
+        for document in documents:
+            document["created_at"] = now
+            document["updated_at"] = now
+            self._set_low_stock_flag(document)
+        return await super().create_many(documents)
+
+    async def upsert_many(self, key_field: str, documents: List[Dict[str, Any]], defaults: Optional[Dict[str, Any]] = None):
+        """Insert or update products in one batch, keeping the low-stock flag in step"""
+        for document in documents:
+            self._set_low_stock_flag(document)
+        return await super().upsert_many(key_field, documents, defaults)
+
+    async def update(self, document_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update product, keeping the low-stock flag in step with stock_quantity"""
+        self._set_low_stock_flag(update_data)
+        return await super().update(document_id, update_data)
+
+    def _set_low_stock_flag(self, data: Dict[str, Any]):
+        if "stock_quantity" in data:
+            data["low_stock"] = data["stock_quantity"] <= settings.low_stock_threshold
 
     async def get_by_name(self, name: str) -> Optional[Dict[str, Any]]:
         """Get product by name"""
-        return await self.collection.find_one({"name": name})
+        return await self._find_one({"name": name})
+
+    async def autocomplete(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get active products whose normalized name starts with prefix, in name order"""
+        return await self.get_by_prefix(
+            "name_lower",
+            prefix,
+            limit=limit,
+            filters={"is_active": True},
+            projection={"name": 1, "name_lower": 1}
+        )
 
     async def get_by_category(self, category: str, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
         """Get products by category"""
@@ -33,15 +126,113 @@ class ProductRepository(BaseRepository):
         query = {"price": {"$gte": min_price, "$lte": max_price}}
         return await self.get_all(skip=skip, limit=limit, filters=query)
 
+    async def get_price_range_page(
+        self,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        descending: bool = False,
+        after: Optional[Tuple[float, str]] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Get products within a price range ordered by (price, _id), continuing after a
+        (price, id) keyset. Returns up to limit + 1 documents so callers can tell if more exist.
+        """
+        lower, upper = min_price, max_price
+        query: Dict[str, Any] = {}
+        if after is not None:
+            after_price, after_id = after
+            # Narrow the index range to the keyset and only filter ties on _id
+            if descending:
+                upper = after_price if upper is None else min(upper, after_price)
+                query["$or"] = [{"price": {"$lt": after_price}}, {"_id": {"$lt": ObjectId(after_id)}}]
+            else:
+                lower = after_price if lower is None else max(lower, after_price)
+                query["$or"] = [{"price": {"$gt": after_price}}, {"_id": {"$gt": ObjectId(after_id)}}]
+        
+        price_bounds = {}
+        if lower is not None:
+            price_bounds["$gte"] = lower
+        if upper is not None:
+            price_bounds["$lte"] = upper
+        if price_bounds:
+            query["price"] = price_bounds
+        
+        direction = DESCENDING if descending else ASCENDING
+        cursor = self._find(query).sort([("price", direction), ("_id", direction)]).limit(limit + 1)
+        return await cursor.to_list(length=limit + 1)
+
+    async def get_all_with_brand(self, skip: int = 0, limit: int = 100, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Get products with their brand document joined server-side through $lookup"""
+        pipeline = [
+            {"$match": filters or {}},
+            {"$skip": skip},
+            {"$limit": limit},
+            {"$lookup": {"from": "brand", "localField": "brand_id", "foreignField": "_id", "as": "brand"}},
+            {"$set": {"brand": {"$first": "$brand"}}},
+        ]
+        return await self._aggregate(pipeline).to_list(length=limit)
+
     async def get_low_stock_products(self, threshold: int = 10, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
         """Get products with low stock"""
         query = {"stock_quantity": {"$lte": threshold}, "is_active": True}
         return await self.get_all(skip=skip, limit=limit, filters=query)
 
+    async def get_low_stock_view(self, threshold: int, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get active low-stock products, lowest stock first, from the low-stock partial index"""
+        if threshold > settings.low_stock_threshold:
+            # Thresholds above the maintained one are not covered by the view
+            return await self.get_low_stock_products(threshold=threshold, skip=skip, limit=limit)
+        
+        query = {"low_stock": True, "is_active": True, "stock_quantity": {"$lte": threshold}}
+        cursor = self._find(query).sort(
+            [("stock_quantity", ASCENDING), ("_id", ASCENDING)]
+        ).skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
+
     async def name_exists(self, name: str) -> bool:
         """Check if product name already exists"""
         return await self.exists({"name": name})
 
     async def update_stock(self, product_id: str, new_quantity: int) -> Optional[Dict[str, Any]]:
         """Update product stock quantity"""
-        return await self.update(product_id, {"stock_quantity": new_quantity})
\ No newline at end of file
+        return await self.update(product_id, {"stock_quantity": new_quantity})
+
+    async def add_tombstone(self, product_id: str):
+        """Record a deleted product so delta sync clients can drop it"""
+        await self.tombstones.insert_one({"product_id": product_id, "deleted_at": datetime.utcnow()})
+
+    async def get_changes_since(
+        self,
+        since: datetime,
+        after: Optional[Tuple[str, str]] = None,
+        until: Optional[datetime] = None,
+        limit: int = 500
+    ) -> List[Tuple[datetime, str, Dict[str, Any]]]:
+        """
+        Get products changed and tombstones recorded after a watermark, oldest first.
+        The watermark is (since, kind, id); events are ordered by (timestamp, kind, id)
+        and returned as (timestamp, kind, document) tuples.
+        """
+        products = await self._find_after(self.collection, "updated_at", PRODUCT_KIND, since, after, until, limit)
+        tombstones = await self._find_after(self.tombstones, "deleted_at", TOMBSTONE_KIND, since, after, until, limit)
+        
+        events = [(product["updated_at"], PRODUCT_KIND, product) for product in products]
+        events += [(tombstone["deleted_at"], TOMBSTONE_KIND, tombstone) for tombstone in tombstones]
+        events.sort(key=lambda event: (event[0], event[1], event[2]["_id"]))
+        return events[:limit + 1]
+
+    async def _find_after(self, collection, field: str, kind: str, since: datetime, after, until, limit: int):
+        after_kind, after_id = after or (None, None)
+        if after_kind == kind:
+            query = {"$or": [{field: {"$gt": since}}, {field: since, "_id": {"$gt": ObjectId(after_id)}}]}
+        elif after_kind is not None and after_kind > kind:
+            query = {field: {"$gt": since}}
+        else:
+            query = {field: {"$gte": since}}
+        
+        if until is not None:
+            query = {"$and": [query, {field: {"$lte": until}}]}
+        
+        cursor = self._find(query, collection=collection).sort([(field, ASCENDING), ("_id", ASCENDING)]).limit(limit + 1)
+        return await cursor.to_list(length=limit + 1)
@@ -4,16 +4,24 @@ from ..models.user import User
 
 
 class UserRepository(BaseRepository):
+    # User documents carry password hashes
+    cacheable = False
+
     def __init__(self, database):
         super().__init__(database, "users")
 
+    async def ensure_indexes(self):
+        """Create the indexes used by login and the username/email existence checks"""
+        await self.collection.create_index("username")
+        await self.collection.create_index("email")
+
     async def get_by_username(self, username: str) -> Optional[Dict[str, Any]]:
         """Get user by username"""
-        return await self.collection.find_one({"username": username})
+        return await self._find_one({"username": username})
 
     async def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Get user by email"""
-        return await self.collection.find_one({"email": email})
+        return await self._find_one({"email": email})
 
     async def username_exists(self, username: str) -> bool:
         """Check if username already exists"""
@@ -7,8 +7,9 @@ from ..repositories.user_repository import UserRepository
 from ..utils.security import create_access_token
 from ..config.database import get_database
 from ..config.settings import settings
+from ..monitoring.tracing import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.post("/login", response_model=Token)
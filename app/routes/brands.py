@@ -1,13 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from typing import List, Optional
-from ..models.brand import Brand, BrandCreate, BrandUpdate, BrandResponse
+from ..models.brand import Brand, BrandCreate, BrandUpdate, BrandResponse, BrandSuggestion
 from ..models.user import User
 from ..services.brand_service import BrandService
 from ..repositories.brand_repository import BrandRepository
-from ..utils.dependencies import get_current_active_user
+from ..utils.dependencies import get_current_active_user, get_ids_query, search_deadline, bulk_deadline
+from ..utils.bulk_io import export_response
+from ..utils.deadline import set_deadline
+from ..utils.http_cache import (
+    document_validators, has_conditional_headers, is_not_modified,
+    list_validators, not_modified_response, set_cache_headers
+)
 from ..config.database import get_database
+from ..config.settings import settings
+from ..monitoring.tracing import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.post("/", response_model=BrandResponse, status_code=status.HTTP_201_CREATED)
@@ -27,41 +35,110 @@ async def create_brand(
 
 @router.get("/", response_model=List[BrandResponse])
 async def get_brands(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of brands to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of brands to return"),
     search: Optional[str] = Query(None, description="Search in name and description"),
     active_only: bool = Query(False, description="Return only active brands"),
+    ids: Optional[List[str]] = Depends(get_ids_query),
     db = Depends(get_database),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Get all brands with optional filtering and pagination
+    Get all brands with optional filtering and pagination.
+    Supports conditional GET via ETag/If-None-Match.
     """
     brand_repository = BrandRepository(db)
     brand_service = BrandService(brand_repository)
     
     # Handle different filtering options
-    if search:
-        return await brand_service.search_brands(search, skip=skip, limit=limit)
+    if ids is not None:
+        brands_page = await brand_service.get_brands_by_ids(ids)
+    elif search:
+        set_deadline(settings.search_deadline_seconds)
+        brands_page = await brand_service.search_brands(search, skip=skip, limit=limit)
     elif active_only:
-        return await brand_service.get_active_brands(skip=skip, limit=limit)
+        brands_page = await brand_service.get_active_brands(skip=skip, limit=limit)
     else:
-        return await brand_service.get_all_brands(skip=skip, limit=limit)
+        brands_page = await brand_service.get_all_brands(skip=skip, limit=limit)
+    
+    etag, last_modified = list_validators(brands_page)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    set_cache_headers(response, etag, last_modified)
+    return brands_page
+
+
+@router.get("/autocomplete", response_model=List[BrandSuggestion])
+async def autocomplete_brands(
+    q: str = Query(..., min_length=1, max_length=200, description="Name prefix typed so far"),
+    limit: int = Query(10, ge=1, le=20, description="Number of suggestions to return"),
+    db = Depends(get_database),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Suggest active brand names starting with the given prefix (case-insensitive)
+    """
+    brand_repository = BrandRepository(db)
+    brand_service = BrandService(brand_repository)
+    
+    return await brand_service.autocomplete_brands(q, limit=limit)
+
+
+@router.get("/export", dependencies=[Depends(bulk_deadline)])
+async def export_brands(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to export; defaults to all"),
+    active_only: bool = Query(False, description="Export only active brands"),
+    gzip: bool = Query(False, description="Gzip the file"),
+    batch_size: int = Query(settings.export_batch_size, ge=1, le=settings.export_max_batch_size, description="Documents fetched and written per batch"),
+    db = Depends(get_database),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Export brands as NDJSON or CSV (with header row), streamed one batch at a time
+    """
+    brand_repository = BrandRepository(db)
+    brand_service = BrandService(brand_repository)
+    
+    body = brand_service.export_brands(
+        format,
+        fields=fields,
+        active_only=active_only,
+        compress=gzip,
+        batch_size=batch_size
+    )
+    return export_response(body, "brands", format, compress=gzip)
 
 
 @router.get("/{brand_id}", response_model=BrandResponse)
 async def get_brand(
     brand_id: str,
+    request: Request,
+    response: Response,
     db = Depends(get_database),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Get a specific brand by ID
+    Get a specific brand by ID.
+    Conditional requests are answered from the brand's _id and timestamps only.
     """
     brand_repository = BrandRepository(db)
     brand_service = BrandService(brand_repository)
     
-    return await brand_service.get_brand_by_id(brand_id)
+    if has_conditional_headers(request):
+        version = await brand_service.get_brand_version(brand_id)
+        if version is not None:
+            etag, last_modified = document_validators(
+                str(version["_id"]), version.get("created_at"), version.get("updated_at")
+            )
+            if is_not_modified(request, etag, last_modified):
+                return not_modified_response(etag, last_modified)
+    
+    brand = await brand_service.get_brand_by_id(brand_id)
+    set_cache_headers(response, *document_validators(brand.id, brand.created_at, brand.updated_at))
+    return brand
 
 
 @router.put("/{brand_id}", response_model=BrandResponse)
@@ -99,18 +176,21 @@ async def delete_brand(
             detail="Failed to delete brand"
         )
 
-@router.get("/search/{search_term}", response_model=List[BrandResponse])
+@router.get("/search/{search_term}", response_model=List[BrandResponse], dependencies=[Depends(search_deadline)])
 async def search_brands(
     search_term: str,
     skip: int = Query(0, ge=0, description="Number of brands to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of brands to return"),
+    mode: str = Query("substring", pattern="^(substring|fuzzy)$", description="substring, or fuzzy for typo-tolerant name matching"),
     db = Depends(get_database),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Search brands by name or description
+    Search brands by name or description, or by typo-tolerant name similarity with mode=fuzzy
     """
     brand_repository = BrandRepository(db)
     brand_service = BrandService(brand_repository)
     
+    if mode == "fuzzy":
+        return await brand_service.fuzzy_search_brands(search_term, skip=skip, limit=limit)
     return await brand_service.search_brands(search_term, skip=skip, limit=limit)
\ No newline at end of file
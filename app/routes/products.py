@@ -1,13 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from typing import List, Optional
-from ..models.product import Product, ProductCreate, ProductUpdate, ProductResponse
+from ..models.product import Product, ProductCreate, ProductUpdate, ProductResponse, ProductChanges, ProductPage, ProductSuggestion
 from ..models.user import User
+from ..models.bulk import ImportResult
 from ..services.product_service import ProductService
 from ..repositories.product_repository import ProductRepository
-from ..utils.dependencies import get_current_active_user
+from ..repositories.brand_repository import BrandRepository
+from ..utils.dependencies import get_current_active_user, get_ids_query, get_expand_query, search_deadline, bulk_deadline
+from ..utils.deadline import set_deadline
+from ..utils.bulk_io import ImportFormatError, detect_format, export_response, iter_records
+from ..utils.http_cache import (
+    document_validators, has_conditional_headers, is_not_modified,
+    list_validators, not_modified_response, set_cache_headers
+)
+from ..cache.query_cache import use_query_cache
 from ..config.database import get_database
+from ..config.settings import settings
+from ..monitoring.tracing import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
@@ -20,51 +31,228 @@ async def create_product(
     Create a new product
     """
     product_repository = ProductRepository(db)
-    product_service = ProductService(product_repository)
+    brand_repository = BrandRepository(db)
+    product_service = ProductService(product_repository, brand_repository)
     
     return await product_service.create_product(product_create)
 
 
-@router.get("/", response_model=List[ProductResponse])
+@router.post("/import", response_model=ImportResult, dependencies=[Depends(bulk_deadline)])
+async def import_products(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="csv or ndjson; defaults to the Content-Type"),
+    mode: str = Query("insert", pattern="^(insert|upsert)$", description="insert rejects existing names, upsert updates them"),
+    chunk_size: int = Query(settings.import_chunk_size, ge=1, le=settings.import_max_chunk_size, description="Rows validated and written per batch"),
+    db = Depends(get_database),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Import products from a CSV (with header row) or NDJSON request body, streamed in chunks.
+    Invalid rows are skipped and reported with their row number.
+    """
+    try:
+        import_format = detect_format(format, request.headers.get("content-type"))
+    except ImportFormatError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    product_repository = ProductRepository(db)
+    brand_repository = BrandRepository(db)
+    product_service = ProductService(product_repository, brand_repository)
+    
+    return await product_service.import_products(
+        iter_records(request.stream(), import_format),
+        upsert=mode == "upsert",
+        chunk_size=chunk_size,
+        max_errors=settings.import_max_errors
+    )
+
+
+@router.get("/export", dependencies=[Depends(bulk_deadline)])
+async def export_products(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to export; defaults to all"),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    active_only: bool = Query(False, description="Export only active products"),
+    gzip: bool = Query(False, description="Gzip the file"),
+    batch_size: int = Query(settings.export_batch_size, ge=1, le=settings.export_max_batch_size, description="Documents fetched and written per batch"),
+    db = Depends(get_database),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Export products as NDJSON or CSV (with header row), streamed one batch at a time
+    """
+    product_repository = ProductRepository(db)
+    product_service = ProductService(product_repository)
+    
+    body = product_service.export_products(
+        format,
+        fields=fields,
+        category=category,
+        active_only=active_only,
+        compress=gzip,
+        batch_size=batch_size
+    )
+    return export_response(body, "products", format, compress=gzip)
+
+
+@router.get("/", response_model=List[ProductResponse], dependencies=[Depends(use_query_cache)])
 async def get_products(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of products to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of products to return"),
     category: Optional[str] = Query(None, description="Filter by category"),
     search: Optional[str] = Query(None, description="Search in name and description"),
     active_only: bool = Query(False, description="Return only active products"),
+    ids: Optional[List[str]] = Depends(get_ids_query),
+    expand: List[str] = Depends(get_expand_query),
     db = Depends(get_database),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Get all products with optional filtering and pagination
+    Get all products with optional filtering and pagination.
+    Supports conditional GET via ETag/If-None-Match.
     """
     product_repository = ProductRepository(db)
-    product_service = ProductService(product_repository)
+    brand_repository = BrandRepository(db)
+    product_service = ProductService(product_repository, brand_repository)
     
     # Handle different filtering options
-    if search:
-        return await product_service.search_products(search, skip=skip, limit=limit)
+    if ids is not None:
+        products_page = await product_service.get_products_by_ids(ids)
+    elif search:
+        set_deadline(settings.search_deadline_seconds)
+        products_page = await product_service.search_products(search, skip=skip, limit=limit)
     elif category:
-        return await product_service.get_products_by_category(category, skip=skip, limit=limit)
+        products_page = await product_service.get_products_by_category(category, skip=skip, limit=limit)
     elif active_only:
-        return await product_service.get_active_products(skip=skip, limit=limit)
+        products_page = await product_service.get_active_products(skip=skip, limit=limit)
     else:
-        return await product_service.get_all_products(skip=skip, limit=limit)
+        products_page = await product_service.get_all_products(skip=skip, limit=limit)
+    
+    if "brand" in expand:
+        await product_service.expand_brands(products_page)
+    
+    # Expanded brands are part of the representation, so they feed the validators too
+    etag, last_modified = list_validators(
+        products_page + [product.brand for product in products_page if product.brand]
+    )
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    set_cache_headers(response, etag, last_modified)
+    return products_page
+
+
+@router.get("/changes", response_model=ProductChanges)
+async def get_product_changes(
+    since: Optional[str] = Query(None, description="Sync token returned by the previous call; omit for a full sync"),
+    limit: int = Query(500, ge=1, le=5000, description="Maximum number of changes to return"),
+    db = Depends(get_database),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get products created, updated or deleted since a sync token.
+    Keep calling with next_token while has_more is true.
+    """
+    product_repository = ProductRepository(db)
+    product_service = ProductService(product_repository)
+    
+    return await product_service.get_product_changes(since, limit=limit)
+
+
+@router.get("/autocomplete", response_model=List[ProductSuggestion])
+async def autocomplete_products(
+    q: str = Query(..., min_length=1, max_length=200, description="Name prefix typed so far"),
+    limit: int = Query(10, ge=1, le=20, description="Number of suggestions to return"),
+    db = Depends(get_database),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Suggest active product names starting with the given prefix (case-insensitive)
+    """
+    product_repository = ProductRepository(db)
+    product_service = ProductService(product_repository)
+    
+    return await product_service.autocomplete_products(q, limit=limit)
+
+
+@router.get("/price-range", response_model=ProductPage)
+async def get_products_by_price_range(
+    min_price: Optional[float] = Query(None, ge=0, description="Minimum price (inclusive)"),
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum price (inclusive)"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="Sort by price ascending or descending"),
+    cursor: Optional[str] = Query(None, description="next_cursor returned by the previous page"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of products to return"),
+    db = Depends(get_database),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Browse products within a price range, sorted by price, with keyset pagination
+    """
+    product_repository = ProductRepository(db)
+    product_service = ProductService(product_repository)
+    
+    return await product_service.get_products_by_price_range(
+        min_price, max_price, descending=order == "desc", cursor=cursor, limit=limit
+    )
+
+
+@router.get("/low-stock", response_model=List[ProductResponse])
+async def get_low_stock_products(
+    threshold: Optional[int] = Query(None, ge=0, description="Stock threshold; defaults to the configured low-stock threshold"),
+    skip: int = Query(0, ge=0, description="Number of products to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of products to return"),
+    db = Depends(get_database),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get active products with low stock, lowest stock first
+    """
+    product_repository = ProductRepository(db)
+    product_service = ProductService(product_repository)
+    
+    return await product_service.get_low_stock_products(threshold, skip=skip, limit=limit)
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
 async def get_product(
     product_id: str,
+    request: Request,
+    response: Response,
+    expand: List[str] = Depends(get_expand_query),
     db = Depends(get_database),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Get a specific product by ID
+    Get a specific product by ID.
+    Conditional requests are answered from a projection of _id and timestamps only.
     """
     product_repository = ProductRepository(db)
-    product_service = ProductService(product_repository)
+    brand_repository = BrandRepository(db)
+    product_service = ProductService(product_repository, brand_repository)
     
-    return await product_service.get_product_by_id(product_id)
+    if has_conditional_headers(request) and not expand:
+        version = await product_repository.get_version(product_id)
+        if version is not None:
+            etag, last_modified = document_validators(
+                str(version["_id"]), version.get("created_at"), version.get("updated_at")
+            )
+            if is_not_modified(request, etag, last_modified):
+                return not_modified_response(etag, last_modified)
+    
+    product = await product_service.get_product_by_id(product_id)
+    if "brand" in expand:
+        await product_service.expand_brands([product])
+    
+    if expand:
+        # The expanded brand can change or disappear without the product's timestamps moving
+        etag, last_modified = list_validators([product] + ([product.brand] if product.brand else []))
+    else:
+        etag, last_modified = document_validators(product.id, product.created_at, product.updated_at)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    set_cache_headers(response, etag, last_modified)
+    return product
 
 
 @router.put("/{product_id}", response_model=ProductResponse)
@@ -78,7 +266,8 @@ async def update_product(
     Update a product
     """
     product_repository = ProductRepository(db)
-    product_service = ProductService(product_repository)
+    brand_repository = BrandRepository(db)
+    product_service = ProductService(product_repository, brand_repository)
     
     return await product_service.update_product(product_id, product_update)
 
@@ -103,7 +292,7 @@ async def delete_product(
         )
 
 
-@router.get("/category/{category}", response_model=List[ProductResponse])
+@router.get("/category/{category}", response_model=List[ProductResponse], dependencies=[Depends(use_query_cache)])
 async def get_products_by_category(
     category: str,
     skip: int = Query(0, ge=0, description="Number of products to skip"),
@@ -120,18 +309,25 @@ async def get_products_by_category(
     return await product_service.get_products_by_category(category, skip=skip, limit=limit)
 
 
-@router.get("/search/{search_term}", response_model=List[ProductResponse])
+@router.get(
+    "/search/{search_term}",
+    response_model=List[ProductResponse],
+    dependencies=[Depends(use_query_cache), Depends(search_deadline)]
+)
 async def search_products(
     search_term: str,
     skip: int = Query(0, ge=0, description="Number of products to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of products to return"),
+    mode: str = Query("substring", pattern="^(substring|fuzzy)$", description="substring, or fuzzy for typo-tolerant name matching"),
     db = Depends(get_database),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Search products by name or description
+    Search products by name or description, or by typo-tolerant name similarity with mode=fuzzy
     """
     product_repository = ProductRepository(db)
     product_service = ProductService(product_repository)
     
+    if mode == "fuzzy":
+        return await product_service.fuzzy_search_products(search_term, skip=skip, limit=limit)
     return await product_service.search_products(search_term, skip=skip, limit=limit)
\ No newline at end of file
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from typing import List, Optional
 from ..models.user import User, UserCreate, UserUpdate, UserResponse
+from ..models.bulk import ImportResult
 from ..services.user_service import UserService
 from ..repositories.user_repository import UserRepository
-from ..utils.dependencies import get_current_active_user
+from ..utils.dependencies import get_current_active_user, get_ids_query, bulk_deadline
+from ..utils.bulk_io import ImportFormatError, detect_format, export_response, iter_records
 from ..config.database import get_database
+from ..config.settings import settings
+from ..monitoring.tracing import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -24,22 +28,78 @@ async def create_user(
     return await user_service.create_user(user_create)
 
 
+@router.post("/import", response_model=ImportResult, dependencies=[Depends(bulk_deadline)])
+async def import_users(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="csv or ndjson; defaults to the Content-Type"),
+    chunk_size: int = Query(settings.import_chunk_size, ge=1, le=settings.import_max_chunk_size, description="Rows validated and written per batch"),
+    db = Depends(get_database),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Create users from a CSV (with header row) or NDJSON request body of username, email and password.
+    Invalid or already registered rows are skipped and reported with their row number.
+    """
+    try:
+        import_format = detect_format(format, request.headers.get("content-type"))
+    except ImportFormatError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    user_repository = UserRepository(db)
+    user_service = UserService(user_repository)
+    
+    return await user_service.import_users(
+        iter_records(request.stream(), import_format),
+        chunk_size=chunk_size,
+        max_errors=settings.import_max_errors
+    )
+
+
 @router.get("/", response_model=List[UserResponse])
 async def get_users(
     skip: int = Query(0, ge=0, description="Number of users to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of users to return"),
+    ids: Optional[List[str]] = Depends(get_ids_query),
     db = Depends(get_database),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Get all users with pagination
+    Get all users with pagination, or a batch of users by ID
     """
     user_repository = UserRepository(db)
     user_service = UserService(user_repository)
     
+    if ids is not None:
+        return await user_service.get_users_by_ids(ids)
     return await user_service.get_all_users(skip=skip, limit=limit)
 
 
+@router.get("/export", dependencies=[Depends(bulk_deadline)])
+async def export_users(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to export; defaults to all"),
+    active_only: bool = Query(False, description="Export only active users"),
+    gzip: bool = Query(False, description="Gzip the file"),
+    batch_size: int = Query(settings.export_batch_size, ge=1, le=settings.export_max_batch_size, description="Documents fetched and written per batch"),
+    db = Depends(get_database),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Export users as NDJSON or CSV (with header row), streamed one batch at a time
+    """
+    user_repository = UserRepository(db)
+    user_service = UserService(user_repository)
+    
+    body = user_service.export_users(
+        format,
+        fields=fields,
+        active_only=active_only,
+        compress=gzip,
+        batch_size=batch_size
+    )
+    return export_response(body, "users", format, compress=gzip)
+
+
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: str,
@@ -103,7 +163,7 @@ async def get_current_user_profile(
     user_service = UserService(user_repository)
     
     # Get user by username from the token
-    user_data = await user_repository.get_by_username(current_user.username)
+    user_data = await user_repository.get_by_username(current_user["username"])
     if not user_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
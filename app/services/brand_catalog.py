@@ -0,0 +1,178 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from bson import ObjectId
+from ..repositories.brand_repository import BrandRepository
+from ..cache.tiered import TieredCache, shared_cache
+
+logger = logging.getLogger(__name__)
+
+REGEX_METACHARACTERS = set(".^$*+?{}[]\\|()")
+# Reads retried when writes keep landing during a load, before installing the last one read anyway
+MAX_LOAD_ATTEMPTS = 3
+
+
+def is_literal(search_term: str) -> bool:
+    """Whether a search term has no regex syntax, so a substring match gives the same result"""
+    return REGEX_METACHARACTERS.isdisjoint(search_term)
+
+
+def _normalize_id(brand_id: Any) -> Optional[str]:
+    if isinstance(brand_id, ObjectId):
+        return str(brand_id)
+    if isinstance(brand_id, str) and ObjectId.is_valid(brand_id):
+        return str(ObjectId(brand_id))
+    return None
+
+
+class BrandSnapshot:
+    """Immutable in-process copy of the whole brand collection with lookup indexes"""
+
+    def __init__(self, brands: Iterable[Dict[str, Any]]):
+        # Sorting by _id mirrors insertion order, which is what unsorted collection scans return
+        self.brands = tuple(sorted(brands, key=lambda brand: brand["_id"]))
+        self.active_brands = tuple(brand for brand in self.brands if brand.get("is_active"))
+        self.by_id = {str(brand["_id"]): brand for brand in self.brands}
+        self.search_keys = tuple(
+            (brand["name"].lower(), (brand.get("description") or "").lower())
+            for brand in self.brands
+        )
+        self.loaded_at = datetime.utcnow()
+
+    def get(self, brand_id: Any) -> Optional[Dict[str, Any]]:
+        """Get a brand by ID"""
+        normalized_id = _normalize_id(brand_id)
+        return self.by_id.get(normalized_id) if normalized_id else None
+
+    def get_many(self, brand_ids: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Get brands by ID, preserving order and skipping unknown IDs"""
+        brands = (self.get(brand_id) for brand_id in dict.fromkeys(brand_ids))
+        return [brand for brand in brands if brand is not None]
+
+    def page(self, skip: int = 0, limit: int = 100, active_only: bool = False) -> List[Dict[str, Any]]:
+        """Get a page of all (or only active) brands"""
+        brands = self.active_brands if active_only else self.brands
+        return list(brands[skip:skip + limit])
+
+    def search(self, search_term: str, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Case-insensitive substring search in name or description, using the precomputed lowercase keys.
+        The term is taken literally; regex patterns belong in the repository, where the query deadline bounds them.
+        """
+        needle = search_term.lower()
+        matches = (
+            brand for brand, (name, description) in zip(self.brands, self.search_keys)
+            if needle in name or needle in description
+        )
+
+        results = []
+        for index, brand in enumerate(matches):
+            if index >= skip + limit:
+                break
+            if index >= skip:
+                results.append(brand)
+        return results
+
+    def with_brand(self, brand: Dict[str, Any]) -> "BrandSnapshot":
+        """Copy of this snapshot with a brand added or replaced"""
+        brand_id = str(brand["_id"])
+        return BrandSnapshot([existing for existing in self.brands if str(existing["_id"]) != brand_id] + [brand])
+
+    def without_brand(self, brand_id: str) -> "BrandSnapshot":
+        """Copy of this snapshot with a brand removed"""
+        normalized_id = _normalize_id(brand_id)
+        return BrandSnapshot(brand for brand in self.brands if str(brand["_id"]) != normalized_id)
+
+
+class BrandCatalog:
+    """Holds the current brand snapshot and keeps it fresh across workers"""
+
+    def __init__(self, cache: TieredCache = shared_cache):
+        self.snapshot: Optional[BrandSnapshot] = None
+        self.cache = cache
+        self._brand_repository: Optional[BrandRepository] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._reload_task: Optional[asyncio.Task] = None
+        self._stale = False
+        self._loading = False
+        cache.add_generation_listener(self._on_generation)
+
+    async def load(self, brand_repository: BrandRepository) -> BrandSnapshot:
+        """Load the full collection and swap it in as the current snapshot"""
+        for _ in range(MAX_LOAD_ATTEMPTS):
+            self._stale = False
+            self._loading = True
+            try:
+                brands = await brand_repository.get_all_for_snapshot()
+            finally:
+                self._loading = False
+            # A write during the read may be missing from it; read again rather than undo the write
+            if not self._stale:
+                break
+        else:
+            logger.info("Brand catalog kept changing while loading; the next refresh reloads it")
+        # A single reference assignment, so readers see either the old or the new snapshot
+        self.snapshot = BrandSnapshot(brands)
+        return self.snapshot
+
+    def put(self, brand: Dict[str, Any]):
+        """Apply a brand written by this worker"""
+        if self._loading:
+            self._stale = True
+        if self.snapshot is not None:
+            self.snapshot = self.snapshot.with_brand(brand)
+
+    def remove(self, brand_id: str):
+        """Drop a brand deleted by this worker"""
+        if self._loading:
+            self._stale = True
+        if self.snapshot is not None:
+            self.snapshot = self.snapshot.without_brand(brand_id)
+
+    async def start(self, brand_repository: BrandRepository, refresh_seconds: int):
+        """
+        Load the snapshot and reload it periodically to pick up writes from other workers.
+        With a shared cache, brand writes elsewhere also trigger an immediate reload.
+        """
+        self._brand_repository = brand_repository
+        await self.load(brand_repository)
+        if refresh_seconds > 0:
+            self._refresh_task = asyncio.create_task(self._refresh_loop(brand_repository, refresh_seconds))
+
+    async def stop(self):
+        """Stop the periodic refresh and forget the snapshot"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        self._brand_repository = None
+        self.snapshot = None
+
+    def _on_generation(self, name: str, generation: int):
+        # Another worker wrote to the brand collection
+        if name != "brand" or self._brand_repository is None:
+            return
+        if self._loading:
+            # The load in progress may have read the collection before this write
+            self._stale = True
+        elif self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.ensure_future(self._reload(self._brand_repository))
+
+    async def _reload(self, brand_repository: BrandRepository):
+        try:
+            await self.load(brand_repository)
+        except Exception as e:
+            logger.warning("Could not reload brand catalog: %s", e)
+
+    async def _refresh_loop(self, brand_repository: BrandRepository, refresh_seconds: int):
+        while True:
+            await asyncio.sleep(refresh_seconds)
+            # Keep serving the previous snapshot if the reload fails
+            await self._reload(brand_repository)
+
+
+brand_catalog = BrandCatalog()
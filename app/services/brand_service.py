@@ -1,13 +1,30 @@
-from typing import List, Optional
+import re
+from typing import AsyncIterator, List, Optional
 from fastapi import HTTPException, status
-from ..models.brand import Brand, BrandCreate, BrandUpdate, BrandResponse
+from ..models.brand import Brand, BrandCreate, BrandUpdate, BrandResponse, BrandSuggestion
 from ..repositories.brand_repository import BrandRepository
+from .brand_catalog import BrandCatalog, brand_catalog, is_literal
+from .name_index import NameIndex, brand_names
+from ..utils.bulk_io import export_projection, export_stream, parse_fields
+from ..utils.text import normalize_name
+from ..config.settings import settings
+from ..monitoring.tracing import trace_methods
 from datetime import datetime
 
+EXPORT_FIELDS = ("_id", "name", "description", "is_active", "created_at", "updated_at")
 
+
+@trace_methods
 class BrandService:
-    def __init__(self, brand_repository: BrandRepository):
+    def __init__(
+        self,
+        brand_repository: BrandRepository,
+        catalog: BrandCatalog = brand_catalog,
+        names: NameIndex = brand_names
+    ):
         self.brand_repository = brand_repository
+        self.catalog = catalog
+        self.names = names
 
     async def create_brand(self, brand_create: BrandCreate) -> BrandResponse:
         """Create a new brand"""
@@ -27,64 +44,78 @@ class BrandService:
         
         # Create brand in database
         created_brand = await self.brand_repository.create(brand_data)
+        self.catalog.put(created_brand)
+        self.names.put(created_brand)
         
         # Convert to response model
-        return BrandResponse(
-            _id=str(created_brand["_id"]),
-            name=created_brand["name"],
-            description=created_brand.get("description"),
-            is_active=created_brand["is_active"],
-            created_at=created_brand["created_at"],
-            updated_at=created_brand.get("updated_at")
-        )
+        return self._to_response(created_brand)
 
     async def get_brand_by_id(self, brand_id: str) -> BrandResponse:
         """Get brand by ID"""
-        brand = await self.brand_repository.get_by_id(brand_id)
+        snapshot = self.catalog.snapshot
+        if snapshot is not None:
+            brand = snapshot.get(brand_id)
+        else:
+            brand = await self.brand_repository.get_by_id(brand_id)
         if not brand:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Brand not found"
             )
         
-        return BrandResponse(
-            _id=str(brand["_id"]),
-            name=brand["name"],
-            description=brand.get("description"),
-            is_active=brand["is_active"],
-            created_at=brand["created_at"],
-            updated_at=brand.get("updated_at")
-        )
+        return self._to_response(brand)
+
+    async def get_brand_version(self, brand_id: str) -> Optional[dict]:
+        """Get the _id and timestamps of a brand for conditional requests"""
+        snapshot = self.catalog.snapshot
+        if snapshot is not None:
+            return snapshot.get(brand_id)
+        return await self.brand_repository.get_version(brand_id)
+
+    async def get_brands_by_ids(self, brand_ids: List[str]) -> List[BrandResponse]:
+        """Get several brands by ID with one query; unknown IDs are skipped"""
+        snapshot = self.catalog.snapshot
+        if snapshot is not None:
+            brands = snapshot.get_many(brand_ids)
+        else:
+            brands = await self.brand_repository.get_many(brand_ids)
+        return [self._to_response(brand) for brand in brands]
 
     async def get_all_brands(self, skip: int = 0, limit: int = 100) -> List[BrandResponse]:
         """Get all brands"""
-        brands = await self.brand_repository.get_all(skip=skip, limit=limit)
-        return [
-            BrandResponse(
-                _id=str(brand["_id"]),
-                name=brand["name"],
-                description=brand.get("description"),
-                is_active=brand["is_active"],
-                created_at=brand["created_at"],
-                updated_at=brand.get("updated_at")
-            )
-            for brand in brands
-        ]
+        snapshot = self.catalog.snapshot
+        if snapshot is not None:
+            brands = snapshot.page(skip=skip, limit=limit)
+        else:
+            brands = await self.brand_repository.get_all(skip=skip, limit=limit)
+        return [self._to_response(brand) for brand in brands]
 
     async def get_active_brands(self, skip: int = 0, limit: int = 100) -> List[BrandResponse]:
         """Get all active brands"""
-        brands = await self.brand_repository.get_active_brands(skip=skip, limit=limit)
-        return [
-            BrandResponse(
-                _id=str(brand["_id"]),
-                name=brand["name"],
-                description=brand.get("description"),
-                is_active=brand["is_active"],
-                created_at=brand["created_at"],
-                updated_at=brand.get("updated_at")
-            )
-            for brand in brands
-        ]
+        snapshot = self.catalog.snapshot
+        if snapshot is not None:
+            brands = snapshot.page(skip=skip, limit=limit, active_only=True)
+        else:
+            brands = await self.brand_repository.get_active_brands(skip=skip, limit=limit)
+        return [self._to_response(brand) for brand in brands]
+
+    def export_brands(
+        self,
+        export_format: str = "ndjson",
+        fields: Optional[str] = None,
+        active_only: bool = False,
+        compress: bool = False,
+        batch_size: int = 1000
+    ) -> AsyncIterator[bytes]:
+        """Stream brands as NDJSON or CSV through one cursor, a batch at a time"""
+        try:
+            columns = parse_fields(fields, EXPORT_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        filters = {"is_active": True} if active_only else {}
+        cursor = self.brand_repository.iter_documents(filters, export_projection(columns), batch_size)
+        return export_stream(cursor, export_format, columns, batch_size=batch_size, compress=compress)
 
     async def update_brand(self, brand_id: str, brand_update: BrandUpdate) -> BrandResponse:
         """Update brand"""
@@ -121,15 +152,10 @@ class BrandService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Failed to update brand"
             )
+        self.catalog.put(updated_brand)
+        self.names.put(updated_brand, previous=existing_brand)
         
-        return BrandResponse(
-            _id=str(updated_brand["_id"]),
-            name=updated_brand["name"],
-            description=updated_brand.get("description"),
-            is_active=updated_brand["is_active"],
-            created_at=updated_brand["created_at"],
-            updated_at=updated_brand.get("updated_at")
-        )
+        return self._to_response(updated_brand)
 
     async def delete_brand(self, brand_id: str) -> bool:
         """Delete brand"""
@@ -141,19 +167,59 @@ class BrandService:
                 detail="Brand not found"
             )
         
-        return await self.brand_repository.delete(brand_id)
+        deleted = await self.brand_repository.delete(brand_id)
+        if deleted:
+            self.catalog.remove(brand_id)
+            self.names.remove(existing_brand)
+        return deleted
 
     async def search_brands(self, search_term: str, skip: int = 0, limit: int = 100) -> List[BrandResponse]:
         """Search brands by name or description"""
-        brands = await self.brand_repository.search_brands(search_term, skip=skip, limit=limit)
-        return [
-            BrandResponse(
-                _id=str(brand["_id"]),
-                name=brand["name"],
-                description=brand.get("description"),
-                is_active=brand["is_active"],
-                created_at=brand["created_at"],
-                updated_at=brand.get("updated_at")
+        snapshot = self.catalog.snapshot
+        if snapshot is not None and is_literal(search_term):
+            brands = snapshot.search(search_term, skip=skip, limit=limit)
+            return [self._to_response(brand) for brand in brands]
+        
+        # Patterns run in MongoDB, bounded by the search deadline, never on the event loop
+        try:
+            re.compile(search_term)
+        except re.error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid search pattern"
             )
-            for brand in brands
-        ]
\ No newline at end of file
+        brands = await self.brand_repository.search_brands(search_term, skip=skip, limit=limit)
+        return [self._to_response(brand) for brand in brands]
+
+    async def fuzzy_search_brands(self, search_term: str, skip: int = 0, limit: int = 100) -> List[BrandResponse]:
+        """Search active brands by name similarity, tolerating typos; best matches first"""
+        if not self.names.fuzzy_ready:
+            # Without the in-memory index there is no fuzzy matching; fall back to substring search
+            return await self.search_brands(search_term, skip=skip, limit=limit)
+        
+        matches = self.names.search_fuzzy(search_term, limit=skip + limit, min_similarity=settings.fuzzy_min_similarity)
+        brand_ids = [brand_id for brand_id, _ in matches[skip:]]
+        snapshot = self.catalog.snapshot
+        if snapshot is not None:
+            brands = snapshot.get_many(brand_ids)
+        else:
+            brands = await self.brand_repository.get_many(brand_ids)
+        return [self._to_response(brand) for brand in brands]
+
+    async def autocomplete_brands(self, prefix: str, limit: int = 10) -> List[BrandSuggestion]:
+        """Suggest active brand names starting with prefix, case-insensitively"""
+        if self.names.ready:
+            return [BrandSuggestion(_id=brand_id, name=name) for _, brand_id, name in self.names.suggest(prefix, limit)]
+        
+        brands = await self.brand_repository.autocomplete(normalize_name(prefix), limit=limit)
+        return [BrandSuggestion(_id=str(brand["_id"]), name=brand["name"]) for brand in brands]
+
+    def _to_response(self, brand: dict) -> BrandResponse:
+        return BrandResponse(
+            _id=str(brand["_id"]),
+            name=brand["name"],
+            description=brand.get("description"),
+            is_active=brand["is_active"],
+            created_at=brand["created_at"],
+            updated_at=brand.get("updated_at")
+        )
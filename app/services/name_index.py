@@ -0,0 +1,185 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from ..repositories.base import BaseRepository
+from ..cache.tiered import TieredCache, shared_cache
+from ..config.settings import settings
+from ..utils.text import normalize_name
+from ..utils.trie import Entry, PrefixTrie
+from ..utils.trigram import TrigramIndex
+
+logger = logging.getLogger(__name__)
+
+MAX_SUGGESTIONS = 20
+
+
+class NameIndex:
+    """
+    In-process indexes of the names of a collection's active documents: a prefix trie for
+    autocomplete and a trigram index for fuzzy search. Each is only built while the collection
+    fits within its size limit; otherwise callers fall back to the database.
+    """
+
+    def __init__(self, name: str, cache: TieredCache = shared_cache, max_postings: int = 100000):
+        self.name = name
+        self.cache = cache
+        self.max_postings = max_postings
+        self.trie: Optional[PrefixTrie] = None
+        self.trigrams: Optional[TrigramIndex] = None
+        self.max_names = 0
+        self.fuzzy_max_names = 0
+        self._stale = True
+        self._loading = False
+        self._change_marker: Optional[Tuple[Any, ...]] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        cache.add_generation_listener(self._on_generation)
+
+    @property
+    def ready(self) -> bool:
+        return self.trie is not None
+
+    @property
+    def fuzzy_ready(self) -> bool:
+        return self.trigrams is not None
+
+    async def load(self, repository: BaseRepository, max_names: int, fuzzy_max_names: int = 0):
+        """Load every active name and build the indexes the collection fits in"""
+        self.max_names = max_names
+        self.fuzzy_max_names = fuzzy_max_names
+        self._stale = False
+        self._loading = True
+        try:
+            limit = max(max_names, fuzzy_max_names)
+            documents = await repository.get_active_names(limit=limit + 1) if limit else []
+            entries = [self._entry(document) for document in documents]
+            # Building takes a while for large collections, so keep it off the event loop
+            self.trie, self.trigrams = await asyncio.to_thread(self._build, entries)
+        finally:
+            self._loading = False
+
+    def _build(self, entries: List[Entry]) -> Tuple[Optional[PrefixTrie], Optional[TrigramIndex]]:
+        trie = None
+        if self.max_names and len(entries) <= self.max_names:
+            trie = PrefixTrie.build(entries, MAX_SUGGESTIONS)
+        trigrams = None
+        if self.fuzzy_max_names and len(entries) <= self.fuzzy_max_names:
+            trigrams = TrigramIndex.build(
+                ((document_id, key) for key, document_id, _ in entries),
+                max_postings=self.max_postings
+            )
+        return trie, trigrams
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Entry]:
+        """Names starting with prefix, in normalized name order"""
+        return self.trie.suggest(normalize_name(prefix), limit) if self.trie is not None else []
+
+    def search_fuzzy(self, query: str, limit: int = 10, min_similarity: float = 0.3) -> List[Tuple[str, float]]:
+        """(document ID, similarity) of the names most similar to query, best first"""
+        if self.trigrams is None:
+            return []
+        return self.trigrams.search(normalize_name(query), limit=limit, min_similarity=min_similarity)
+
+    def put(self, document: Dict[str, Any], previous: Optional[Dict[str, Any]] = None):
+        """Apply a document written by this worker"""
+        if self._loading:
+            # The load in progress may have read the old version
+            self._stale = True
+        if previous is not None:
+            self.remove(previous)
+        if not document.get("is_active", True):
+            return
+
+        key, document_id, name = self._entry(document)
+        if self.trie is not None:
+            self.trie.insert(key, document_id, name)
+            if len(self.trie) > self.max_names:
+                logger.info("%s autocomplete index disabled: more than %d active names", self.name, self.max_names)
+                self.trie = None
+        if self.trigrams is not None:
+            self.trigrams.add(document_id, key)
+            if len(self.trigrams) > self.fuzzy_max_names:
+                logger.info("%s fuzzy index disabled: more than %d active names", self.name, self.fuzzy_max_names)
+                self.trigrams = None
+            elif self.trigrams.removed > len(self.trigrams) + 1000:
+                # Replaced documents leave postings behind; rebuild on the next refresh
+                self._stale = True
+
+    def mark_stale(self):
+        """Reload on the next refresh, for writes that cannot be applied in place"""
+        self._stale = True
+
+    def remove(self, document: Dict[str, Any]):
+        """Drop a document deleted by this worker"""
+        if self._loading:
+            self._stale = True
+        key, document_id, _ = self._entry(document)
+        if self.trie is not None:
+            self.trie.remove(key, document_id)
+        if self.trigrams is not None:
+            self.trigrams.remove(document_id)
+
+    async def start(
+        self,
+        repository: BaseRepository,
+        max_names: int,
+        fuzzy_max_names: int,
+        refresh_seconds: int
+    ):
+        """Load the indexes and reload them periodically to pick up writes from other workers"""
+        if refresh_seconds > 0 and not self.cache.l2_available:
+            self._change_marker = await repository.get_change_marker()
+        await self.load(repository, max_names, fuzzy_max_names)
+        if max_names and not self.ready:
+            logger.info("%s autocomplete index disabled: more than %d active names", self.name, max_names)
+        if fuzzy_max_names and not self.fuzzy_ready:
+            logger.info("%s fuzzy index disabled: more than %d active names", self.name, fuzzy_max_names)
+        if refresh_seconds > 0:
+            self._refresh_task = asyncio.create_task(self._refresh_loop(repository, refresh_seconds))
+
+    async def stop(self):
+        """Stop the periodic refresh and drop the indexes"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        self.trie = None
+        self.trigrams = None
+
+    def _on_generation(self, name: str, generation: int):
+        # Another worker wrote to the collection
+        if name == self.name:
+            self._stale = True
+
+    async def _needs_reload(self, repository: BaseRepository) -> bool:
+        # With a shared cache, other workers' writes are announced
+        if self.cache.l2_available:
+            return self._stale
+        # Without one, reload when the collection changed since the last check; read before the
+        # reload, so writes made during it are caught by the next check
+        change_marker = await repository.get_change_marker()
+        changed = change_marker != self._change_marker
+        self._change_marker = change_marker
+        return changed or self._stale
+
+    async def _refresh_loop(self, repository: BaseRepository, refresh_seconds: int):
+        while True:
+            await asyncio.sleep(refresh_seconds)
+            try:
+                if not await self._needs_reload(repository):
+                    continue
+                await self.load(repository, self.max_names, self.fuzzy_max_names)
+            except Exception as e:
+                # Keep serving the previous indexes if the reload fails
+                self._stale = True
+                logger.warning("Could not reload %s name index: %s", self.name, e)
+
+    def _entry(self, document: Dict[str, Any]) -> Entry:
+        name = document.get("name") or ""
+        return (document.get("name_lower") or normalize_name(name), str(document["_id"]), name)
+
+
+product_names = NameIndex("products", max_postings=settings.fuzzy_max_postings)
+brand_names = NameIndex("brand", max_postings=settings.fuzzy_max_postings)
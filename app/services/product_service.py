@@ -1,13 +1,41 @@
-from typing import List, Optional
+import math
+from typing import AsyncIterable, AsyncIterator, Callable, List, Optional, Tuple
 from fastapi import HTTPException, status
-from ..models.product import Product, ProductCreate, ProductUpdate, ProductResponse
-from ..repositories.product_repository import ProductRepository
-from datetime import datetime
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+from ..models.product import Product, ProductCreate, ProductUpdate, ProductResponse, ProductChanges, ProductPage, ProductSuggestion
+from ..models.brand import BrandResponse
+from ..models.bulk import ImportResult
+from ..repositories.product_repository import ProductRepository, PRODUCT_KIND, TOMBSTONE_KIND
+from ..repositories.brand_repository import BrandRepository
+from .brand_catalog import brand_catalog
+from .name_index import NameIndex, product_names
+from ..utils.pagination import encode_cursor, decode_cursor
+from ..utils.bulk_io import ImportFormatError, Record, batched, export_projection, export_stream, parse_fields, validation_messages
+from ..utils.text import normalize_name
+from ..config.settings import settings
+from ..monitoring.tracing import trace_methods
+from datetime import datetime, timedelta
 
+SYNC_EPOCH = datetime(1970, 1, 1)
+EXPORT_FIELDS = (
+    "_id", "name", "description", "price", "category", "stock_quantity",
+    "brand_id", "is_active", "created_at", "updated_at"
+)
 
+
+@trace_methods
 class ProductService:
-    def __init__(self, product_repository: ProductRepository):
+    def __init__(
+        self,
+        product_repository: ProductRepository,
+        brand_repository: Optional[BrandRepository] = None,
+        names: NameIndex = product_names
+    ):
         self.product_repository = product_repository
+        self.brand_repository = brand_repository
+        self.names = names
 
     async def create_product(self, product_create: ProductCreate) -> ProductResponse:
         """Create a new product"""
@@ -18,6 +46,9 @@ class ProductService:
                 detail="Product name already exists"
             )
         
+        if product_create.brand_id is not None:
+            await self._check_brand_exists(product_create.brand_id)
+        
         # Create product data
         product_data = {
             "name": product_create.name,
@@ -25,24 +56,148 @@ class ProductService:
             "price": product_create.price,
             "category": product_create.category,
             "stock_quantity": product_create.stock_quantity,
+            "brand_id": ObjectId(product_create.brand_id) if product_create.brand_id else None,
             "is_active": True
         }
         
         # Create product in database
         created_product = await self.product_repository.create(product_data)
+        self.names.put(created_product)
         
         # Convert to response model
-        return ProductResponse(
-            _id=str(created_product["_id"]),
-            name=created_product["name"],
-            description=created_product.get("description"),
-            price=created_product["price"],
-            category=created_product["category"],
-            stock_quantity=created_product["stock_quantity"],
-            is_active=created_product["is_active"],
-            created_at=created_product["created_at"],
-            updated_at=created_product.get("updated_at")
-        )
+        return self._to_response(created_product)
+
+    async def import_products(
+        self,
+        records: AsyncIterable[Record],
+        upsert: bool = False,
+        chunk_size: int = 1000,
+        max_errors: int = 1000,
+        progress: Optional[Callable[[ImportResult], None]] = None
+    ) -> ImportResult:
+        """
+        Validate and write streamed product records chunk by chunk. A chunk is written before the
+        next one is read, so memory stays at one chunk and slow writes slow down the upload.
+        With upsert, rows update the product with the same name instead of being rejected.
+        """
+        result = ImportResult()
+        try:
+            async for chunk in batched(records, chunk_size):
+                await self._import_chunk(chunk, upsert, result, max_errors)
+                if progress is not None:
+                    progress(result)
+        except ImportFormatError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{e}; {result.processed} rows were processed before the error"
+            )
+        return result
+
+    async def _import_chunk(self, chunk: List[Record], upsert: bool, result: ImportResult, max_errors: int):
+        rows: List[Tuple[int, ProductCreate]] = []
+        seen_names = set()
+        for row_number, record, error in chunk:
+            result.processed += 1
+            if error is not None:
+                result.add_error(row_number, [error], max_errors)
+                continue
+            try:
+                product_create = ProductCreate.model_validate(record)
+            except ValidationError as e:
+                result.add_error(row_number, validation_messages(e), max_errors)
+                continue
+            if product_create.name in seen_names:
+                result.add_error(row_number, ["Duplicate product name in this chunk"], max_errors)
+                continue
+            seen_names.add(product_create.name)
+            rows.append((row_number, product_create))
+        
+        # Check brands and names for the whole chunk with one $in query each
+        brand_ids = {row.brand_id for _, row in rows if row.brand_id and ObjectId.is_valid(row.brand_id)}
+        known_brand_ids = await self._get_known_brand_ids(list(brand_ids))
+        taken_names = set()
+        if not upsert:
+            taken_names = set(await self.product_repository.get_existing_values("name", list(seen_names)))
+        
+        documents, document_rows = [], []
+        for row_number, row in rows:
+            if row.brand_id and (not ObjectId.is_valid(row.brand_id) or str(ObjectId(row.brand_id)) not in known_brand_ids):
+                result.add_error(row_number, ["Brand not found"], max_errors)
+            elif row.name in taken_names:
+                result.add_error(row_number, ["Product name already exists"], max_errors)
+            else:
+                documents.append({
+                    "name": row.name,
+                    "description": row.description,
+                    "price": row.price,
+                    "category": row.category,
+                    "stock_quantity": row.stock_quantity,
+                    "brand_id": ObjectId(row.brand_id) if row.brand_id else None,
+                    "is_active": True
+                })
+                if upsert:
+                    # Fields the row left out keep their stored values on existing products
+                    documents[-1] = {field: value for field, value in documents[-1].items() if field in row.model_fields_set}
+                document_rows.append(row_number)
+        if not documents:
+            return
+        
+        if upsert:
+            write_result = await self.product_repository.upsert_many(
+                "name", documents, defaults={"description": None, "brand_id": None, "is_active": True}
+            )
+            result.inserted += write_result.upserted_count
+            result.updated += write_result.matched_count
+            # Updated products are only known by name here, so rebuild the name index
+            self.names.mark_stale()
+            return
+        
+        try:
+            await self.product_repository.create_many(documents)
+            failed_indexes = {}
+        except BulkWriteError as e:
+            failed_indexes = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+        for index, document in enumerate(documents):
+            if index in failed_indexes:
+                result.add_error(document_rows[index], [failed_indexes[index]], max_errors)
+            else:
+                result.inserted += 1
+                self.names.put(document)
+
+    async def _get_known_brand_ids(self, brand_ids: List[str]) -> set:
+        if not brand_ids:
+            return set()
+        snapshot = brand_catalog.snapshot
+        if snapshot is not None:
+            brands = snapshot.get_many(brand_ids)
+        elif self.brand_repository is not None:
+            brands = await self.brand_repository.get_many(brand_ids)
+        else:
+            return set(brand_ids)
+        return {str(brand["_id"]) for brand in brands}
+
+    def export_products(
+        self,
+        export_format: str = "ndjson",
+        fields: Optional[str] = None,
+        category: Optional[str] = None,
+        active_only: bool = False,
+        compress: bool = False,
+        batch_size: int = 1000
+    ) -> AsyncIterator[bytes]:
+        """Stream matching products as NDJSON or CSV through one cursor, a batch at a time"""
+        try:
+            columns = parse_fields(fields, EXPORT_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        filters = {}
+        if category:
+            filters["category"] = category
+        if active_only:
+            filters["is_active"] = True
+        cursor = self.product_repository.iter_documents(filters, export_projection(columns), batch_size)
+        return export_stream(cursor, export_format, columns, batch_size=batch_size, compress=compress)
 
     async def get_product_by_id(self, product_id: str) -> ProductResponse:
         """Get product by ID"""
@@ -53,53 +208,22 @@ class ProductService:
                 detail="Product not found"
             )
         
-        return ProductResponse(
-            _id=str(product["_id"]),
-            name=product["name"],
-            description=product.get("description"),
-            price=product["price"],
-            category=product["category"],
-            stock_quantity=product["stock_quantity"],
-            is_active=product["is_active"],
-            created_at=product["created_at"],
-            updated_at=product.get("updated_at")
-        )
+        return self._to_response(product)
+
+    async def get_products_by_ids(self, product_ids: List[str]) -> List[ProductResponse]:
+        """Get several products by ID with one query; unknown IDs are skipped"""
+        products = await self.product_repository.get_many(product_ids)
+        return [self._to_response(product) for product in products]
 
     async def get_all_products(self, skip: int = 0, limit: int = 100) -> List[ProductResponse]:
         """Get all products"""
         products = await self.product_repository.get_all(skip=skip, limit=limit)
-        return [
-            ProductResponse(
-                _id=str(product["_id"]),
-                name=product["name"],
-                description=product.get("description"),
-                price=product["price"],
-                category=product["category"],
-                stock_quantity=product["stock_quantity"],
-                is_active=product["is_active"],
-                created_at=product["created_at"],
-                updated_at=product.get("updated_at")
-            )
-            for product in products
-        ]
+        return [self._to_response(product) for product in products]
 
     async def get_active_products(self, skip: int = 0, limit: int = 100) -> List[ProductResponse]:
         """Get all active products"""
         products = await self.product_repository.get_active_products(skip=skip, limit=limit)
-        return [
-            ProductResponse(
-                _id=str(product["_id"]),
-                name=product["name"],
-                description=product.get("description"),
-                price=product["price"],
-                category=product["category"],
-                stock_quantity=product["stock_quantity"],
-                is_active=product["is_active"],
-                created_at=product["created_at"],
-                updated_at=product.get("updated_at")
-            )
-            for product in products
-        ]
+        return [self._to_response(product) for product in products]
 
     async def update_product(self, product_id: str, product_update: ProductUpdate) -> ProductResponse:
         """Update product"""
@@ -135,6 +259,10 @@ class ProductService:
         if product_update.stock_quantity is not None:
             update_data["stock_quantity"] = product_update.stock_quantity
         
+        if product_update.brand_id is not None:
+            await self._check_brand_exists(product_update.brand_id)
+            update_data["brand_id"] = ObjectId(product_update.brand_id)
+        
         if product_update.is_active is not None:
             update_data["is_active"] = product_update.is_active
         
@@ -145,18 +273,9 @@ class ProductService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Failed to update product"
             )
+        self.names.put(updated_product, previous=existing_product)
         
-        return ProductResponse(
-            _id=str(updated_product["_id"]),
-            name=updated_product["name"],
-            description=updated_product.get("description"),
-            price=updated_product["price"],
-            category=updated_product["category"],
-            stock_quantity=updated_product["stock_quantity"],
-            is_active=updated_product["is_active"],
-            created_at=updated_product["created_at"],
-            updated_at=updated_product.get("updated_at")
-        )
+        return self._to_response(updated_product)
 
     async def delete_product(self, product_id: str) -> bool:
         """Delete product"""
@@ -168,40 +287,197 @@ class ProductService:
                 detail="Product not found"
             )
         
-        return await self.product_repository.delete(product_id)
+        deleted = await self.product_repository.delete(product_id)
+        if deleted:
+            self.names.remove(existing_product)
+            # Record a tombstone so delta sync clients learn about the delete
+            await self.product_repository.add_tombstone(product_id)
+        return deleted
 
     async def search_products(self, search_term: str, skip: int = 0, limit: int = 100) -> List[ProductResponse]:
         """Search products by name or description"""
         products = await self.product_repository.search_products(search_term, skip=skip, limit=limit)
-        return [
-            ProductResponse(
-                _id=str(product["_id"]),
-                name=product["name"],
-                description=product.get("description"),
-                price=product["price"],
-                category=product["category"],
-                stock_quantity=product["stock_quantity"],
-                is_active=product["is_active"],
-                created_at=product["created_at"],
-                updated_at=product.get("updated_at")
-            )
-            for product in products
-        ]
+        return [self._to_response(product) for product in products]
+
+    async def fuzzy_search_products(self, search_term: str, skip: int = 0, limit: int = 100) -> List[ProductResponse]:
+        """Search active products by name similarity, tolerating typos; best matches first"""
+        if not self.names.fuzzy_ready:
+            # Without the in-memory index there is no fuzzy matching; fall back to substring search
+            return await self.search_products(search_term, skip=skip, limit=limit)
+        
+        matches = self.names.search_fuzzy(search_term, limit=skip + limit, min_similarity=settings.fuzzy_min_similarity)
+        products = await self.product_repository.get_many([product_id for product_id, _ in matches[skip:]])
+        return [self._to_response(product) for product in products]
+
+    async def autocomplete_products(self, prefix: str, limit: int = 10) -> List[ProductSuggestion]:
+        """Suggest active product names starting with prefix, case-insensitively"""
+        if self.names.ready:
+            return [ProductSuggestion(_id=product_id, name=name) for _, product_id, name in self.names.suggest(prefix, limit)]
+        
+        products = await self.product_repository.autocomplete(normalize_name(prefix), limit=limit)
+        return [ProductSuggestion(_id=str(product["_id"]), name=product["name"]) for product in products]
 
     async def get_products_by_category(self, category: str, skip: int = 0, limit: int = 100) -> List[ProductResponse]:
         """Get products by category"""
         products = await self.product_repository.get_by_category(category, skip=skip, limit=limit)
-        return [
-            ProductResponse(
-                _id=str(product["_id"]),
-                name=product["name"],
-                description=product.get("description"),
-                price=product["price"],
-                category=product["category"],
-                stock_quantity=product["stock_quantity"],
-                is_active=product["is_active"],
-                created_at=product["created_at"],
-                updated_at=product.get("updated_at")
+        return [self._to_response(product) for product in products]
+
+    async def get_products_by_price_range(
+        self,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        descending: bool = False,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> ProductPage:
+        """Get a page of products within a price range, sorted by price, using keyset pagination"""
+        after = None
+        if cursor:
+            try:
+                values = decode_cursor(cursor)
+                after = (float(values["p"]), values["id"])
+            except (ValueError, KeyError, TypeError):
+                after = None
+            if after is None or not math.isfinite(after[0]) or not ObjectId.is_valid(after[1]):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid cursor"
+                )
+        
+        products = await self.product_repository.get_price_range_page(
+            min_price, max_price, descending=descending, after=after, limit=limit
+        )
+        next_cursor = None
+        if len(products) > limit:
+            products = products[:limit]
+            last = products[-1]
+            next_cursor = encode_cursor({"p": last["price"], "id": str(last["_id"])})
+        
+        return ProductPage(
+            items=[self._to_response(product) for product in products],
+            next_cursor=next_cursor
+        )
+
+    async def get_low_stock_products(self, threshold: Optional[int] = None, skip: int = 0, limit: int = 100) -> List[ProductResponse]:
+        """Get active products at or below the stock threshold"""
+        if threshold is None:
+            threshold = settings.low_stock_threshold
+        products = await self.product_repository.get_low_stock_view(threshold, skip=skip, limit=limit)
+        return [self._to_response(product) for product in products]
+
+    async def get_product_changes(self, since_token: Optional[str] = None, limit: int = 500) -> ProductChanges:
+        """Get products created, updated or deleted after a sync token"""
+        since, after, synced_at = self._decode_sync_token(since_token)
+        
+        # Tombstones older than the retention are gone, so a client last in sync before then may have missed deletes
+        now = datetime.utcnow()
+        if synced_at is not None and synced_at < now - timedelta(days=settings.sync_tombstone_retention_days):
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Sync token expired, run a full sync without a token"
             )
-            for product in products
-        ]
\ No newline at end of file
+        
+        # Leave the most recent writes for the next poll so slower concurrent writes are not skipped
+        until = now - timedelta(seconds=settings.sync_settle_seconds)
+        events = await self.product_repository.get_changes_since(since, after=after, until=until, limit=limit)
+        has_more = len(events) > limit
+        events = events[:limit]
+        
+        # The token records when the client's view was last complete: now if this page reaches the
+        # settle window (or starts a full sync), otherwise whenever the incoming token says
+        if not has_more or synced_at is None:
+            synced_at = until
+        
+        changed = []
+        deleted = []
+        for _, kind, document in events:
+            if kind == TOMBSTONE_KIND:
+                deleted.append(document["product_id"])
+                continue
+            changed.append(self._to_response(document))
+        
+        if events:
+            timestamp, kind, document = events[-1]
+            next_token = encode_cursor({"ts": timestamp.isoformat(), "k": kind, "id": str(document["_id"]), "iat": synced_at.isoformat()})
+        else:
+            # Nothing changed up to the settle window, so the next poll can start there
+            next_token = encode_cursor({"ts": max(since, until).isoformat(), "iat": synced_at.isoformat()})
+        
+        return ProductChanges(changed=changed, deleted=deleted, next_token=next_token, has_more=has_more)
+
+    def _decode_sync_token(self, since_token: Optional[str]) -> Tuple[datetime, Optional[Tuple[str, str]], Optional[datetime]]:
+        """Watermark, (kind, id) tie-break and last complete sync time of a sync token"""
+        if not since_token:
+            return SYNC_EPOCH, None, None
+        
+        invalid_token = HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync token"
+        )
+        try:
+            values = decode_cursor(since_token)
+            since = datetime.fromisoformat(values["ts"])
+            # Older tokens did not record the sync time; their watermark is the best known bound
+            synced_at = datetime.fromisoformat(values["iat"]) if "iat" in values else since
+        except (ValueError, KeyError, TypeError):
+            raise invalid_token
+        
+        if "k" not in values:
+            return since, None, synced_at
+        if values["k"] not in (PRODUCT_KIND, TOMBSTONE_KIND) or not ObjectId.is_valid(values.get("id")):
+            raise invalid_token
+        return since, (values["k"], values["id"]), synced_at
+
+    async def expand_brands(self, products: List[ProductResponse]) -> List[ProductResponse]:
+        """
+        Attach the referenced brand to each product, from the brand catalog snapshot when
+        it is loaded and otherwise with one batched lookup for the whole page
+        """
+        brand_ids = [product.brand_id for product in products if product.brand_id]
+        if not brand_ids:
+            return products
+        
+        snapshot = brand_catalog.snapshot
+        if snapshot is not None:
+            brands = snapshot.get_many(brand_ids)
+        elif self.brand_repository is not None:
+            brands = await self.brand_repository.get_many(brand_ids)
+        else:
+            return products
+        brands_by_id = {str(brand["_id"]): brand for brand in brands}
+        for product in products:
+            brand = brands_by_id.get(product.brand_id)
+            if brand is not None:
+                product.brand = BrandResponse(
+                    _id=str(brand["_id"]),
+                    name=brand["name"],
+                    description=brand.get("description"),
+                    is_active=brand["is_active"],
+                    created_at=brand["created_at"],
+                    updated_at=brand.get("updated_at")
+                )
+        return products
+
+    async def _check_brand_exists(self, brand_id: str):
+        if not ObjectId.is_valid(brand_id) or (
+            self.brand_repository is not None and not await self.brand_repository.get_by_id(brand_id)
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Brand not found"
+            )
+
+    def _to_response(self, product: dict) -> ProductResponse:
+        brand_id = product.get("brand_id")
+        return ProductResponse(
+            _id=str(product["_id"]),
+            name=product["name"],
+            description=product.get("description"),
+            price=product["price"],
+            category=product["category"],
+            stock_quantity=product["stock_quantity"],
+            brand_id=str(brand_id) if brand_id else None,
+            is_active=product["is_active"],
+            created_at=product["created_at"],
+            updated_at=product.get("updated_at")
+        )
@@ -1,11 +1,22 @@
-from typing import List, Optional
+from typing import AsyncIterable, AsyncIterator, Callable, List, Optional, Tuple
 from fastapi import HTTPException, status
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
 from ..models.user import User, UserCreate, UserUpdate, UserResponse
+from ..models.bulk import ImportResult
 from ..repositories.user_repository import UserRepository
-from ..utils.security import get_password_hash, verify_password
+from ..utils.security import get_password_hash, hash_passwords, verify_password
+from ..utils.bulk_io import (
+    ImportFormatError, Record, batched, export_projection, export_stream, parse_fields, validation_messages
+)
+from ..monitoring.tracing import trace_methods
 from datetime import datetime
 
+# Password hashes are never exported
+EXPORT_FIELDS = ("_id", "username", "email", "is_active", "created_at", "updated_at")
 
+
+@trace_methods
 class UserService:
     def __init__(self, user_repository: UserRepository):
         self.user_repository = user_repository
@@ -49,6 +60,91 @@ class UserService:
             created_at=created_user["created_at"]
         )
 
+    async def import_users(
+        self,
+        records: AsyncIterable[Record],
+        chunk_size: int = 1000,
+        max_errors: int = 1000,
+        progress: Optional[Callable[[ImportResult], None]] = None
+    ) -> ImportResult:
+        """
+        Validate and create streamed user records chunk by chunk. Each chunk costs one $in query
+        per unique field, one parallel hashing pass over a process pool and one insert_many.
+        """
+        result = ImportResult()
+        try:
+            async for chunk in batched(records, chunk_size):
+                await self._import_chunk(chunk, result, max_errors)
+                if progress is not None:
+                    progress(result)
+        except ImportFormatError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{e}; {result.processed} rows were processed before the error"
+            )
+        return result
+
+    async def _import_chunk(self, chunk: List[Record], result: ImportResult, max_errors: int):
+        rows: List[Tuple[int, UserCreate]] = []
+        seen_usernames, seen_emails = set(), set()
+        for row_number, record, error in chunk:
+            result.processed += 1
+            if error is not None:
+                result.add_error(row_number, [error], max_errors)
+                continue
+            try:
+                user_create = UserCreate.model_validate(record)
+            except ValidationError as e:
+                result.add_error(row_number, validation_messages(e), max_errors)
+                continue
+            if user_create.username in seen_usernames:
+                result.add_error(row_number, ["Duplicate username in this chunk"], max_errors)
+                continue
+            if user_create.email in seen_emails:
+                result.add_error(row_number, ["Duplicate email in this chunk"], max_errors)
+                continue
+            seen_usernames.add(user_create.username)
+            seen_emails.add(user_create.email)
+            rows.append((row_number, user_create))
+        
+        # Check usernames and emails for the whole chunk with one $in query each
+        taken_usernames = set(await self.user_repository.get_existing_values("username", list(seen_usernames)))
+        taken_emails = set(await self.user_repository.get_existing_values("email", list(seen_emails)))
+        
+        accepted: List[Tuple[int, UserCreate]] = []
+        for row_number, row in rows:
+            if row.username in taken_usernames:
+                result.add_error(row_number, ["Username already registered"], max_errors)
+            elif row.email in taken_emails:
+                result.add_error(row_number, ["Email already registered"], max_errors)
+            else:
+                accepted.append((row_number, row))
+        if not accepted:
+            return
+        
+        # Hashing dominates the cost of an import, so only accepted rows are hashed
+        hashed_passwords = await hash_passwords([row.password for _, row in accepted])
+        documents = [
+            {
+                "username": row.username,
+                "email": row.email,
+                "hashed_password": hashed_password,
+                "is_active": True
+            }
+            for (_, row), hashed_password in zip(accepted, hashed_passwords)
+        ]
+        
+        try:
+            await self.user_repository.create_many(documents)
+            failed_indexes = {}
+        except BulkWriteError as e:
+            failed_indexes = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+        for index, (row_number, _) in enumerate(accepted):
+            if index in failed_indexes:
+                result.add_error(row_number, [failed_indexes[index]], max_errors)
+            else:
+                result.inserted += 1
+
     async def get_user_by_id(self, user_id: str) -> UserResponse:
         """Get user by ID"""
         user = await self.user_repository.get_by_id(user_id)
@@ -66,6 +162,20 @@ class UserService:
             created_at=user["created_at"]
         )
 
+    async def get_users_by_ids(self, user_ids: List[str]) -> List[UserResponse]:
+        """Get several users by ID with one query; unknown IDs are skipped"""
+        users = await self.user_repository.get_many(user_ids)
+        return [
+            UserResponse(
+                _id=str(user["_id"]),
+                username=user["username"],
+                email=user["email"],
+                is_active=user["is_active"],
+                created_at=user["created_at"]
+            )
+            for user in users
+        ]
+
     async def get_all_users(self, skip: int = 0, limit: int = 100) -> List[UserResponse]:
         """Get all users"""
         users = await self.user_repository.get_all(skip=skip, limit=limit)
@@ -80,6 +190,24 @@ class UserService:
             for user in users
         ]
 
+    def export_users(
+        self,
+        export_format: str = "ndjson",
+        fields: Optional[str] = None,
+        active_only: bool = False,
+        compress: bool = False,
+        batch_size: int = 1000
+    ) -> AsyncIterator[bytes]:
+        """Stream users without their password hashes as NDJSON or CSV, a batch at a time"""
+        try:
+            columns = parse_fields(fields, EXPORT_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        filters = {"is_active": True} if active_only else {}
+        cursor = self.user_repository.iter_documents(filters, export_projection(columns), batch_size)
+        return export_stream(cursor, export_format, columns, batch_size=batch_size, compress=compress)
+
     async def update_user(self, user_id: str, user_update: UserUpdate) -> UserResponse:
         """Update user"""
         # Check if user exists
@@ -0,0 +1,238 @@
+import codecs
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Sequence, Tuple, TypeVar
+from bson import ObjectId
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+T = TypeVar("T")
+
+IMPORT_FORMATS = ("csv", "ndjson")
+CONTENT_TYPE_FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json-lines": "ndjson",
+}
+MAX_LINE_LENGTH = 1024 * 1024
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+GZIP_MEDIA_TYPE = "application/gzip"
+
+# (row number, parsed record or None, error message or None)
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+class ImportFormatError(ValueError):
+    """Raised when an upload cannot be parsed any further"""
+
+
+def detect_format(requested: Optional[str], content_type: Optional[str]) -> str:
+    """Import format from an explicit choice or the request content type"""
+    if requested:
+        if requested not in IMPORT_FORMATS:
+            raise ImportFormatError(f"Unsupported format '{requested}', expected one of {', '.join(IMPORT_FORMATS)}")
+        return requested
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in CONTENT_TYPE_FORMATS:
+        return CONTENT_TYPE_FORMATS[media_type]
+    raise ImportFormatError("Cannot tell the import format; pass format=csv or format=ndjson")
+
+
+async def iter_lines(chunks: AsyncIterable[bytes], max_line_length: int = MAX_LINE_LENGTH) -> AsyncIterator[str]:
+    """Decode a byte stream as UTF-8 and yield lines without their line ending; memory stays at one line"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+        if len(buffer) > max_line_length:
+            raise ImportFormatError(f"A line is longer than {max_line_length} characters")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_csv_records(lines: AsyncIterable[str]) -> AsyncIterator[Record]:
+    """Parse CSV lines with a header row into dicts; quoted fields may span lines"""
+    header: Optional[List[str]] = None
+    pending: List[str] = []
+    row_number = 0
+    async for line in lines:
+        pending.append(line)
+        # An odd number of quotes so far means a quoted field continues on the next line
+        if sum(part.count('"') for part in pending) % 2:
+            if sum(len(part) for part in pending) > MAX_LINE_LENGTH:
+                raise ImportFormatError(f"A CSV record is longer than {MAX_LINE_LENGTH} characters")
+            continue
+        record_text, pending = "\n".join(pending), []
+        if not record_text.strip():
+            continue
+
+        values = next(csv.reader([record_text]))
+        if header is None:
+            header = [column.strip() for column in values]
+            continue
+        row_number += 1
+        if len(values) > len(header):
+            yield row_number, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # Empty cells mean "not provided"
+        yield row_number, {column: value for column, value in zip(header, values) if value != ""}, None
+
+    if pending:
+        yield row_number + 1, None, "Unterminated quoted field at end of file"
+
+
+async def iter_ndjson_records(lines: AsyncIterable[str]) -> AsyncIterator[Record]:
+    """Parse one JSON object per line; blank lines are skipped"""
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "Expected a JSON object"
+            continue
+        yield row_number, record, None
+
+
+def iter_records(chunks: AsyncIterable[bytes], import_format: str) -> AsyncIterator[Record]:
+    """Parse an upload in the given format into numbered records"""
+    lines = iter_lines(chunks)
+    return iter_csv_records(lines) if import_format == "csv" else iter_ndjson_records(lines)
+
+
+def validation_messages(error: ValidationError) -> List[str]:
+    """One "field: message" line per validation error of a record"""
+    return [f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()]
+
+
+async def batched(items: AsyncIterable[T], size: int) -> AsyncIterator[List[T]]:
+    """Group an async stream into lists of at most size items"""
+    batch: List[T] = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def iter_file(path: str, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """Read a file in chunks, for the command line tools"""
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> List[str]:
+    """Export columns from a comma-separated list, or every allowed column; raises ValueError for unknown ones"""
+    if not fields:
+        return list(allowed)
+    columns = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [column for column in columns if column not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields {', '.join(unknown)}; expected some of {', '.join(allowed)}")
+    if not columns:
+        raise ValueError("No fields requested")
+    return columns
+
+
+def export_projection(columns: Sequence[str]) -> Dict[str, int]:
+    """Inclusion projection that fetches only the exported columns"""
+    projection = {column: 1 for column in columns}
+    # _id is returned unless explicitly excluded
+    if "_id" not in projection:
+        projection["_id"] = 0
+    return projection
+
+
+def _export_value(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_ndjson(documents: List[Dict[str, Any]], columns: Sequence[str]) -> bytes:
+    """One JSON object per document with the given columns; missing values are null"""
+    lines = (
+        json.dumps({column: _export_value(document.get(column)) for column in columns}, default=str)
+        for document in documents
+    )
+    return "".join(line + "\n" for line in lines).encode("utf-8")
+
+
+def encode_csv(documents: List[Dict[str, Any]], columns: Sequence[str], header: bool = False) -> bytes:
+    """CSV rows of the given columns, optionally preceded by the header row; missing values are empty"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(columns)
+    for document in documents:
+        row = (_export_value(document.get(column)) for column in columns)
+        writer.writerow("" if value is None else value for value in row)
+    return buffer.getvalue().encode("utf-8")
+
+
+async def export_stream(
+    documents: AsyncIterable[Dict[str, Any]],
+    export_format: str,
+    columns: Sequence[str],
+    batch_size: int = 1000,
+    compress: bool = False
+) -> AsyncIterator[bytes]:
+    """Encode a document stream one batch at a time, optionally gzipped; memory stays at one batch"""
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def emit(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor is not None else data
+
+    if export_format == "csv":
+        data = emit(encode_csv([], columns, header=True))
+        if data:
+            yield data
+    async for batch in batched(documents, batch_size):
+        if export_format == "csv":
+            data = emit(encode_csv(batch, columns))
+        else:
+            data = emit(encode_ndjson(batch, columns))
+        if data:
+            yield data
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def export_filename(name: str, export_format: str, compress: bool = False) -> str:
+    """Download file name for an export"""
+    return f"{name}.{export_format}" + (".gz" if compress else "")
+
+
+def export_response(body: AsyncIterator[bytes], name: str, export_format: str, compress: bool = False) -> StreamingResponse:
+    """Stream an export to the client as a file download"""
+    return StreamingResponse(
+        body,
+        media_type=GZIP_MEDIA_TYPE if compress else EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(name, export_format, compress)}"'}
+    )
@@ -0,0 +1,78 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+BatchLoadFn = Callable[[List[Any]], Awaitable[Sequence[Any]]]
+
+# Loaders of the request currently being handled (None outside of a request)
+_request_loaders: ContextVar[Optional[Dict[Hashable, "DataLoader"]]] = ContextVar("request_loaders", default=None)
+
+
+class DataLoader:
+    """Coalesces load() calls made in the same event-loop tick into one batch call"""
+
+    def __init__(self, batch_load_fn: BatchLoadFn, max_batch_size: int = 1000):
+        self.batch_load_fn = batch_load_fn
+        self.max_batch_size = max_batch_size
+        self._queue: List[Tuple[Any, asyncio.Future]] = []
+        self._tasks = set()
+
+    async def load(self, key: Any) -> Any:
+        """Queue a key and wait for the batch it ends up in"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((key, future))
+
+        # The first key of a tick schedules the dispatch; everything queued before it runs joins the batch
+        if len(self._queue) == 1:
+            loop.call_soon(self._dispatch)
+        return await future
+
+    async def load_many(self, keys: Sequence[Any]) -> List[Any]:
+        """Load several keys, batched together with any other pending loads"""
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self):
+        queue, self._queue = self._queue, []
+        for start in range(0, len(queue), self.max_batch_size):
+            task = asyncio.ensure_future(self._run_batch(queue[start:start + self.max_batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        keys = list(dict.fromkeys(key for key, _ in batch))
+        try:
+            values = await self.batch_load_fn(keys)
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        results = dict(zip(keys, values))
+        for key, future in batch:
+            if not future.done():
+                future.set_result(results.get(key))
+
+
+@contextmanager
+def request_loader_scope():
+    """Give the current request its own set of loaders"""
+    token = _request_loaders.set({})
+    try:
+        yield
+    finally:
+        _request_loaders.reset(token)
+
+
+def get_request_loader(name: Hashable, batch_load_fn: BatchLoadFn) -> Optional[DataLoader]:
+    """Get (or create) the named loader of the current request, or None outside of a request"""
+    loaders = _request_loaders.get()
+    if loaders is None:
+        return None
+
+    loader = loaders.get(name)
+    if loader is None:
+        loader = loaders[name] = DataLoader(batch_load_fn)
+    return loader
@@ -0,0 +1,35 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+# Monotonic time by which the current request must be answered
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the request deadline passed before a database operation could start"""
+
+
+def set_deadline(timeout_seconds: float):
+    """Give the current request timeout_seconds from now to finish"""
+    _deadline.set(time.monotonic() + timeout_seconds)
+
+
+def remaining_ms() -> Optional[int]:
+    """Milliseconds left before the deadline, or None without a deadline"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    remaining = int((deadline - time.monotonic()) * 1000)
+    if remaining <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return remaining
+
+
+def request_deadline(timeout_seconds: float):
+    """Route dependency factory that sets the request deadline; a route-level one overrides the app default"""
+
+    async def set_request_deadline():
+        set_deadline(timeout_seconds)
+
+    return set_request_deadline
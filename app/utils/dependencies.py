@@ -1,14 +1,28 @@
-from fastapi import Depends, HTTPException, status
+import hmac
+from fastapi import Depends, Header, HTTPException, status, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Optional
+from typing import List, Optional
 from ..utils.security import verify_token
 from ..models.user import TokenData, User
 from ..repositories.user_repository import UserRepository
 from ..config.database import get_database
+from ..config.settings import settings
+from ..utils.deadline import request_deadline
+from ..monitoring.tracing import traced
 
 security = HTTPBearer()
 
+MAX_BATCH_IDS = 1000
+EXPANDABLE_RELATIONS = {"brand"}
 
+# Regex searches cannot use an index, so they get a tighter deadline than the app default
+search_deadline = request_deadline(settings.search_deadline_seconds)
+
+# Bulk imports and exports stream for as long as the file takes
+bulk_deadline = request_deadline(settings.bulk_deadline_seconds)
+
+
+@traced()
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db = Depends(get_database)
@@ -32,7 +46,51 @@ async def get_current_user(
     return user
 
 
+def admin_token_required(setting: str):
+    """Dependency that admits requests carrying the admin token named by a setting in X-Admin-Token; without a token configured the route does not exist"""
+    def check_admin_token(x_admin_token: Optional[str] = Header(None)):
+        token = getattr(settings, setting)
+        if not token:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+        if x_admin_token is None or not hmac.compare_digest(x_admin_token, token):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+    return check_admin_token
+
+
 async def get_current_active_user(current_user: dict = Depends(get_current_user)):
     if not current_user["is_active"]:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+def get_ids_query(
+    ids: Optional[str] = Query(None, description="Comma-separated list of IDs to fetch in one request")
+) -> Optional[List[str]]:
+    """Parse the comma-separated ids query parameter used for batch gets"""
+    if ids is None:
+        return None
+    
+    id_list = [document_id.strip() for document_id in ids.split(",") if document_id.strip()]
+    if len(id_list) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_IDS} ids can be requested at once"
+        )
+    return id_list
+
+
+def get_expand_query(
+    expand: Optional[str] = Query(None, description="Comma-separated related resources to include; supported: brand")
+) -> List[str]:
+    """Parse the comma-separated expand query parameter"""
+    if not expand:
+        return []
+    
+    relations = [relation.strip() for relation in expand.split(",") if relation.strip()]
+    unknown = set(relations) - EXPANDABLE_RELATIONS
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot expand: {', '.join(sorted(unknown))}"
+        )
+    return relations
@@ -0,0 +1,77 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Iterable, Optional, Tuple
+from fastapi import Request, Response, status
+
+Validators = Tuple[str, Optional[datetime]]
+
+
+def _version(document_id: str, created_at: Optional[datetime], updated_at: Optional[datetime]) -> str:
+    modified_at = updated_at or created_at
+    return f"{document_id}:{modified_at.isoformat() if modified_at else ''}"
+
+
+def _make_etag(versions: Iterable[str]) -> str:
+    digest = hashlib.sha1("|".join(versions).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def document_validators(document_id: str, created_at: Optional[datetime], updated_at: Optional[datetime]) -> Validators:
+    """ETag and Last-Modified of a single document"""
+    return _make_etag([_version(document_id, created_at, updated_at)]), updated_at or created_at
+
+
+def list_validators(items: Iterable[Any]) -> Validators:
+    """
+    ETag of a list page or composite representation of response models, and no Last-Modified:
+    an item deleted or pushed off the page changes the response without advancing any timestamp.
+    """
+    return _make_etag(_version(item.id, item.created_at, item.updated_at) for item in items), None
+
+
+def _to_http_date(value: datetime) -> datetime:
+    # Datetimes are stored as naive UTC and HTTP dates only have second precision
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def has_conditional_headers(request: Request) -> bool:
+    """Check if the request carries If-None-Match or If-Modified-Since"""
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since against the current validators; without a Last-Modified only the ETag counts"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison is allowed for If-None-Match
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return _to_http_date(last_modified) <= since
+
+    return False
+
+
+def set_cache_headers(response: Response, etag: str, last_modified: Optional[datetime]):
+    """Attach ETag and Last-Modified headers to a response"""
+    response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = format_datetime(_to_http_date(last_modified), usegmt=True)
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime]) -> Response:
+    """Build an empty 304 Not Modified response carrying the validators"""
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_cache_headers(response, etag, last_modified)
+    return response
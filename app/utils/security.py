@@ -1,12 +1,18 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 from ..config.settings import settings
 from ..models.user import TokenData
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+_hash_executor: Optional[ProcessPoolExecutor] = None
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against its hash"""
@@ -18,6 +24,49 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _hash_many(passwords: List[str]) -> List[str]:
+    # Runs in a worker process
+    return [get_password_hash(password) for password in passwords]
+
+
+def password_hash_workers() -> int:
+    """Number of processes hashing passwords for bulk imports"""
+    return settings.password_hash_workers or os.cpu_count() or 1
+
+
+def _get_hash_executor() -> ProcessPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        # Spawned workers do not inherit the parent's threads, sockets or event loop
+        _hash_executor = ProcessPoolExecutor(
+            max_workers=password_hash_workers(),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _hash_executor
+
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash passwords in parallel on a process pool, in input order, without blocking the event loop"""
+    if not passwords:
+        return []
+    workers = min(password_hash_workers(), len(passwords))
+    # One contiguous slice per worker keeps inter-process overhead to a message each way
+    size = -(-len(passwords) // workers)
+    slices = [passwords[start:start + size] for start in range(0, len(passwords), size)]
+    loop = asyncio.get_running_loop()
+    executor = _get_hash_executor()
+    hashed = await asyncio.gather(*(loop.run_in_executor(executor, _hash_many, part) for part in slices))
+    return [password_hash for part in hashed for password_hash in part]
+
+
+def shutdown_password_hashing():
+    """Stop the password hashing processes, if they were started"""
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -0,0 +1,16 @@
+from typing import Optional
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase a name and collapse whitespace, for case-insensitive prefix matching"""
+    return " ".join(name.split()).lower()
+
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest string greater than every string starting with prefix, or None if unbounded"""
+    while prefix:
+        last = ord(prefix[-1])
+        if last < 0x10FFFF:
+            return prefix[:-1] + chr(last + 1)
+        prefix = prefix[:-1]
+    return None
@@ -0,0 +1,121 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (normalized key, document ID, display name); tuples sort by key, then ID
+Entry = Tuple[str, str, str]
+
+
+class _TrieNode:
+    __slots__ = ("children", "entries", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.entries: Dict[str, Entry] = {}
+        self.top: List[Entry] = []
+
+
+class PrefixTrie:
+    """
+    Trie of names where every node keeps the first max_suggestions entries of its subtree
+    in key order, so a lookup costs one walk down the prefix and no subtree traversal.
+    Keys longer than max_depth share the bucket at that depth, which keeps the node count low.
+    """
+
+    def __init__(self, max_suggestions: int = 20, max_depth: int = 6):
+        self.max_suggestions = max_suggestions
+        self.max_depth = max_depth
+        self.root = _TrieNode()
+        self.size = 0
+
+    @classmethod
+    def build(cls, entries: Iterable[Entry], max_suggestions: int = 20, max_depth: int = 6) -> "PrefixTrie":
+        """Build a trie in one pass, computing the per-node suggestions once at the end"""
+        trie = cls(max_suggestions, max_depth)
+        for entry in entries:
+            node = trie._walk(entry[0], create=True)[-1]
+            if entry[1] not in node.entries:
+                trie.size += 1
+            node.entries[entry[1]] = entry
+
+        # Post-order without recursion: children are finished before their parent
+        stack = [(trie.root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if children_done:
+                trie._refresh(node)
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children.values())
+        return trie
+
+    def __len__(self) -> int:
+        return self.size
+
+    def insert(self, key: str, document_id: str, name: str):
+        """Add an entry, or replace the one with the same key and ID"""
+        path = self._walk(key, create=True)
+        if document_id not in path[-1].entries:
+            self.size += 1
+        path[-1].entries[document_id] = (key, document_id, name)
+        self._refresh_path(path)
+
+    def remove(self, key: str, document_id: str):
+        """Remove an entry if present"""
+        path = self._walk(key)
+        if len(path) <= min(len(key), self.max_depth):
+            return
+        entry = path[-1].entries.get(document_id)
+        if entry is None or entry[0] != key:
+            return
+        del path[-1].entries[document_id]
+        self.size -= 1
+
+        # Drop nodes that no longer lead anywhere
+        for depth in range(len(path) - 1, 0, -1):
+            node = path[depth]
+            if node.entries or node.children:
+                break
+            del path[depth - 1].children[key[depth - 1]]
+            path.pop()
+        self._refresh_path(path)
+
+    def suggest(self, prefix: str, limit: Optional[int] = None) -> List[Entry]:
+        """Entries whose key starts with prefix, in key order"""
+        limit = limit or self.max_suggestions
+        path = self._walk(prefix)
+        if len(path) <= min(len(prefix), self.max_depth):
+            return []
+        node = path[-1]
+        if len(prefix) <= self.max_depth:
+            return node.top[:limit]
+
+        # Past the depth limit: filter the bucket
+        matches = sorted(entry for entry in node.entries.values() if entry[0].startswith(prefix))
+        return matches[:limit]
+
+    def _walk(self, key: str, create: bool = False) -> List[_TrieNode]:
+        path = [self.root]
+        for char in key[:self.max_depth]:
+            child = path[-1].children.get(char)
+            if child is None:
+                if not create:
+                    break
+                child = path[-1].children[char] = _TrieNode()
+            path.append(child)
+        return path
+
+    def _refresh_path(self, path: List[_TrieNode]):
+        for node in reversed(path):
+            self._refresh(node)
+
+    def _refresh(self, node: _TrieNode):
+        if not node.entries and len(node.children) == 1:
+            # Most nodes sit on a single-child chain; lists are never mutated, so share it
+            node.top = next(iter(node.children.values())).top
+            return
+        # A key is smaller than all of its extensions, so a node's own entries come first
+        top = sorted(node.entries.values())
+        for char in sorted(node.children):
+            if len(top) >= self.max_suggestions:
+                break
+            top.extend(node.children[char].top)
+        node.top = top[:self.max_suggestions]
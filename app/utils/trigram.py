@@ -0,0 +1,106 @@
+import re
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of each word padded like pg_trgm ("  word "), so short words and word starts count"""
+    grams = set()
+    for word in WORD_PATTERN.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return grams
+
+
+def similarity(left: Set[str], right: Set[str]) -> float:
+    """Shared trigrams over all trigrams of both sides"""
+    if not left or not right:
+        return 0.0
+    shared = len(left & right)
+    return shared / (len(left) + len(right) - shared)
+
+
+class TrigramIndex:
+    """
+    In-memory inverted index from trigram to document ordinals. Lookups read the rarest
+    query trigrams first and stop after max_postings postings, then rerank the best
+    candidates by exact similarity, so latency stays bounded however large the index is.
+    """
+
+    def __init__(self, max_postings: int = 100000, rerank_candidates: int = 200):
+        self.max_postings = max_postings
+        self.rerank_candidates = rerank_candidates
+        self.postings: Dict[str, array] = {}
+        self.keys: List[Optional[str]] = []
+        self.ids: List[Optional[str]] = []
+        self.ordinals: Dict[str, int] = {}
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[str, str]], **kwargs) -> "TrigramIndex":
+        """Build an index from (document ID, text) pairs"""
+        index = cls(**kwargs)
+        for document_id, text in documents:
+            index.add(document_id, text)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    @property
+    def removed(self) -> int:
+        """Documents removed or replaced since the index was built"""
+        return len(self.keys) - len(self.ordinals)
+
+    def add(self, document_id: str, text: str):
+        """Index a document, replacing an earlier version"""
+        self.remove(document_id)
+        ordinal = len(self.keys)
+        self.keys.append(text)
+        self.ids.append(document_id)
+        self.ordinals[document_id] = ordinal
+        postings = self.postings
+        for gram in trigrams(text):
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array("I")
+            posting.append(ordinal)
+
+    def remove(self, document_id: str):
+        """Forget a document; its postings are skipped until the next rebuild"""
+        ordinal = self.ordinals.pop(document_id, None)
+        if ordinal is not None:
+            self.keys[ordinal] = None
+            self.ids[ordinal] = None
+
+    def search(self, query: str, limit: int = 10, min_similarity: float = 0.3) -> List[Tuple[str, float]]:
+        """(document ID, similarity) pairs of the most similar documents, best first"""
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        # Count shared trigrams, rarest first, within the postings budget
+        counts: Counter = Counter()
+        budget = self.max_postings
+        for gram in sorted(query_grams, key=lambda gram: len(self.postings.get(gram, ()))):
+            posting = self.postings.get(gram)
+            if not posting:
+                continue
+            if len(posting) > budget:
+                break
+            budget -= len(posting)
+            counts.update(posting)
+
+        candidates = counts.most_common(self.rerank_candidates)
+        results = []
+        for ordinal, _ in candidates:
+            key = self.keys[ordinal]
+            if key is None:
+                continue
+            score = similarity(query_grams, trigrams(key))
+            if score >= min_similarity:
+                results.append((score, key, self.ids[ordinal]))
+        results.sort(key=lambda result: (-result[0], result[1]))
+        return [(document_id, score) for score, _, document_id in results[:limit]]
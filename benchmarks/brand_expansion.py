@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.repositories.brand_repository import BrandRepository
+from app.repositories.product_repository import ProductRepository
+from app.services.product_service import ProductService
+
+
+async def seed(product_repository: ProductRepository, brand_repository: BrandRepository, products: int, brands: int):
+    """Replace both collections with synthetic products that reference synthetic brands"""
+    await product_repository.collection.delete_many({})
+    await brand_repository.collection.delete_many({})
+
+    now = datetime.utcnow()
+    result = await brand_repository.collection.insert_many([
+        {"name": f"Brand {index:05d}", "description": None, "is_active": True, "created_at": now}
+        for index in range(brands)
+    ])
+    brand_ids = result.inserted_ids
+
+    rng = random.Random(7)
+    batch_size = 5000
+    for start in range(0, products, batch_size):
+        await product_repository.collection.insert_many([
+            {
+                "name": f"Product {index:08d}",
+                "description": None,
+                "price": round(rng.uniform(1, 500), 2),
+                "category": "Benchmark",
+                "stock_quantity": rng.randint(0, 500),
+                "brand_id": rng.choice(brand_ids),
+                "is_active": True,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for index in range(start, min(start + batch_size, products))
+        ])
+
+
+async def expand_per_row(service: ProductService, brand_repository: BrandRepository, skip: int, limit: int):
+    # The N+1 pattern clients use today: one brand lookup per product row
+    products = await service.get_all_products(skip=skip, limit=limit)
+    for product in products:
+        if product.brand_id:
+            await brand_repository.get_by_id(product.brand_id)
+    return products
+
+
+async def expand_batched(service: ProductService, skip: int, limit: int):
+    products = await service.get_all_products(skip=skip, limit=limit)
+    return await service.expand_brands(products)
+
+
+async def expand_lookup(product_repository: ProductRepository, skip: int, limit: int):
+    return await product_repository.get_all_with_brand(skip=skip, limit=limit)
+
+
+async def measure(name: str, run, pages: int, page_size: int):
+    latencies = []
+    for page in range(pages):
+        started = time.perf_counter()
+        await run(page * page_size, page_size)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return name, {
+        "p50_ms": round(statistics.median(latencies), 2),
+        "max_ms": round(latencies[-1], 2),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+    }
+
+
+async def main(args):
+    client = AsyncIOMotorClient(args.mongodb_url)
+    database = client[args.database]
+    product_repository = ProductRepository(database)
+    brand_repository = BrandRepository(database)
+    service = ProductService(product_repository, brand_repository)
+
+    if not args.skip_seed:
+        await seed(product_repository, brand_repository, args.page_size * args.pages, args.brands)
+
+    strategies = [
+        ("batched_in", lambda skip, limit: expand_batched(service, skip, limit)),
+        ("lookup_aggregation", lambda skip, limit: expand_lookup(product_repository, skip, limit)),
+    ]
+    if not args.skip_per_row:
+        strategies.append(("per_row_n_plus_1", lambda skip, limit: expand_per_row(service, brand_repository, skip, limit)))
+
+    report = {"page_size": args.page_size, "pages": args.pages, "brands": args.brands, "strategies": {}}
+    for name, run in strategies:
+        name, stats = await measure(name, run, args.pages, args.page_size)
+        report["strategies"][name] = stats
+    print(json.dumps(report, indent=2))
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare brand expansion strategies for product list pages")
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="python_web_api_benchmark")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--brands", type=int, default=500)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the data seeded by a previous run")
+    parser.add_argument("--skip-per-row", action="store_true", help="Leave out the slow N+1 baseline")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,88 @@
+import argparse
+import json
+import random
+import statistics
+import string
+import time
+from app.utils.text import normalize_name
+from app.utils.trigram import TrigramIndex
+
+
+def make_names(count: int, vocabulary: int, rng: random.Random):
+    """Synthetic product names of two to four words from a fixed vocabulary"""
+    words = [
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+        for _ in range(vocabulary)
+    ]
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(2, 4))).title() for _ in range(count)]
+
+
+def add_typos(name: str, typos: int, rng: random.Random) -> str:
+    """Apply random substitutions, deletions, insertions or transpositions"""
+    for _ in range(typos):
+        position = rng.randrange(len(name))
+        kind = rng.choice(("substitute", "delete", "insert", "transpose"))
+        if kind == "substitute":
+            name = name[:position] + rng.choice(string.ascii_lowercase) + name[position + 1:]
+        elif kind == "delete" and len(name) > 1:
+            name = name[:position] + name[position + 1:]
+        elif kind == "insert":
+            name = name[:position] + rng.choice(string.ascii_lowercase) + name[position:]
+        elif position < len(name) - 1:
+            name = name[:position] + name[position + 1] + name[position] + name[position + 2:]
+    return name
+
+
+def percentile(values, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    names = make_names(args.products, args.vocabulary, rng)
+
+    started = time.perf_counter()
+    index = TrigramIndex.build(
+        ((str(ordinal), normalize_name(name)) for ordinal, name in enumerate(names)),
+        max_postings=args.max_postings
+    )
+    build_seconds = time.perf_counter() - started
+
+    report = {
+        "products": args.products,
+        "max_postings": args.max_postings,
+        "build_seconds": round(build_seconds, 2),
+        "trigrams": len(index.postings),
+        "by_typos": {},
+    }
+    for typos in range(args.max_typos + 1):
+        latencies, hits = [], 0
+        for _ in range(args.queries):
+            target = rng.randrange(len(names))
+            query = add_typos(names[target], typos, rng)
+            started = time.perf_counter()
+            results = index.search(normalize_name(query), limit=args.k, min_similarity=args.min_similarity)
+            latencies.append((time.perf_counter() - started) * 1000)
+            hits += str(target) in (document_id for document_id, _ in results)
+        latencies.sort()
+        report["by_typos"][typos] = {
+            f"recall_at_{args.k}": round(hits / args.queries, 3),
+            "p50_ms": round(statistics.median(latencies), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "max_ms": round(latencies[-1], 2),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure recall and latency of fuzzy product name search")
+    parser.add_argument("--products", type=int, default=1000000)
+    parser.add_argument("--vocabulary", type=int, default=20000, help="Number of distinct words names are made of")
+    parser.add_argument("--queries", type=int, default=500, help="Queries per typo count")
+    parser.add_argument("--max-typos", type=int, default=2)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--min-similarity", type=float, default=0.3)
+    parser.add_argument("--max-postings", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
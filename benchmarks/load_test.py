@@ -0,0 +1,291 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config.settings import settings
+from benchmarks.seed import ADJECTIVES, BENCHMARK_PASSWORD, BENCHMARK_USERNAME, CATEGORIES, NOUNS, seed
+
+API = "/api/v1"
+
+
+class Operation(NamedTuple):
+    label: str
+    kind: str
+    weight: float
+    send: Callable[[httpx.AsyncClient, "State", random.Random], Awaitable[httpx.Response]]
+
+
+class State:
+    """What the workload needs to know about the seeded data"""
+
+    def __init__(self, headers: Dict[str, str], product_ids: List[str]):
+        self.headers = headers
+        self.product_ids = product_ids
+        self.created = 0
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0
+        self.dropped = 0
+
+    def record(self, latency_ms: float, status: Optional[int]):
+        self.latencies.append(latency_ms)
+        self.statuses[str(status) if status is not None else "exception"] += 1
+        if status is None or status >= 500:
+            self.errors += 1
+
+    def summary(self, duration_seconds: float) -> dict:
+        latencies = sorted(self.latencies)
+        report = {
+            "requests": len(latencies),
+            "throughput_rps": round(len(latencies) / duration_seconds, 1),
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "status_codes": dict(self.statuses),
+        }
+        if latencies:
+            report.update({
+                "p50_ms": round(statistics.median(latencies), 2),
+                "p95_ms": round(percentile(latencies, 0.95), 2),
+                "p99_ms": round(percentile(latencies, 0.99), 2),
+                "max_ms": round(latencies[-1], 2),
+            })
+        return report
+
+
+def percentile(values, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def list_products(client, state, rng):
+    return await client.get(f"{API}/products/", params={"skip": rng.randint(0, 1000), "limit": 20}, headers=state.headers)
+
+
+async def get_product(client, state, rng):
+    return await client.get(f"{API}/products/{rng.choice(state.product_ids)}", headers=state.headers)
+
+
+async def search_products(client, state, rng):
+    return await client.get(f"{API}/products/search/{rng.choice(NOUNS)}", params={"limit": 20}, headers=state.headers)
+
+
+async def autocomplete_products(client, state, rng):
+    return await client.get(f"{API}/products/autocomplete", params={"q": rng.choice(ADJECTIVES)[:3]}, headers=state.headers)
+
+
+async def price_range(client, state, rng):
+    low = round(rng.uniform(1, 200), 2)
+    params = {"min_price": low, "max_price": low + 50, "limit": 20}
+    return await client.get(f"{API}/products/price-range", params=params, headers=state.headers)
+
+
+async def list_brands(client, state, rng):
+    return await client.get(f"{API}/brands/", params={"limit": 50}, headers=state.headers)
+
+
+async def create_product(client, state, rng):
+    state.created += 1
+    body = {
+        "name": f"Load Test {rng.choice(NOUNS)} {time.time_ns():x}{state.created}",
+        "price": round(rng.uniform(1, 500), 2),
+        "category": rng.choice(CATEGORIES),
+        "stock_quantity": rng.randint(0, 200),
+    }
+    return await client.post(f"{API}/products/", json=body, headers=state.headers)
+
+
+async def update_product(client, state, rng):
+    body = {"price": round(rng.uniform(1, 500), 2), "stock_quantity": rng.randint(0, 200)}
+    return await client.put(f"{API}/products/{rng.choice(state.product_ids)}", json=body, headers=state.headers)
+
+
+async def login(client, state, rng):
+    return await client.post(f"{API}/auth/login-json", json={"username": BENCHMARK_USERNAME, "password": BENCHMARK_PASSWORD})
+
+
+def build_operations(mix: Dict[str, float]) -> List[Operation]:
+    """Weighted operations; each kind's share is split evenly across its endpoints"""
+    endpoints = {
+        "read": [
+            ("GET /products/", list_products),
+            ("GET /products/{product_id}", get_product),
+            ("GET /products/search/{search_term}", search_products),
+            ("GET /products/autocomplete", autocomplete_products),
+            ("GET /products/price-range", price_range),
+            ("GET /brands/", list_brands),
+        ],
+        "write": [
+            ("POST /products/", create_product),
+            ("PUT /products/{product_id}", update_product),
+        ],
+        "auth": [
+            ("POST /auth/login-json", login),
+        ],
+    }
+    operations = []
+    for kind, share in mix.items():
+        for label, send in endpoints[kind]:
+            operations.append(Operation(label, kind, share / len(endpoints[kind]), send))
+    return operations
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        kind, _, share = part.partition("=")
+        if kind not in ("read", "write", "auth"):
+            raise argparse.ArgumentTypeError(f"Unknown workload kind '{kind}'")
+        mix[kind] = float(share)
+    return mix
+
+
+async def prepare(client: httpx.AsyncClient) -> State:
+    """Log in as the seeded benchmark user and sample product IDs to read and update"""
+    response = await client.post(
+        f"{API}/auth/login-json",
+        json={"username": BENCHMARK_USERNAME, "password": BENCHMARK_PASSWORD}
+    )
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    response = await client.get(f"{API}/products/", params={"limit": 1000}, headers=headers)
+    response.raise_for_status()
+    product_ids = [product["_id"] for product in response.json()]
+    if not product_ids:
+        raise SystemExit("No products found; seed the database first")
+    return State(headers, product_ids)
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    state: State,
+    operations: List[Operation],
+    rps: float,
+    duration_seconds: float,
+    max_in_flight: int,
+    rng: random.Random
+) -> Dict[str, EndpointStats]:
+    """
+    Open-loop load: requests are started on a fixed schedule whether or not earlier ones finished.
+    Latency is measured from the scheduled start, so queueing in a slow server is not hidden.
+    """
+    stats: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+    weights = [operation.weight for operation in operations]
+    loop = asyncio.get_running_loop()
+    tasks = set()
+    in_flight = 0
+
+    async def issue(operation: Operation, scheduled: float):
+        nonlocal in_flight
+        status = None
+        try:
+            response = await operation.send(client, state, rng)
+            status = response.status_code
+        except httpx.HTTPError:
+            pass
+        finally:
+            in_flight -= 1
+            stats[operation.label].record((loop.time() - scheduled) * 1000, status)
+
+    started = loop.time()
+    for index in range(int(rps * duration_seconds)):
+        scheduled = started + index / rps
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        operation = rng.choices(operations, weights)[0]
+        if in_flight >= max_in_flight:
+            # The generator itself is saturated; count it rather than queue unboundedly
+            stats[operation.label].dropped += 1
+            continue
+        in_flight += 1
+        task = asyncio.create_task(issue(operation, scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    return stats
+
+
+def build_report(args, stats: Dict[str, EndpointStats], duration_seconds: float) -> dict:
+    all_latencies = sorted(latency for endpoint in stats.values() for latency in endpoint.latencies)
+    total = EndpointStats()
+    total.latencies = all_latencies
+    total.errors = sum(endpoint.errors for endpoint in stats.values())
+    total.dropped = sum(endpoint.dropped for endpoint in stats.values())
+    for endpoint in stats.values():
+        total.statuses.update(endpoint.statuses)
+    return {
+        "target": "in-memory" if args.memory else "in-process" if args.in_process else args.base_url,
+        "target_rps": args.rps,
+        "duration_seconds": round(duration_seconds, 2),
+        "mix": args.mix,
+        "overall": total.summary(duration_seconds),
+        "endpoints": {label: stats[label].summary(duration_seconds) for label in sorted(stats)},
+    }
+
+
+async def main(args):
+    if args.memory:
+        # The data lives in the app's process, so it is seeded after startup
+        args.in_process = True
+        settings.database_backend = "memory"
+    elif args.seed_products:
+        mongo = AsyncIOMotorClient(settings.mongodb_url)
+        await seed(mongo[settings.database_name], args.seed_products, args.seed_brands, args.seed_users)
+        mongo.close()
+
+    app = None
+    if args.in_process:
+        from app.main import app
+        from app.config.database import get_database
+        await app.router.startup()
+        if args.memory:
+            await seed(await get_database(), args.seed_products or 10000, args.seed_brands, args.seed_users)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=args.timeout)
+    else:
+        limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits)
+
+    try:
+        state = await prepare(client)
+        rng = random.Random(args.seed)
+        started = time.perf_counter()
+        stats = await run_load(client, state, build_operations(args.mix), args.rps, args.duration, args.max_in_flight, rng)
+        report = build_report(args, stats, time.perf_counter() - started)
+    finally:
+        await client.aclose()
+        if app is not None:
+            await app.router.shutdown()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive a mixed read/write/auth workload against the API at a target RPS")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--in-process", action="store_true", help="Serve the app in this process instead of over HTTP")
+    parser.add_argument("--memory", action="store_true", help="Serve the app in process on the in-memory database backend")
+    parser.add_argument("--rps", type=float, default=200)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    parser.add_argument("--mix", type=parse_mix, default="read=80,write=15,auth=5", help="Share of each workload kind")
+    parser.add_argument("--max-in-flight", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed-products", type=int, default=0, help="Seed this many products first (10k to 10M)")
+    parser.add_argument("--seed-brands", type=int, default=500)
+    parser.add_argument("--seed-users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    asyncio.run(main(parser.parse_args()))
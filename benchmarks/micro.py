@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+from bson import ObjectId
+from app.models.product import ProductCreate
+from app.models.user import UserCreate
+from app.services.brand_service import BrandService
+from app.services.product_service import ProductService
+from app.utils.security import create_access_token, verify_token
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+
+# (name, batch size, setup returning the function to time); each call processes one batch
+Case = Tuple[str, int, Callable[[int], Callable[[], object]]]
+
+
+def product_documents(count: int) -> List[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": ObjectId(),
+            "name": f"Ergonomic Oak Chair {index}",
+            "name_lower": f"ergonomic oak chair {index}",
+            "description": "A chair for everyday use",
+            "price": 100.0 + index,
+            "category": "Furniture",
+            "stock_quantity": index % 50,
+            "low_stock": index % 50 <= 10,
+            "brand_id": ObjectId() if index % 2 else None,
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now + timedelta(seconds=index),
+        }
+        for index in range(count)
+    ]
+
+
+def map_products(batch: int):
+    service = ProductService(product_repository=None)
+    documents = product_documents(batch)
+    return lambda: [service._to_response(document) for document in documents]
+
+
+def map_brands(batch: int):
+    service = BrandService(brand_repository=None)
+    now = datetime.utcnow()
+    documents = [
+        {"_id": ObjectId(), "name": f"Brand {index}", "description": None, "is_active": True, "created_at": now}
+        for index in range(batch)
+    ]
+    return lambda: [service._to_response(document) for document in documents]
+
+
+def validate_product_create(batch: int):
+    payloads = [
+        {"name": f"Product {index}", "description": "Desc", "price": "19.99", "category": "Books", "stock_quantity": "5"}
+        for index in range(batch)
+    ]
+    return lambda: [ProductCreate.model_validate(payload) for payload in payloads]
+
+
+def validate_user_create(batch: int):
+    payloads = [
+        {"username": f"user_{index}", "email": f"user_{index}@example.com", "password": "secret123"}
+        for index in range(batch)
+    ]
+    return lambda: [UserCreate.model_validate(payload) for payload in payloads]
+
+
+def create_tokens(batch: int):
+    subjects = [{"sub": f"user_{index}"} for index in range(batch)]
+    return lambda: [create_access_token(subject) for subject in subjects]
+
+
+def verify_tokens(batch: int):
+    tokens = [create_access_token({"sub": f"user_{index}"}) for index in range(batch)]
+    return lambda: [verify_token(token) for token in tokens]
+
+
+CASES: List[Case] = [
+    ("product_service.to_response", 100, map_products),
+    ("product_service.to_response", 1000, map_products),
+    ("brand_service.to_response", 100, map_brands),
+    ("product_create.validate", 1000, validate_product_create),
+    ("user_create.validate", 1000, validate_user_create),
+    ("security.create_access_token", 100, create_tokens),
+    ("security.verify_token", 100, verify_tokens),
+]
+
+
+def measure(function: Callable[[], object], batch: int, repeat: int, min_seconds: float) -> Dict[str, float]:
+    """Per-item cost in microseconds over repeat runs, each long enough to time reliably"""
+    timer = timeit.Timer(function)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_seconds / max(elapsed, 1e-9)))
+    runs = [seconds / number / batch * 1e6 for seconds in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "min_us": round(min(runs), 3),
+        "median_us": round(statistics.median(runs), 3),
+        "stdev_us": round(statistics.stdev(runs), 3) if len(runs) > 1 else 0.0,
+        "calls_per_run": number,
+    }
+
+
+def run(selected: List[str], repeat: int, min_seconds: float) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, batch, setup in CASES:
+        if selected and not any(pattern in name for pattern in selected):
+            continue
+        results[f"{name}[{batch}]"] = {"batch": batch, **measure(setup(batch), batch, repeat, min_seconds)}
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], max_regression: float) -> List[str]:
+    """Print the change of each case against the baseline and return the regressed ones"""
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            print(f"{key:45s} {result['min_us']:10.3f} us   (no baseline)")
+            continue
+        # The minimum is the least noisy estimate of the intrinsic cost
+        ratio = result["min_us"] / previous["min_us"]
+        marker = "  REGRESSION" if ratio > max_regression else ""
+        print(f"{key:45s} {result['min_us']:10.3f} us   {previous['min_us']:10.3f} us   x{ratio:.2f}{marker}")
+        if ratio > max_regression:
+            regressions.append(key)
+    return regressions
+
+
+def main(args):
+    results = run(args.cases, args.repeat, args.min_seconds)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "created_at": datetime.utcnow().isoformat(),
+        "results": results,
+    }
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than x{args.max_regression} the baseline", file=sys.stderr)
+            sys.exit(1)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-call CPU cost of service mapping, validation and auth primitives")
+    parser.add_argument("cases", nargs="*", help="Only run cases whose name contains one of these")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-seconds", type=float, default=0.2, help="Minimum duration of each timed run")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, help=f"Save results as a baseline (default {DEFAULT_BASELINE})")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, help="Compare against a saved baseline")
+    parser.add_argument("--max-regression", type=float, default=1.25, help="Fail if a case is slower than this ratio")
+    main(parser.parse_args())
@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.repositories.product_repository import ProductRepository
+
+CATEGORIES = ["Electronics", "Books", "Home", "Garden", "Toys", "Sports", "Beauty", "Grocery"]
+
+
+async def seed_products(repository: ProductRepository, count: int, batch_size: int = 5000):
+    """Replace the collection with a synthetic catalog of the given size"""
+    await repository.collection.delete_many({})
+    await repository.ensure_indexes()
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    for start in range(0, count, batch_size):
+        documents = [
+            {
+                "name": f"Product {index:08d}",
+                "description": f"Synthetic product {index}",
+                # Two decimals over a narrow band gives plenty of price ties to exercise the _id tiebreak
+                "price": round(rng.uniform(1, 500), 2),
+                "category": rng.choice(CATEGORIES),
+                "stock_quantity": rng.randint(0, 500),
+                "is_active": True,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for index in range(start, min(start + batch_size, count))
+        ]
+        await repository.collection.insert_many(documents, ordered=False)
+
+
+def summarize(latencies_ms):
+    ordered = sorted(latencies_ms)
+    return {
+        "pages": len(ordered),
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1 if len(ordered) > 1 else 0], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+async def walk_keyset(repository: ProductRepository, page_size: int, max_pages: int, descending: bool):
+    """Walk pages sequentially with the (price, _id) keyset and time each page"""
+    latencies = []
+    after = None
+    for _ in range(max_pages):
+        started = time.perf_counter()
+        products = await repository.get_price_range_page(descending=descending, after=after, limit=page_size)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if len(products) <= page_size:
+            break
+        last = products[page_size - 1]
+        after = (last["price"], str(last["_id"]))
+    return latencies
+
+
+async def sample_skip(repository: ProductRepository, page_size: int, depths):
+    """Time skip/limit pagination at the same page depths for comparison"""
+    results = {}
+    for depth in depths:
+        started = time.perf_counter()
+        cursor = repository.collection.find({}).sort([("price", 1), ("_id", 1)]).skip(depth * page_size).limit(page_size)
+        await cursor.to_list(length=page_size)
+        results[depth] = round((time.perf_counter() - started) * 1000, 3)
+    return results
+
+
+async def main(args):
+    client = AsyncIOMotorClient(args.mongodb_url)
+    repository = ProductRepository(client[args.database])
+
+    if not args.skip_seed:
+        started = time.perf_counter()
+        await seed_products(repository, args.products)
+        print(f"Seeded {args.products} products in {time.perf_counter() - started:.1f}s")
+
+    max_pages = args.products // args.page_size
+    latencies = await walk_keyset(repository, args.page_size, max_pages, descending=args.descending)
+
+    # Bucket the keyset latencies by page depth so drift with depth is visible
+    buckets = {}
+    bucket = 1
+    while bucket <= len(latencies):
+        upper = min(bucket * 10, len(latencies))
+        buckets[f"pages_{bucket}-{upper}"] = summarize(latencies[bucket - 1:upper])
+        bucket *= 10
+
+    depths = [depth for depth in (0, 10, 100, 1000, 10000) if depth < max_pages]
+    report = {
+        "products": args.products,
+        "page_size": args.page_size,
+        "keyset": buckets,
+        "skip_limit_ms_by_page": await sample_skip(repository, args.page_size, depths),
+    }
+    print(json.dumps(report, indent=2))
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency of keyset vs skip pagination for the price-range endpoint")
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="python_web_api_benchmark")
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--descending", action="store_true")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the catalog seeded by a previous run")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,157 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config.settings import settings
+from app.utils.security import get_password_hash
+from app.utils.text import normalize_name
+
+ADJECTIVES = [
+    "Ergonomic", "Compact", "Wireless", "Portable", "Premium", "Classic", "Smart", "Rustic",
+    "Modern", "Vintage", "Heavy Duty", "Ultra Slim", "Foldable", "Waterproof", "Deluxe", "Eco",
+]
+MATERIALS = [
+    "Steel", "Oak", "Bamboo", "Leather", "Cotton", "Aluminum", "Ceramic", "Glass",
+    "Carbon", "Wool", "Walnut", "Silicone", "Granite", "Linen", "Copper", "Rubber",
+]
+NOUNS = [
+    "Chair", "Desk", "Lamp", "Keyboard", "Backpack", "Kettle", "Speaker", "Headphones",
+    "Jacket", "Bottle", "Monitor", "Mouse", "Sofa", "Bookshelf", "Blender", "Watch",
+    "Camera", "Tent", "Sneakers", "Mug", "Router", "Charger", "Pillow", "Skillet",
+]
+CATEGORIES = [
+    "Furniture", "Electronics", "Kitchen", "Outdoor", "Clothing", "Office", "Home", "Sports",
+]
+BRAND_WORDS = [
+    "Nord", "Apex", "Lumen", "Terra", "Vela", "Orbit", "Kiva", "Atlas",
+    "Pine", "Zephyr", "Cobalt", "Nimbus", "Ember", "Quill", "Summit", "Harbor",
+]
+FIRST_NAMES = ["ayse", "mehmet", "alex", "maria", "wei", "fatma", "john", "elif", "omar", "sofia"]
+
+# Every seeded user shares this password so the load test can log in as any of them
+BENCHMARK_PASSWORD = "benchmark-password"
+BENCHMARK_USERNAME = "benchmark_user_0"
+
+
+def product_name(index: int, rng: random.Random) -> str:
+    """A realistic product name; the model code keeps names unique"""
+    return f"{rng.choice(ADJECTIVES)} {rng.choice(MATERIALS)} {rng.choice(NOUNS)} M{index:06x}"
+
+
+def generate_brands(count: int, rng: random.Random) -> List[dict]:
+    now = datetime.utcnow()
+    brands = []
+    for index in range(count):
+        name = f"{rng.choice(BRAND_WORDS)}{rng.choice(BRAND_WORDS).lower()} {index}"
+        brands.append({
+            "_id": ObjectId(),
+            "name": name,
+            "name_lower": normalize_name(name),
+            "description": f"{name} makes {rng.choice(CATEGORIES).lower()} goods",
+            "is_active": rng.random() > 0.05,
+            "created_at": now,
+            "updated_at": now,
+        })
+    return brands
+
+
+def generate_products(count: int, brand_ids: List[ObjectId], rng: random.Random) -> Iterator[dict]:
+    """Products with log-normal prices, skewed stock and a brand on most rows"""
+    now = datetime.utcnow()
+    for index in range(count):
+        name = product_name(index, rng)
+        stock_quantity = int(rng.expovariate(1 / 80))
+        created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+        yield {
+            "name": name,
+            "name_lower": normalize_name(name),
+            "description": f"{name} for everyday use. {rng.choice(MATERIALS)} finish.",
+            "price": round(min(rng.lognormvariate(3.5, 1.0), 100000), 2),
+            "category": rng.choice(CATEGORIES),
+            "stock_quantity": stock_quantity,
+            "low_stock": stock_quantity <= settings.low_stock_threshold,
+            "brand_id": rng.choice(brand_ids) if brand_ids and rng.random() < 0.9 else None,
+            "is_active": rng.random() > 0.03,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+
+def generate_users(count: int, hashed_password: str, rng: random.Random) -> Iterator[dict]:
+    now = datetime.utcnow()
+    for index in range(count):
+        username = BENCHMARK_USERNAME if index == 0 else f"{rng.choice(FIRST_NAMES)}_{index}"
+        yield {
+            "username": username,
+            "email": f"{username}@example.com",
+            "hashed_password": hashed_password,
+            "is_active": True,
+            "created_at": now,
+        }
+
+
+def chunks(documents: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def insert_stream(collection, documents: Iterator[dict], batch_size: int) -> int:
+    """Insert a generated stream in unordered batches; memory stays at one batch"""
+    inserted = 0
+    for batch in chunks(documents, batch_size):
+        await collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    return inserted
+
+
+async def seed(database, products: int, brands: int, users: int, batch_size: int = 5000, seed_value: int = 7) -> dict:
+    """Replace the products, brands and users collections with synthetic data"""
+    rng = random.Random(seed_value)
+    for name in ("products", "brand", "users"):
+        await database[name].delete_many({})
+
+    started = time.perf_counter()
+    brand_documents = generate_brands(brands, rng)
+    if brand_documents:
+        await database["brand"].insert_many(brand_documents, ordered=False)
+    brand_ids = [brand["_id"] for brand in brand_documents]
+    product_count = await insert_stream(database["products"], generate_products(products, brand_ids, rng), batch_size)
+    # One hash shared by every user; hashing millions of passwords would dominate seeding
+    hashed_password = get_password_hash(BENCHMARK_PASSWORD)
+    user_count = await insert_stream(database["users"], generate_users(users, hashed_password, rng), batch_size)
+    return {
+        "products": product_count,
+        "brands": len(brand_documents),
+        "users": user_count,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+async def main(args):
+    client = AsyncIOMotorClient(args.mongodb_url)
+    report = await seed(client[args.database], args.products, args.brands, args.users, args.batch_size, args.seed)
+    print(json.dumps(report, indent=2))
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the database with synthetic products, brands and users")
+    parser.add_argument("--mongodb-url", default=settings.mongodb_url)
+    parser.add_argument("--database", default=settings.database_name)
+    parser.add_argument("--products", type=int, default=10000, help="10k to 10M products")
+    parser.add_argument("--brands", type=int, default=500)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
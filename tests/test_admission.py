@@ -0,0 +1,143 @@
+import asyncio
+import pytest
+from app.middleware.admission_middleware import AdmissionControlMiddleware, AdmissionGroup
+from app.monitoring.pool import PoolWaitMonitor
+
+
+async def call_app(app, method: str, path: str):
+    """Run a request through an ASGI app and collect the response"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app({"type": "http", "method": method, "path": path, "headers": []}, receive, send)
+    start = messages[0]
+    return start["status"], dict(start["headers"])
+
+
+class TestAdmissionGroup:
+    """Test per-group concurrency limits with a bounded queue"""
+
+    @pytest.mark.asyncio
+    async def test_queued_request_gets_released_slot(self):
+        """Test that a waiting request is admitted when a slot frees up"""
+        group = AdmissionGroup("reads", max_concurrency=1, max_queue=1, queue_timeout_seconds=1)
+        assert await group.acquire()
+
+        waiting = asyncio.ensure_future(group.acquire())
+        await asyncio.sleep(0)
+        assert group.queued == 1
+
+        group.release()
+        assert await waiting
+        assert group.active == 1
+
+    @pytest.mark.asyncio
+    async def test_full_queue_is_shed(self):
+        """Test that requests beyond the queue bound are rejected immediately"""
+        group = AdmissionGroup("writes", max_concurrency=1, max_queue=0, queue_timeout_seconds=1)
+        assert await group.acquire()
+
+        assert not await group.acquire()
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self):
+        """Test that a request waiting too long is shed and leaves the queue"""
+        group = AdmissionGroup("auth", max_concurrency=1, max_queue=5, queue_timeout_seconds=0.01)
+        assert await group.acquire()
+
+        assert not await group.acquire()
+        assert group.queued == 0
+
+        group.release()
+        assert group.active == 0
+
+
+class TestAdmissionControlMiddleware:
+    """Test shedding and exemptions in the middleware"""
+
+    @pytest.fixture(autouse=True)
+    def setup_middleware(self):
+        """Setup a middleware around an app that blocks until released"""
+        self.release = asyncio.Event()
+        self.overload = None
+
+        async def app(scope, receive, send):
+            if scope["path"].endswith("/slow"):
+                await self.release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        self.groups = {
+            "auth": AdmissionGroup("auth", 1, 0, 1),
+            "reads": AdmissionGroup("reads", 1, 0, 1),
+            "writes": AdmissionGroup("writes", 1, 0, 1),
+        }
+        self.middleware = AdmissionControlMiddleware(
+            app,
+            groups=self.groups,
+            auth_prefix="/api/v1/auth",
+            overload_check=lambda: self.overload,
+            retry_after_seconds=3
+        )
+
+    def test_classify(self):
+        """Test route group classification"""
+        assert self.middleware.classify("POST", "/api/v1/auth/login") == "auth"
+        assert self.middleware.classify("GET", "/api/v1/products/") == "reads"
+        assert self.middleware.classify("DELETE", "/api/v1/products/1") == "writes"
+        assert self.middleware.classify("GET", "/health") is None
+
+    @pytest.mark.asyncio
+    async def test_saturated_group_returns_503(self):
+        """Test that a full group sheds with Retry-After while other groups still serve"""
+        slow = asyncio.ensure_future(call_app(self.middleware, "GET", "/api/v1/products/slow"))
+        await asyncio.sleep(0)
+
+        status, headers = await call_app(self.middleware, "GET", "/api/v1/products/")
+        assert status == 503
+        assert headers[b"retry-after"] == b"3"
+
+        status, _ = await call_app(self.middleware, "POST", "/api/v1/products/")
+        assert status == 200
+
+        self.release.set()
+        assert (await slow)[0] == 200
+        assert self.groups["reads"].active == 0
+
+    @pytest.mark.asyncio
+    async def test_overload_sheds_but_health_is_exempt(self):
+        """Test that pool/loop saturation sheds requests except exempt endpoints"""
+        self.overload = "MongoDB pool wait 900ms"
+
+        status, _ = await call_app(self.middleware, "GET", "/api/v1/products/")
+        assert status == 503
+        status, _ = await call_app(self.middleware, "GET", "/health")
+        assert status == 200
+        assert self.groups["reads"].rejected == 1
+
+
+class TestPoolWaitMonitor:
+    """Test connection pool wait measurement"""
+
+    def test_pending_and_completed_waits(self, monkeypatch):
+        """Test that both in-progress and recent checkouts count, and old ones expire"""
+        now = [100.0]
+        monkeypatch.setattr("app.monitoring.pool.time.monotonic", lambda: now[0])
+        monitor = PoolWaitMonitor(window_seconds=5)
+
+        monitor.connection_check_out_started(None)
+        now[0] += 0.3
+        assert monitor.waiting() == 1
+        assert monitor.current_wait_ms() == pytest.approx(300)
+
+        monitor.connection_checked_out(None)
+        assert monitor.waiting() == 0
+        assert monitor.current_wait_ms() == pytest.approx(300)
+
+        now[0] += 6
+        assert monitor.current_wait_ms() == 0
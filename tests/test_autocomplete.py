@@ -0,0 +1,116 @@
+import random
+import pytest
+from app.cache.tiered import TieredCache
+from app.services.name_index import NameIndex
+from app.utils.text import normalize_name, prefix_upper_bound
+from app.utils.trie import PrefixTrie
+
+
+class FakeNamesRepository:
+    """Repository stand-in that returns a fixed list of active names"""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def get_active_names(self, limit):
+        return self.documents[:limit]
+
+    async def get_change_marker(self):
+        return len(self.documents), max((document["_id"] for document in self.documents), default=None), None
+
+
+class TestPrefixTrie:
+    """Test the suggestion trie"""
+
+    def test_suggestions_are_in_key_order(self):
+        """Test that suggestions match a sorted prefix scan"""
+        names = ["apple watch", "apple", "applesauce", "apricot", "banana", "app"]
+        trie = PrefixTrie.build((name, str(index), name.title()) for index, name in enumerate(names))
+
+        assert [key for key, _, _ in trie.suggest("app")] == ["app", "apple", "apple watch", "applesauce"]
+        assert [name for _, _, name in trie.suggest("apple ")] == ["Apple Watch"]
+        assert [name for _, _, name in trie.suggest("applesa")] == ["Applesauce"]
+        assert trie.suggest("cherry") == []
+        assert len(trie.suggest("", limit=2)) == 2
+
+    def test_incremental_updates_match_bulk_build(self):
+        """Test that insert/remove keep per-node suggestions equal to a fresh build"""
+        random.seed(7)
+        words = ["".join(random.choice("abc") for _ in range(random.randint(1, 5))) for _ in range(300)]
+        entries = [(word, str(index), word) for index, word in enumerate(words)]
+        trie = PrefixTrie(max_suggestions=5)
+        for entry in entries:
+            trie.insert(*entry)
+        for key, document_id, _ in entries[::3]:
+            trie.remove(key, document_id)
+
+        remaining = [entry for index, entry in enumerate(entries) if index % 3]
+        expected = PrefixTrie.build(remaining, max_suggestions=5)
+        assert len(trie) == len(remaining)
+        for prefix in ["", "a", "ab", "bca", "ccc", "abcab"]:
+            assert trie.suggest(prefix) == expected.suggest(prefix) == sorted(
+                entry for entry in remaining if entry[0].startswith(prefix)
+            )[:5]
+
+
+class TestPrefixHelpers:
+    """Test name normalization and range bounds"""
+
+    def test_normalize_name(self):
+        """Test case folding and whitespace collapsing"""
+        assert normalize_name("  Apple   WATCH ") == "apple watch"
+
+    def test_prefix_upper_bound(self):
+        """Test the exclusive upper bound of a prefix range"""
+        assert prefix_upper_bound("app") == "apq"
+        assert prefix_upper_bound("a\U0010ffff") == "b"
+        assert prefix_upper_bound("") is None
+
+
+class TestNameIndex:
+    """Test the in-process name index"""
+
+    @pytest.mark.asyncio
+    async def test_writes_are_applied(self):
+        """Test that creates, renames, deactivation and deletes update suggestions"""
+        index = NameIndex("products", cache=TieredCache())
+        await index.load(FakeNamesRepository([{"_id": "1", "name": "Laptop"}]), max_names=10)
+
+        index.put({"_id": "2", "name": "Lamp", "is_active": True})
+        assert [name for _, _, name in index.suggest("LA")] == ["Lamp", "Laptop"]
+
+        index.put({"_id": "2", "name": "Desk Lamp", "is_active": True}, previous={"_id": "2", "name": "Lamp"})
+        assert [name for _, _, name in index.suggest("la")] == ["Laptop"]
+
+        index.put({"_id": "1", "name": "Laptop", "is_active": False}, previous={"_id": "1", "name": "Laptop"})
+        index.remove({"_id": "2", "name": "Desk Lamp"})
+        assert index.suggest("") == []
+
+    @pytest.mark.asyncio
+    async def test_disabled_above_max_names(self):
+        """Test that large collections fall back to the database"""
+        documents = [{"_id": str(number), "name": f"Product {number}"} for number in range(5)]
+        index = NameIndex("products", cache=TieredCache())
+
+        await index.load(FakeNamesRepository(documents), max_names=4)
+        assert not index.ready
+
+        await index.load(FakeNamesRepository(documents), max_names=5)
+        assert index.ready
+        index.put({"_id": "6", "name": "Product 6"})
+        assert not index.ready
+
+    @pytest.mark.asyncio
+    async def test_refresh_without_shared_cache_skips_unchanged_collection(self):
+        """Test that without L2 the periodic refresh reloads only after the collection changed"""
+        repository = FakeNamesRepository([{"_id": "1", "name": "Laptop"}])
+        index = NameIndex("products", cache=TieredCache())
+        await index.start(repository, max_names=10, fuzzy_max_names=0, refresh_seconds=3600)
+        await index.stop()
+
+        assert not await index._needs_reload(repository)
+        repository.documents.append({"_id": "2", "name": "Lamp"})
+        assert await index._needs_reload(repository)
+        assert not await index._needs_reload(repository)
+        index.mark_stale()
+        assert await index._needs_reload(repository)
@@ -0,0 +1,148 @@
+import asyncio
+import pytest
+from datetime import datetime
+from bson import ObjectId
+from fastapi import HTTPException
+from app.cache.tiered import TieredCache
+from app.repositories.brand_repository import BrandRepository
+from app.repositories.memory import InMemoryDatabase
+from app.services.brand_catalog import BrandCatalog, BrandSnapshot, is_literal
+from app.services.brand_service import BrandService
+from app.services.name_index import NameIndex
+
+
+class TestBrandSnapshot:
+    """Test serving brand reads from the in-process snapshot"""
+
+    @pytest.fixture(autouse=True)
+    def setup_snapshot(self):
+        """Setup a small brand catalog"""
+        self.brands = [
+            {"_id": ObjectId(), "name": "Acme", "description": "Anvils and rockets", "is_active": True, "created_at": datetime.utcnow()},
+            {"_id": ObjectId(), "name": "Globex", "description": None, "is_active": False, "created_at": datetime.utcnow()},
+            {"_id": ObjectId(), "name": "Initech", "description": "Office ACME supplies", "is_active": True, "created_at": datetime.utcnow()},
+        ]
+        self.snapshot = BrandSnapshot(reversed(self.brands))
+
+    def test_page_preserves_insertion_order(self):
+        """Test pagination over all and only active brands"""
+        assert [brand["name"] for brand in self.snapshot.page()] == ["Acme", "Globex", "Initech"]
+        assert [brand["name"] for brand in self.snapshot.page(skip=1, limit=1)] == ["Globex"]
+        assert [brand["name"] for brand in self.snapshot.page(active_only=True)] == ["Acme", "Initech"]
+
+    def test_get_by_id(self):
+        """Test lookups by string and ObjectId, including unknown and invalid IDs"""
+        brand = self.brands[0]
+
+        assert self.snapshot.get(str(brand["_id"])) is brand
+        assert self.snapshot.get(brand["_id"]) is brand
+        assert self.snapshot.get(str(ObjectId())) is None
+        assert self.snapshot.get("invalid_id") is None
+        assert self.snapshot.get_many([str(self.brands[2]["_id"]), "invalid_id", str(brand["_id"])]) == [self.brands[2], brand]
+
+    def test_search_is_case_insensitive_on_name_and_description(self):
+        """Test plain substring search"""
+        assert [brand["name"] for brand in self.snapshot.search("acme")] == ["Acme", "Initech"]
+        assert [brand["name"] for brand in self.snapshot.search("acme", skip=1)] == ["Initech"]
+        assert self.snapshot.search("missing") == []
+
+    def test_search_is_literal(self):
+        """Test that regex syntax is matched as plain text, never compiled"""
+        assert self.snapshot.search("^glo") == []
+        assert self.snapshot.search("(a+)+$") == []
+        assert is_literal("acme") and not is_literal("^glo")
+
+    def test_copy_on_write_updates(self):
+        """Test that writes produce a new snapshot and leave the old one untouched"""
+        renamed = dict(self.brands[1], name="Globex Corp")
+
+        updated = self.snapshot.with_brand(renamed)
+        removed = updated.without_brand(str(self.brands[0]["_id"]))
+
+        assert self.snapshot.get(renamed["_id"]) is self.brands[1]
+        assert updated.get(renamed["_id"]) is renamed
+        assert [brand["name"] for brand in updated.search("globex")] == ["Globex Corp"]
+        assert [brand["name"] for brand in removed.page()] == ["Globex Corp", "Initech"]
+
+
+class PausingBrandRepository(BrandRepository):
+    """Brand repository whose first snapshot read waits, after reading, until the test lets it finish"""
+
+    def __init__(self, database):
+        super().__init__(database)
+        self.read = asyncio.Event()
+        self.resume = asyncio.Event()
+        self.reads = 0
+
+    async def get_all_for_snapshot(self):
+        brands = await super().get_all_for_snapshot()
+        self.reads += 1
+        if self.reads == 1:
+            self.read.set()
+            await self.resume.wait()
+        return brands
+
+
+def brand(name: str, description=None):
+    return {"_id": ObjectId(), "name": name, "description": description, "is_active": True, "created_at": datetime.utcnow()}
+
+
+class TestBrandCatalog:
+    """Test keeping the catalog consistent with writes, and which searches it serves"""
+
+    @pytest.fixture(autouse=True)
+    def setup_catalog(self):
+        """Setup a catalog over the in-memory backend"""
+        self.database = InMemoryDatabase()
+        self.repository = PausingBrandRepository(self.database)
+        self.catalog = BrandCatalog(cache=TieredCache())
+
+    async def load_with_write_during_read(self, write):
+        await self.database["brand"].insert_one(brand("Acme"))
+        load = asyncio.create_task(self.catalog.load(self.repository))
+        await self.repository.read.wait()
+        await write()
+        self.repository.resume.set()
+        await load
+
+    @pytest.mark.asyncio
+    async def test_write_during_load_is_not_undone(self):
+        """Test that a load which read the collection before a local write reads it again"""
+        async def write():
+            added = brand("Globex")
+            await self.database["brand"].insert_one(added)
+            self.catalog.put(added)
+
+        await self.load_with_write_during_read(write)
+
+        assert self.repository.reads == 2
+        assert [item["name"] for item in self.catalog.snapshot.page()] == ["Acme", "Globex"]
+
+    @pytest.mark.asyncio
+    async def test_generation_bump_during_load_is_not_dropped(self):
+        """Test that another worker's write announced during a load makes it read again"""
+        self.catalog._brand_repository = self.repository
+
+        async def write():
+            await self.database["brand"].insert_one(brand("Initech"))
+            self.catalog._on_generation("brand", 2)
+
+        await self.load_with_write_during_read(write)
+
+        assert self.repository.reads == 2
+        assert [item["name"] for item in self.catalog.snapshot.page()] == ["Acme", "Initech"]
+
+    @pytest.mark.asyncio
+    async def test_patterns_are_searched_in_the_repository(self):
+        """Test that literal terms are served from the snapshot and regex patterns by MongoDB"""
+        self.repository.resume.set()
+        await self.catalog.load(self.repository)
+        # Written behind the catalog's back, so only the repository sees it
+        await self.database["brand"].insert_one(brand("Globex", "Global exports"))
+        service = BrandService(self.repository, catalog=self.catalog, names=NameIndex("brand"))
+
+        assert await service.search_brands("globex") == []
+        assert [item.name for item in await service.search_brands("^glo")] == ["Globex"]
+        with pytest.raises(HTTPException) as error:
+            await service.search_brands("(")
+        assert error.value.status_code == 400
@@ -0,0 +1,149 @@
+import gzip
+import json
+import pytest
+from datetime import datetime
+from bson import ObjectId
+from fastapi import HTTPException
+from app.services.product_service import ProductService
+from app.services.user_service import UserService
+from app.utils.bulk_io import export_projection, export_stream, iter_records, parse_fields
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+async def stream(*chunks):
+    """Async byte stream from chunks"""
+    for chunk in chunks:
+        yield chunk
+
+
+class FakeCursor:
+    """Motor cursor stand-in that applies the projection and records how it was read"""
+
+    def __init__(self, documents, projection):
+        self.documents = documents
+        self.projection = projection
+        self.fetched = 0
+
+    async def __aiter__(self):
+        for document in self.documents:
+            self.fetched += 1
+            included = [field for field, value in self.projection.items() if value]
+            yield {
+                field: value for field, value in document.items()
+                if field in included or (field == "_id" and self.projection.get("_id", 1))
+            }
+
+
+class FakeRepository:
+    """Repository stand-in that serves documents through a FakeCursor"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.calls = []
+
+    def iter_documents(self, filters=None, projection=None, batch_size=1000):
+        self.calls.append((filters, projection, batch_size))
+        matching = [
+            document for document in self.documents
+            if all(document.get(field) == value for field, value in (filters or {}).items())
+        ]
+        self.cursor = FakeCursor(matching, projection)
+        return self.cursor
+
+
+class TestEncoding:
+    """Test batch-at-a-time NDJSON/CSV encoding"""
+
+    @pytest.mark.asyncio
+    async def test_ndjson_is_written_per_batch(self):
+        """Test one chunk per batch with ObjectIds and datetimes converted"""
+        object_id = ObjectId()
+        documents = stream(*(
+            {"_id": object_id, "name": f"P{index}", "created_at": datetime(2024, 1, 1)} for index in range(5)
+        ))
+
+        chunks = await collect(export_stream(documents, "ndjson", ["_id", "name", "created_at"], batch_size=2))
+
+        assert len(chunks) == 3
+        lines = b"".join(chunks).decode().splitlines()
+        assert json.loads(lines[0]) == {"_id": str(object_id), "name": "P0", "created_at": "2024-01-01T00:00:00"}
+        assert len(lines) == 5
+
+    @pytest.mark.asyncio
+    async def test_csv_round_trips_through_import_parser(self):
+        """Test that an exported CSV parses back into the same values"""
+        documents = stream(
+            {"name": 'Desk, "oak"\nlarge', "price": 10.5, "description": None},
+            {"name": "Lamp", "price": 3},
+        )
+
+        body = b"".join(await collect(export_stream(documents, "csv", ["name", "price", "description"])))
+        records = await collect(iter_records(stream(body), "csv"))
+
+        assert body.startswith(b"name,price,description\n")
+        assert records == [
+            (1, {"name": 'Desk, "oak"\nlarge', "price": "10.5"}, None),
+            (2, {"name": "Lamp", "price": "3"}, None),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_gzip_output(self):
+        """Test that compressed chunks form one valid gzip file"""
+        documents = stream(*({"name": f"Product {index}"} for index in range(1000)))
+
+        chunks = await collect(export_stream(documents, "ndjson", ["name"], batch_size=100, compress=True))
+
+        lines = gzip.decompress(b"".join(chunks)).decode().splitlines()
+        assert len(lines) == 1000
+        assert json.loads(lines[-1]) == {"name": "Product 999"}
+
+    def test_fields_and_projection(self):
+        """Test field selection and the matching projection"""
+        allowed = ("_id", "name", "price")
+
+        assert parse_fields(None, allowed) == ["_id", "name", "price"]
+        assert parse_fields(" price,name,price ", allowed) == ["price", "name"]
+        assert export_projection(["price", "name"]) == {"price": 1, "name": 1, "_id": 0}
+        with pytest.raises(ValueError):
+            parse_fields("name,secret", allowed)
+
+
+class TestServiceExport:
+    """Test the export methods of the services"""
+
+    @pytest.mark.asyncio
+    async def test_product_filters_and_batch_size_reach_the_cursor(self):
+        """Test that filters, projection and batch size are passed to the single cursor"""
+        repository = FakeRepository([
+            {"_id": ObjectId(), "name": "Desk", "category": "Furniture", "is_active": True, "name_lower": "desk"},
+            {"_id": ObjectId(), "name": "Lamp", "category": "Lighting", "is_active": True, "name_lower": "lamp"},
+        ])
+        service = ProductService(repository)
+
+        body = service.export_products("ndjson", fields="name,category", category="Furniture", active_only=True, batch_size=500)
+        lines = b"".join(await collect(body)).decode().splitlines()
+
+        assert repository.calls == [
+            ({"category": "Furniture", "is_active": True}, {"name": 1, "category": 1, "_id": 0}, 500)
+        ]
+        assert [json.loads(line) for line in lines] == [{"name": "Desk", "category": "Furniture"}]
+
+    @pytest.mark.asyncio
+    async def test_user_export_never_includes_password_hashes(self):
+        """Test that hashed_password is neither exported nor selectable"""
+        repository = FakeRepository([
+            {"_id": ObjectId(), "username": "alice", "email": "alice@example.com", "hashed_password": "x", "is_active": True}
+        ])
+        service = UserService(repository)
+
+        body = b"".join(await collect(service.export_users("csv")))
+
+        assert b"hashed_password" not in body
+        assert body.decode().splitlines()[0] == "_id,username,email,is_active,created_at,updated_at"
+        assert "hashed_password" not in repository.calls[0][1]
+        with pytest.raises(HTTPException) as error:
+            service.export_users(fields="username,hashed_password")
+        assert error.value.status_code == 400
@@ -0,0 +1,260 @@
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from app.cache.tiered import TieredCache
+from app.repositories.memory import InMemoryDatabase
+from app.repositories.product_repository import ProductRepository
+from app.services.name_index import NameIndex
+from app.services.product_service import ProductService
+from app.services.user_service import UserService
+from app.utils.security import get_password_hash, hash_passwords, shutdown_password_hashing, verify_password
+from app.utils.bulk_io import ImportFormatError, detect_format, iter_lines, iter_records
+
+
+def bcrypt_available():
+    """Some passlib/bcrypt version pairs cannot hash at all"""
+    try:
+        get_password_hash("password")
+    except ValueError:
+        return False
+    return True
+
+
+async def stream(*chunks):
+    """Async byte stream from chunks"""
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(records):
+    return [record async for record in records]
+
+
+class FakeProductRepository:
+    """Product repository stand-in that records batch writes"""
+
+    def __init__(self, existing_names=()):
+        self.existing_names = set(existing_names)
+        self.batches = []
+
+    async def get_existing_values(self, field, values):
+        return [value for value in values if value in self.existing_names]
+
+    async def create_many(self, documents):
+        for document in documents:
+            document["_id"] = ObjectId()
+        self.batches.append(documents)
+        return [document["_id"] for document in documents]
+
+
+class FakeUserRepository:
+    """User repository stand-in with registered usernames and emails"""
+
+    def __init__(self, usernames=(), emails=()):
+        self.taken = {"username": set(usernames), "email": set(emails)}
+        self.lookups = []
+        self.batches = []
+
+    async def get_existing_values(self, field, values):
+        self.lookups.append((field, sorted(values)))
+        return [value for value in values if value in self.taken[field]]
+
+    async def create_many(self, documents):
+        self.batches.append(documents)
+        return [ObjectId() for _ in documents]
+
+
+class FakeBrandRepository:
+    """Brand repository stand-in with a fixed set of brands"""
+
+    def __init__(self, brand_ids):
+        self.brand_ids = brand_ids
+
+    async def get_many(self, brand_ids):
+        return [{"_id": ObjectId(brand_id)} for brand_id in brand_ids if brand_id in self.brand_ids]
+
+
+class TestParsing:
+    """Test streaming CSV/NDJSON parsing"""
+
+    @pytest.mark.asyncio
+    async def test_lines_split_across_chunks(self):
+        """Test line splitting with a BOM, CRLF endings and a multi-byte character split between chunks"""
+        lines = await collect(iter_lines(stream(b"\xef\xbb\xbfa,b\r\nc\xc3", b"\xa7,d\r\n", b"e,f")))
+
+        assert lines == ["a,b", "cç,d", "e,f"]
+
+    @pytest.mark.asyncio
+    async def test_csv_records(self):
+        """Test header mapping, quoted newlines, empty cells and bad rows"""
+        body = b'name,description,price\n"Desk","Solid, ""oak""\nwith drawer",10\nLamp,,5\nChair,x,1,extra\n'
+
+        records = await collect(iter_records(stream(body), "csv"))
+
+        assert records == [
+            (1, {"name": "Desk", "description": 'Solid, "oak"\nwith drawer', "price": "10"}, None),
+            (2, {"name": "Lamp", "price": "5"}, None),
+            (3, None, "Expected 3 columns, got 4"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_ndjson_records(self):
+        """Test that each line is one object and bad lines are reported"""
+        body = b'{"name": "Desk"}\n\n[1]\n{broken\n'
+
+        records = await collect(iter_records(stream(body), "ndjson"))
+
+        assert records[0] == (1, {"name": "Desk"}, None)
+        assert records[1] == (2, None, "Expected a JSON object")
+        assert records[2][0] == 3 and records[2][2].startswith("Invalid JSON")
+
+    def test_detect_format(self):
+        """Test format detection from the query and the content type"""
+        assert detect_format(None, "text/csv; charset=utf-8") == "csv"
+        assert detect_format("ndjson", "text/csv") == "ndjson"
+        with pytest.raises(ImportFormatError):
+            detect_format(None, "application/octet-stream")
+
+
+class TestProductImport:
+    """Test batched validation and writes of imported products"""
+
+    @pytest.mark.asyncio
+    async def test_valid_rows_are_inserted_in_chunks(self):
+        """Test chunked inserts and per-row errors"""
+        brand_id = str(ObjectId())
+        body = (
+            "name,price,category,stock_quantity,brand_id\n"
+            f"Desk,100,Furniture,5,{brand_id}\n"
+            "Lamp,-1,Lighting,5,\n"
+            "Chair,50,Furniture,2,\n"
+            "Sofa,300,Furniture,1,\n"
+            f"Shelf,80,Furniture,4,{ObjectId()}\n"
+            "Taken,10,Furniture,1,\n"
+        ).encode()
+        product_repository = FakeProductRepository(existing_names={"Taken"})
+        service = ProductService(
+            product_repository,
+            FakeBrandRepository({brand_id}),
+            names=NameIndex("products", cache=TieredCache())
+        )
+        progress = []
+
+        result = await service.import_products(
+            iter_records(stream(body), "csv"),
+            chunk_size=2,
+            progress=lambda current: progress.append(current.processed)
+        )
+
+        assert (result.processed, result.inserted, result.failed) == (6, 3, 3)
+        assert [error.row for error in result.errors] == [2, 5, 6]
+        assert result.errors[0].errors[0].startswith("price:")
+        assert [error.errors for error in result.errors[1:]] == [["Brand not found"], ["Product name already exists"]]
+        assert [[document["name"] for document in batch] for batch in product_repository.batches] == [["Desk"], ["Chair", "Sofa"]]
+        assert product_repository.batches[0][0]["brand_id"] == ObjectId(brand_id)
+        assert progress == [2, 4, 6]
+
+    @pytest.mark.asyncio
+    async def test_upsert_only_sets_given_fields(self):
+        """Test that upserts keep stored values of fields a row leaves out and default them on new products"""
+        brand_id = ObjectId()
+        product_repository = ProductRepository(InMemoryDatabase())
+        await product_repository.create({
+            "name": "Desk", "description": "Oak", "price": 100.0, "category": "Furniture",
+            "stock_quantity": 5, "brand_id": brand_id, "is_active": False
+        })
+        service = ProductService(product_repository, names=NameIndex("products", cache=TieredCache()))
+        body = b"name,price,category,stock_quantity,description\nDesk,120,Furniture,1,\nLamp,30,Lighting,9,Brass\n"
+
+        result = await service.import_products(iter_records(stream(body), "csv"), upsert=True)
+
+        assert (result.inserted, result.updated) == (1, 1)
+        desk = await product_repository.get_by_name("Desk")
+        assert (desk["price"], desk["stock_quantity"], desk["low_stock"]) == (120.0, 1, True)
+        assert (desk["description"], desk["brand_id"], desk["is_active"]) == ("Oak", brand_id, False)
+        lamp = await product_repository.get_by_name("Lamp")
+        assert (lamp["description"], lamp["brand_id"], lamp["is_active"]) == ("Brass", None, True)
+        assert lamp["created_at"] == lamp["updated_at"]
+
+    @pytest.mark.asyncio
+    async def test_errors_are_capped(self):
+        """Test that only max_errors row errors are listed"""
+        body = b"\n".join(b'{"name": ""}' for _ in range(5))
+        service = ProductService(FakeProductRepository(), names=NameIndex("products", cache=TieredCache()))
+
+        result = await service.import_products(iter_records(stream(body), "ndjson"), max_errors=2)
+
+        assert result.failed == 5
+        assert len(result.errors) == 2
+        assert result.errors_truncated
+
+    @pytest.mark.asyncio
+    async def test_unparseable_stream_is_rejected(self):
+        """Test that a format error stops the import with a 400"""
+        service = ProductService(FakeProductRepository(), names=NameIndex("products", cache=TieredCache()))
+
+        async def broken():
+            yield b'{"name": "Desk"}\n'
+            raise ImportFormatError("A line is longer than 10 characters")
+
+        with pytest.raises(HTTPException) as error:
+            await service.import_products(iter_records(broken(), "ndjson"))
+        assert error.value.status_code == 400
+
+
+class TestUserImport:
+    """Test batched checks, parallel hashing and writes of imported users"""
+
+    @pytest.mark.asyncio
+    async def test_users_are_checked_hashed_and_inserted_per_chunk(self, monkeypatch):
+        """Test one $in query per field and one hashing pass per chunk"""
+        hashed = []
+
+        async def fake_hash_passwords(passwords):
+            hashed.append(passwords)
+            return [f"hash:{password}" for password in passwords]
+
+        monkeypatch.setattr("app.services.user_service.hash_passwords", fake_hash_passwords)
+        body = (
+            "username,email,password\n"
+            "alice,alice@example.com,secret1\n"
+            "bob,bob@example.com,123\n"
+            "alice,other@example.com,secret2\n"
+            "carol,carol@example.com,secret3\n"
+            "dave,taken@example.com,secret4\n"
+        ).encode()
+        user_repository = FakeUserRepository(emails={"taken@example.com"})
+        progress = []
+
+        result = await UserService(user_repository).import_users(
+            iter_records(stream(body), "csv"),
+            chunk_size=3,
+            progress=lambda current: progress.append(current.processed)
+        )
+
+        assert (result.processed, result.inserted, result.failed) == (5, 2, 3)
+        assert [error.row for error in result.errors] == [2, 3, 5]
+        assert result.errors[0].errors[0].startswith("password:")
+        assert result.errors[1].errors == ["Duplicate username in this chunk"]
+        assert result.errors[2].errors == ["Email already registered"]
+        assert hashed == [["secret1"], ["secret3"]]
+        assert user_repository.batches[0] == [{
+            "username": "alice", "email": "alice@example.com", "hashed_password": "hash:secret1", "is_active": True
+        }]
+        assert len(user_repository.lookups) == 4
+        assert progress == [3, 5]
+
+    @pytest.mark.skipif(not bcrypt_available(), reason="bcrypt backend unusable with this passlib version")
+    @pytest.mark.asyncio
+    async def test_passwords_are_hashed_in_worker_processes(self, monkeypatch):
+        """Test that the process pool returns verifiable hashes in input order"""
+        monkeypatch.setattr("app.utils.security.settings.password_hash_workers", 2)
+        try:
+            hashes = await hash_passwords(["first", "second", "third"])
+        finally:
+            shutdown_password_hashing()
+
+        assert len(hashes) == 3
+        assert verify_password("first", hashes[0])
+        assert verify_password("third", hashes[2])
+        assert not verify_password("first", hashes[1])
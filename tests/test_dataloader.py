@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from app.utils.dataloader import DataLoader, get_request_loader, request_loader_scope
+
+
+class TestDataLoader:
+    """Test coalescing of lookups into batch calls"""
+
+    @pytest.fixture(autouse=True)
+    def setup_loader(self):
+        """Setup a loader that records every batch it receives"""
+        self.batches = []
+
+        async def batch_load(keys):
+            self.batches.append(keys)
+            return [key.upper() for key in keys]
+
+        self.batch_load = batch_load
+
+    @pytest.mark.asyncio
+    async def test_same_tick_loads_are_batched(self):
+        """Test that concurrent loads end up in a single batch"""
+        loader = DataLoader(self.batch_load)
+
+        results = await asyncio.gather(loader.load("a"), loader.load("b"), loader.load("a"))
+
+        assert results == ["A", "B", "A"]
+        assert self.batches == [["a", "b"]]
+
+    @pytest.mark.asyncio
+    async def test_sequential_loads_are_separate_batches(self):
+        """Test that loads awaited one after another are not merged"""
+        loader = DataLoader(self.batch_load)
+
+        assert await loader.load("a") == "A"
+        assert await loader.load("b") == "B"
+        assert self.batches == [["a"], ["b"]]
+
+    @pytest.mark.asyncio
+    async def test_max_batch_size(self):
+        """Test that large batches are split"""
+        loader = DataLoader(self.batch_load, max_batch_size=2)
+
+        results = await loader.load_many(["a", "b", "c"])
+
+        assert results == ["A", "B", "C"]
+        assert self.batches == [["a", "b"], ["c"]]
+
+    @pytest.mark.asyncio
+    async def test_batch_errors_are_propagated(self):
+        """Test that a failing batch fails every waiting load"""
+        async def failing_batch_load(keys):
+            raise RuntimeError("database unavailable")
+
+        loader = DataLoader(failing_batch_load)
+
+        with pytest.raises(RuntimeError):
+            await asyncio.gather(loader.load("a"), loader.load("b"))
+
+    def test_request_loader_scope(self):
+        """Test that loaders only exist inside a request scope"""
+        assert get_request_loader("products.get_by_id", self.batch_load) is None
+
+        with request_loader_scope():
+            loader = get_request_loader("products.get_by_id", self.batch_load)
+            assert loader is not None
+            assert get_request_loader("products.get_by_id", self.batch_load) is loader
+
+        assert get_request_loader("products.get_by_id", self.batch_load) is None
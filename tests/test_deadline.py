@@ -0,0 +1,114 @@
+import asyncio
+import contextvars
+import json
+import pytest
+from pymongo.errors import ExecutionTimeout
+from app.main import deadline_exception_handler
+from app.repositories.base import BaseRepository
+from app.utils.deadline import DeadlineExceeded, remaining_ms, request_deadline, set_deadline
+
+
+class FakeCursor:
+    """Cursor stand-in that records the options applied to it"""
+
+    def __init__(self):
+        self.max_time = None
+
+    def max_time_ms(self, max_time_ms):
+        self.max_time = max_time_ms
+        return self
+
+
+class FakeCollection:
+    """Collection stand-in that records the keyword arguments of each call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def find(self, query, projection=None):
+        return FakeCursor()
+
+    def aggregate(self, pipeline, **kwargs):
+        self.calls.append(("aggregate", kwargs))
+
+    async def count_documents(self, query, **kwargs):
+        self.calls.append(("count_documents", kwargs))
+        return 0
+
+
+class FakeRequest:
+    method = "GET"
+
+    class url:
+        path = "/api/v1/products/search/x"
+
+
+class ItemRepository(BaseRepository):
+    def __init__(self):
+        super().__init__({"items": FakeCollection()}, "items")
+
+
+def run_in_context(function):
+    """Run a function in a fresh context so deadlines do not leak between tests"""
+    return contextvars.Context().run(function)
+
+
+class TestDeadline:
+    """Test request deadlines and their translation to maxTimeMS"""
+
+    def test_no_deadline(self):
+        """Test that operations are unbounded outside a deadline"""
+        def check():
+            assert remaining_ms() is None
+            assert ItemRepository()._find({}).max_time is None
+
+        run_in_context(check)
+
+    def test_find_gets_remaining_time(self):
+        """Test that cursors get the time left as maxTimeMS"""
+        def check():
+            set_deadline(2)
+            max_time = ItemRepository()._find({}).max_time
+            assert 1900 < max_time <= 2000
+
+        run_in_context(check)
+
+    def test_aggregate_and_count_get_remaining_time(self):
+        """Test that aggregations and counts pass maxTimeMS"""
+        def check():
+            set_deadline(1)
+            repository = ItemRepository()
+            repository._aggregate([])
+            asyncio.run(repository._count({}, limit=1))
+            (_, aggregate_kwargs), (_, count_kwargs) = repository.collection.calls
+            assert 0 < aggregate_kwargs["maxTimeMS"] <= 1000
+            assert 0 < count_kwargs["maxTimeMS"] <= 1000
+            assert count_kwargs["limit"] == 1
+
+        run_in_context(check)
+
+    def test_expired_deadline_raises(self):
+        """Test that no query is sent once the deadline has passed"""
+        def check():
+            set_deadline(-1)
+            with pytest.raises(DeadlineExceeded):
+                ItemRepository()._find({})
+
+        run_in_context(check)
+
+    def test_route_dependency_overrides_default(self):
+        """Test that a later (route-level) dependency replaces the app default"""
+        async def check():
+            await request_deadline(10)()
+            await request_deadline(0.5)()
+            assert remaining_ms() <= 500
+
+        contextvars.Context().run(asyncio.run, check())
+
+    @pytest.mark.asyncio
+    async def test_timeouts_map_to_504(self):
+        """Test that both client- and server-side deadline errors become 504"""
+        for error in (DeadlineExceeded("Request deadline exceeded"), ExecutionTimeout("operation exceeded time limit", 50)):
+            response = await deadline_exception_handler(FakeRequest(), error)
+            assert response.status_code == 504
+            assert json.loads(response.body)["error"] == "Gateway Timeout"
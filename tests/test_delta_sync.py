@@ -0,0 +1,121 @@
+import pytest
+from datetime import datetime, timedelta
+from bson import ObjectId
+from fastapi import HTTPException
+from app.config.settings import settings
+from app.repositories.memory import InMemoryDatabase
+from app.repositories.product_repository import ProductRepository
+from app.services.product_service import ProductService
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def product(updated_at: datetime, **fields):
+    return {
+        "_id": ObjectId(),
+        "name": f"Product {ObjectId()}",
+        "description": None,
+        "price": 10.0,
+        "category": "Books",
+        "stock_quantity": 1,
+        "is_active": True,
+        "created_at": updated_at,
+        "updated_at": updated_at,
+        **fields
+    }
+
+
+def tombstone(deleted_at: datetime):
+    return {"_id": ObjectId(), "product_id": str(ObjectId()), "deleted_at": deleted_at}
+
+
+async def sync_all(service, token=None, limit=500):
+    """Follow a sync until has_more is false, returning the events in order and the last token"""
+    events = []
+    while True:
+        changes = await service.get_product_changes(token, limit=limit)
+        events += [("p", item.id) for item in changes.changed] + [("t", product_id) for product_id in changes.deleted]
+        token = changes.next_token
+        if not changes.has_more:
+            return events, token
+
+
+class TestDeltaSync:
+    """Test the product change feed and its sync tokens"""
+
+    @pytest.fixture(autouse=True)
+    def setup_service(self):
+        """Setup a product service over the in-memory backend"""
+        self.database = InMemoryDatabase()
+        self.repository = ProductRepository(self.database)
+        self.service = ProductService(self.repository)
+        self.past = datetime.utcnow() - timedelta(hours=1)
+
+    @pytest.mark.asyncio
+    async def test_paging_across_equal_timestamps(self):
+        """Test that pages split inside a run of equal timestamps skip and repeat nothing"""
+        products = [product(self.past) for _ in range(5)]
+        tombstones = [tombstone(self.past) for _ in range(3)]
+        await self.database["products"].insert_many(products)
+        await self.database["product_tombstones"].insert_many(tombstones)
+
+        events, _ = await sync_all(self.service, limit=2)
+
+        # Products sort before tombstones at the same time, each kind by _id
+        expected = [("p", str(item["_id"])) for item in sorted(products, key=lambda item: item["_id"])]
+        expected += [("t", item["product_id"]) for item in sorted(tombstones, key=lambda item: item["_id"])]
+        assert events == expected
+
+    @pytest.mark.asyncio
+    async def test_mixed_upserts_and_deletes(self):
+        """Test that a poll after a full sync returns only later changes and deletes"""
+        await self.database["products"].insert_many([product(self.past - timedelta(minutes=5)), product(self.past - timedelta(minutes=4))])
+        _, token = await sync_all(self.service)
+        updated = product(self.past, name="Updated")
+        deleted = tombstone(self.past + timedelta(seconds=1))
+        await self.database["products"].insert_one(updated)
+        await self.database["product_tombstones"].insert_one(deleted)
+
+        changes = await self.service.get_product_changes(token)
+
+        assert [item.name for item in changes.changed] == ["Updated"]
+        assert changes.deleted == [deleted["product_id"]]
+        assert not changes.has_more
+
+    @pytest.mark.asyncio
+    async def test_empty_result_token_moves_to_settle_window(self, monkeypatch):
+        """Test that an empty feed hands out a usable token, and writes inside the settle window come next"""
+        empty = await self.service.get_product_changes()
+        assert (empty.changed, empty.deleted) == ([], [])
+        recent = product(datetime.utcnow())
+        await self.database["products"].insert_one(recent)
+
+        settling = await self.service.get_product_changes(empty.next_token)
+        monkeypatch.setattr(settings, "sync_settle_seconds", 0)
+        settled = await self.service.get_product_changes(settling.next_token)
+
+        assert settling.changed == []
+        assert decode_cursor(settling.next_token)["ts"] > datetime(2000, 1, 1).isoformat()
+        assert [item.id for item in settled.changed] == [str(recent["_id"])]
+
+    @pytest.mark.asyncio
+    async def test_old_catalog_token_does_not_expire(self):
+        """Test that a catalog whose last change is older than the retention still syncs incrementally"""
+        await self.database["products"].insert_one(product(datetime.utcnow() - timedelta(days=settings.sync_tombstone_retention_days + 10)))
+
+        _, token = await sync_all(self.service)
+        changes = await self.service.get_product_changes(token)
+
+        assert changes.changed == [] and not changes.has_more
+
+    @pytest.mark.asyncio
+    async def test_token_expiry_and_invalid_tokens(self):
+        """Test that tokens last in sync before the tombstone retention get 410, and malformed ones 400"""
+        stale = datetime.utcnow() - timedelta(days=settings.sync_tombstone_retention_days, hours=1)
+        expired = encode_cursor({"ts": self.past.isoformat(), "iat": stale.isoformat()})
+        legacy = encode_cursor({"ts": stale.isoformat()})
+        tampered = encode_cursor({"ts": self.past.isoformat(), "k": "x", "id": str(ObjectId())})
+
+        for token, status_code in ((expired, 410), (legacy, 410), (tampered, 400), ("not a token", 400)):
+            with pytest.raises(HTTPException) as error:
+                await self.service.get_product_changes(token)
+            assert error.value.status_code == status_code
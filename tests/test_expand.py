@@ -0,0 +1,110 @@
+import pytest
+from datetime import datetime
+from bson import ObjectId
+from fastapi import HTTPException
+from app.repositories.brand_repository import BrandRepository
+from app.repositories.memory import InMemoryDatabase
+from app.repositories.product_repository import ProductRepository
+from app.services.brand_catalog import BrandSnapshot, brand_catalog
+from app.services.product_service import ProductService
+from app.utils.dependencies import get_expand_query
+
+
+class TestExpandQuery:
+    """Test parsing the expand query parameter"""
+
+    def test_known_relations(self):
+        """Test that supported relations are parsed and blanks ignored"""
+        assert get_expand_query(None) == []
+        assert get_expand_query("brand") == ["brand"]
+        assert get_expand_query(" brand, ,") == ["brand"]
+
+    def test_unknown_relations_are_rejected(self):
+        """Test that unsupported relations get 400 naming them"""
+        with pytest.raises(HTTPException) as error:
+            get_expand_query("brand,owner,category")
+
+        assert error.value.status_code == 400
+        assert error.value.detail == "Cannot expand: category, owner"
+
+
+class TestExpandBrands:
+    """Test attaching brands to products"""
+
+    @pytest.fixture(autouse=True)
+    def setup_service(self, monkeypatch):
+        """Setup a product service over the in-memory backend, recording brand queries"""
+        monkeypatch.setattr(brand_catalog, "snapshot", None)
+        self.database = InMemoryDatabase()
+        self.brand_repository = BrandRepository(self.database)
+        self.service = ProductService(ProductRepository(self.database), self.brand_repository)
+        self.brand_queries = []
+        find = self.brand_repository._find
+
+        def recording_find(query, *args, **kwargs):
+            self.brand_queries.append(query)
+            return find(query, *args, **kwargs)
+
+        monkeypatch.setattr(self.brand_repository, "_find", recording_find)
+
+    async def add_brand(self, name: str):
+        brand = {"_id": ObjectId(), "name": name, "description": None, "is_active": True, "created_at": datetime(2024, 1, 1)}
+        await self.database["brand"].insert_one(brand)
+        return brand
+
+    def product(self, brand_id=None):
+        return self.service._to_response({
+            "_id": ObjectId(),
+            "name": f"Product {ObjectId()}",
+            "price": 10.0,
+            "category": "Books",
+            "stock_quantity": 1,
+            "brand_id": brand_id,
+            "is_active": True,
+            "created_at": datetime(2024, 1, 1),
+        })
+
+    @pytest.mark.asyncio
+    async def test_brands_are_fetched_once_per_page(self):
+        """Test that repeated brand ids are looked up with one deduplicated $in query"""
+        acme = await self.add_brand("Acme")
+        globex = await self.add_brand("Globex")
+        products = [self.product(acme["_id"]), self.product(globex["_id"]), self.product(acme["_id"])]
+
+        await self.service.expand_brands(products)
+
+        assert [product.brand.name for product in products] == ["Acme", "Globex", "Acme"]
+        [query] = self.brand_queries
+        assert query == {"_id": {"$in": [acme["_id"], globex["_id"]]}}
+
+    @pytest.mark.asyncio
+    async def test_products_without_or_with_missing_brand(self):
+        """Test that products with no brand or a deleted brand are left without one"""
+        acme = await self.add_brand("Acme")
+        products = [self.product(), self.product(ObjectId()), self.product(acme["_id"])]
+
+        await self.service.expand_brands(products)
+
+        assert [product.brand.name if product.brand else None for product in products] == [None, None, "Acme"]
+
+    @pytest.mark.asyncio
+    async def test_no_brand_ids_means_no_query(self):
+        """Test that a page without brands does not touch the brand collection"""
+        products = [self.product(), self.product()]
+
+        await self.service.expand_brands(products)
+
+        assert self.brand_queries == []
+        assert all(product.brand is None for product in products)
+
+    @pytest.mark.asyncio
+    async def test_brands_come_from_the_catalog_snapshot(self, monkeypatch):
+        """Test that a loaded brand catalog serves the brands without a query"""
+        acme = await self.add_brand("Acme")
+        monkeypatch.setattr(brand_catalog, "snapshot", BrandSnapshot([acme]))
+        products = [self.product(acme["_id"]), self.product(ObjectId())]
+
+        await self.service.expand_brands(products)
+
+        assert self.brand_queries == []
+        assert [product.brand.name if product.brand else None for product in products] == ["Acme", None]
@@ -0,0 +1,100 @@
+import pytest
+from app.cache.tiered import TieredCache
+from app.services.name_index import NameIndex
+from app.utils.trigram import TrigramIndex, similarity, trigrams
+
+
+class FakeNamesRepository:
+    """Repository stand-in that returns a fixed list of active names"""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def get_active_names(self, limit):
+        return self.documents[:limit]
+
+
+class TestTrigrams:
+    """Test trigram extraction and similarity"""
+
+    def test_words_are_padded(self):
+        """Test pg_trgm style padding per word"""
+        assert trigrams("Cat") == {"  c", " ca", "cat", "at "}
+        assert trigrams("a b") == {"  a", " a ", "  b", " b "}
+
+    def test_similarity(self):
+        """Test that a typo keeps most of the trigrams"""
+        assert similarity(trigrams("keyboard"), trigrams("keyboard")) == 1.0
+        assert similarity(trigrams("keyboard"), trigrams("keybaord")) > 0.3
+        assert similarity(trigrams("keyboard"), trigrams("monitor")) == 0.0
+
+
+class TestTrigramIndex:
+    """Test fuzzy lookups in the inverted index"""
+
+    @pytest.fixture(autouse=True)
+    def setup_index(self):
+        """Setup an index of a few product names"""
+        self.index = TrigramIndex.build([
+            ("1", "mechanical keyboard"),
+            ("2", "wireless keyboard"),
+            ("3", "wireless mouse"),
+            ("4", "usb monitor"),
+        ])
+
+    def test_misspelled_query_ranks_closest_first(self):
+        """Test ranking by similarity despite typos"""
+        results = self.index.search("mechanicl keybord", min_similarity=0.1)
+
+        assert [document_id for document_id, _ in results] == ["1", "2"]
+        assert results[0][1] > 0.5 > results[1][1]
+        assert [document_id for document_id, _ in self.index.search("mechanicl keybord")] == ["1"]
+
+    def test_replace_and_remove(self):
+        """Test that replaced and removed documents are no longer returned"""
+        self.index.add("4", "usb webcam")
+        self.index.remove("3")
+
+        assert self.index.search("monitor") == []
+        assert self.index.search("wireles mouse", min_similarity=0.1)[0][0] == "2"
+        assert self.index.search("usb webcam")[0][0] == "4"
+        assert self.index.removed == 2
+
+    def test_postings_budget_skips_common_trigrams(self):
+        """Test that trigrams with too many postings are not scanned"""
+        index = TrigramIndex.build(
+            [(str(number), f"common name {number}") for number in range(50)] + [("rare", "common zebra")],
+            max_postings=10
+        )
+
+        assert [document_id for document_id, _ in index.search("commn zebra")] == ["rare"]
+
+
+class TestNameIndexFuzzy:
+    """Test the fuzzy part of the in-process name index"""
+
+    @pytest.mark.asyncio
+    async def test_writes_are_searchable(self):
+        """Test that service writes update the trigram index incrementally"""
+        index = NameIndex("products", cache=TieredCache())
+        await index.load(FakeNamesRepository([{"_id": "1", "name": "Laptop Stand"}]), max_names=0, fuzzy_max_names=10)
+        assert not index.ready
+        assert index.fuzzy_ready
+
+        index.put({"_id": "2", "name": "Desk Lamp", "is_active": True})
+        assert index.search_fuzzy("desc lamp")[0][0] == "2"
+
+        index.put({"_id": "1", "name": "Laptop Stand", "is_active": False}, previous={"_id": "1", "name": "Laptop Stand"})
+        assert index.search_fuzzy("laptp stand") == []
+
+    @pytest.mark.asyncio
+    async def test_generation_from_other_worker_marks_stale(self):
+        """Test that a remote write schedules a reload"""
+        cache = TieredCache()
+        index = NameIndex("products", cache=cache)
+        await index.load(FakeNamesRepository([]), max_names=10, fuzzy_max_names=10)
+        assert not index._stale
+
+        cache._handle_message({"type": "generation", "name": "products", "value": 3, "origin": "other"})
+
+        assert index._stale
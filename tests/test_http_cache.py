@@ -0,0 +1,85 @@
+from datetime import datetime
+from types import SimpleNamespace
+from starlette.requests import Request
+from app.utils.http_cache import document_validators, is_not_modified, list_validators, not_modified_response
+
+
+def make_request(headers: dict) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(key.lower().encode(), value.encode()) for key, value in headers.items()],
+    })
+
+
+class TestHttpCache:
+    """Test ETag and Last-Modified handling"""
+
+    def test_etag_changes_with_updated_at(self):
+        """Test that the ETag follows the document version"""
+        created_at = datetime(2024, 1, 1, 12, 0, 0)
+        etag, last_modified = document_validators("507f1f77bcf86cd799439011", created_at, None)
+        new_etag, new_last_modified = document_validators(
+            "507f1f77bcf86cd799439011", created_at, datetime(2024, 1, 2, 12, 0, 0)
+        )
+
+        assert etag.startswith('"') and etag.endswith('"')
+        assert etag != new_etag
+        assert last_modified == created_at
+        assert new_last_modified == datetime(2024, 1, 2, 12, 0, 0)
+
+    def test_list_validators(self):
+        """Test that a list page has an ETag over its items and no Last-Modified"""
+        items = [
+            SimpleNamespace(id="a", created_at=datetime(2024, 1, 1), updated_at=None),
+            SimpleNamespace(id="b", created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 3, 1)),
+        ]
+
+        etag, last_modified = list_validators(items)
+
+        assert last_modified is None
+        assert etag != list_validators(items[:1])[0]
+        assert etag != list_validators([items[0], SimpleNamespace(id="b", created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 3, 2))])[0]
+
+    def test_list_ignores_if_modified_since(self):
+        """Test that a list with an item removed is not reported unchanged because no timestamp moved"""
+        items = [
+            SimpleNamespace(id="a", created_at=datetime(2024, 1, 1), updated_at=None),
+            SimpleNamespace(id="b", created_at=datetime(2024, 3, 1), updated_at=None),
+        ]
+        etag, last_modified = list_validators(items[:1])
+
+        assert not is_not_modified(make_request({"If-Modified-Since": "Fri, 01 Mar 2024 00:00:00 GMT"}), etag, last_modified)
+        assert not is_not_modified(make_request({"If-None-Match": list_validators(items)[0]}), etag, last_modified)
+        assert "last-modified" not in not_modified_response(etag, last_modified).headers
+
+    def test_if_none_match(self):
+        """Test If-None-Match evaluation"""
+        etag, last_modified = document_validators("a", datetime(2024, 1, 1), None)
+
+        assert is_not_modified(make_request({"If-None-Match": etag}), etag, last_modified)
+        assert is_not_modified(make_request({"If-None-Match": f'"other", W/{etag}'}), etag, last_modified)
+        assert not is_not_modified(make_request({"If-None-Match": '"other"'}), etag, last_modified)
+
+    def test_if_modified_since(self):
+        """Test If-Modified-Since evaluation at second precision"""
+        etag, last_modified = document_validators("a", datetime(2024, 1, 1, 10, 0, 0, 500000), None)
+
+        assert is_not_modified(
+            make_request({"If-Modified-Since": "Mon, 01 Jan 2024 10:00:00 GMT"}), etag, last_modified
+        )
+        assert not is_not_modified(
+            make_request({"If-Modified-Since": "Mon, 01 Jan 2024 09:59:59 GMT"}), etag, last_modified
+        )
+        assert not is_not_modified(make_request({"If-Modified-Since": "garbage"}), etag, last_modified)
+
+    def test_not_modified_response(self):
+        """Test the 304 response carries validators"""
+        etag, last_modified = document_validators("a", datetime(2024, 1, 1), None)
+
+        response = not_modified_response(etag, last_modified)
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.headers["last-modified"] == "Mon, 01 Jan 2024 00:00:00 GMT"
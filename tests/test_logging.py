@@ -0,0 +1,121 @@
+import io
+import json
+import logging
+import queue
+from logging.handlers import QueueListener
+from types import SimpleNamespace
+import pytest
+from app.config.logging_config import JsonFormatter, RateLimitFilter, RequestContextFilter, StructuredQueueHandler
+from app.middleware.request_logging_middleware import RequestLoggingMiddleware
+from app.monitoring.request_context import current_request, database_timer
+
+
+def make_app(status: int):
+    async def app(scope, receive, send):
+        logging.getLogger("app.test").info("Handling %s", scope["path"])
+        # What the Motor command listener reports for a command issued by this request
+        database_timer.succeeded(SimpleNamespace(duration_micros=2500))
+        database_timer.succeeded(SimpleNamespace(duration_micros=1500))
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+    return app
+
+
+async def call(app, headers=()):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app({"type": "http", "method": "GET", "path": "/api/v1/products/", "headers": list(headers)}, receive, send)
+    return dict(messages[0]["headers"])
+
+
+def access_records(caplog):
+    return [record for record in caplog.records if record.name == "app.access"]
+
+
+class TestStructuredLogging:
+    """Test JSON records written through the queue listener"""
+
+    def test_queue_listener_writes_json_with_context_and_traceback(self):
+        """Test that extra fields, the request ID and the traceback survive the queue"""
+        stream = io.StringIO()
+        output = logging.StreamHandler(stream)
+        output.setFormatter(JsonFormatter())
+        log_queue = queue.SimpleQueue()
+        handler = StructuredQueueHandler(log_queue)
+        handler.addFilter(RequestContextFilter())
+        logger = logging.getLogger("app.test.json")
+        logger.addHandler(handler)
+        logger.propagate = False
+        listener = QueueListener(log_queue, output)
+        listener.start()
+        try:
+            try:
+                raise ValueError("bad value")
+            except ValueError:
+                logger.error("Could not import %s", "row 3", exc_info=True, extra={"rows": 3})
+        finally:
+            listener.stop()
+            logger.removeHandler(handler)
+            logger.propagate = True
+
+        entry = json.loads(stream.getvalue())
+        assert entry["message"] == "Could not import row 3"
+        assert (entry["level"], entry["logger"], entry["rows"]) == ("ERROR", "app.test.json", 3)
+        assert "ValueError: bad value" in entry["exception"]
+
+    def test_rate_limit_counts_suppressed_repeats(self, monkeypatch):
+        """Test that repeats of one message beyond the limit are dropped and counted"""
+        clock = [100.0]
+        monkeypatch.setattr("app.config.logging_config.time.monotonic", lambda: clock[0])
+        limit = RateLimitFilter(max_per_second=2)
+
+        def record(message="Unhandled exception: %s"):
+            return logging.LogRecord("app.main", logging.ERROR, "", 0, message, ("boom",), None)
+
+        passed = [limit.filter(record()) for _ in range(5)]
+        other = limit.filter(record("Another message %s"))
+        access = logging.LogRecord("app.access", logging.INFO, "", 0, "Unhandled exception: %s", ("boom",), None)
+        clock[0] += 1
+        next_second = record()
+
+        assert passed == [True, True, False, False, False]
+        assert other and all(limit.filter(access) for _ in range(5))
+        assert limit.filter(next_second) and next_second.suppressed == 3
+
+
+class TestRequestLogging:
+    """Test request IDs, DB time and access log sampling"""
+
+    @pytest.mark.asyncio
+    async def test_access_line_has_request_id_status_and_db_time(self, caplog):
+        """Test that the caller's request ID is kept and logged with the request's DB time"""
+        app = RequestLoggingMiddleware(make_app(200))
+
+        with caplog.at_level(logging.INFO):
+            headers = await call(app, [(b"x-request-id", b"req-123")])
+
+        assert headers[b"x-request-id"] == b"req-123"
+        [record] = access_records(caplog)
+        assert (record.request_id, record.status, record.db_commands, record.db_ms) == ("req-123", 200, 2, 4.0)
+        assert record.route == "/api/v1/products/"
+        assert current_request() is None
+
+    @pytest.mark.asyncio
+    async def test_sampling_keeps_errors(self, caplog):
+        """Test that sampled-out successes are skipped while errors are always logged"""
+        ok = RequestLoggingMiddleware(make_app(200), sample_rate=0.0)
+        failing = RequestLoggingMiddleware(make_app(503), sample_rate=0.0)
+
+        with caplog.at_level(logging.INFO):
+            await call(ok, [(b"x-request-id", b"not valid!")])
+            headers = await call(failing)
+
+        [record] = access_records(caplog)
+        assert (record.status, record.levelname) == (503, "ERROR")
+        assert len(headers[b"x-request-id"]) == 32
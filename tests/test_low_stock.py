@@ -0,0 +1,81 @@
+import pytest
+from app.config.settings import settings
+from app.repositories.memory import InMemoryDatabase
+from app.repositories.product_repository import ProductRepository
+
+
+def product(name: str, stock_quantity: int, is_active: bool = True):
+    return {"name": name, "description": None, "price": 10.0, "category": "Books", "stock_quantity": stock_quantity, "is_active": is_active}
+
+
+class TestLowStockView:
+    """Test the low-stock view served from its partial index, and its fallback"""
+
+    @pytest.fixture(autouse=True)
+    def setup_repository(self, monkeypatch):
+        """Setup a product repository over the in-memory backend with the default threshold"""
+        monkeypatch.setattr(settings, "low_stock_threshold", 10)
+        self.database = InMemoryDatabase()
+        self.repository = ProductRepository(self.database)
+        self.queries = []
+        find = self.repository._find
+
+        def recording_find(query, *args, **kwargs):
+            self.queries.append(query)
+            return find(query, *args, **kwargs)
+
+        monkeypatch.setattr(self.repository, "_find", recording_find)
+
+    async def names(self, threshold: int):
+        return [document["name"] for document in await self.repository.get_low_stock_view(threshold)]
+
+    @pytest.mark.asyncio
+    async def test_threshold_boundary_and_order(self):
+        """Test that stock equal to the threshold is low, one above is not, lowest stock first"""
+        for name, stock_quantity in (("Eleven", 11), ("Ten", 10), ("Zero", 0), ("Nine", 9)):
+            await self.repository.create(product(name, stock_quantity))
+
+        assert await self.names(10) == ["Zero", "Nine", "Ten"]
+        assert await self.names(9) == ["Zero", "Nine"]
+
+    @pytest.mark.asyncio
+    async def test_inactive_products_are_excluded(self):
+        """Test that inactive products never show up, from the index or the fallback"""
+        await self.repository.create(product("Active", 1))
+        await self.repository.create(product("Inactive", 1, is_active=False))
+
+        assert await self.names(10) == ["Active"]
+        assert await self.names(50) == ["Active"]
+
+    @pytest.mark.asyncio
+    async def test_query_matches_partial_index_filter(self):
+        """Test that the view's query repeats the partial index filter, or MongoDB will not use the index"""
+        await self.repository.ensure_indexes()
+        await self.repository.get_low_stock_view(5)
+
+        index = (await self.database["products"].index_information())["low_stock_view"]
+        [query] = self.queries
+        assert index["partialFilterExpression"].items() <= query.items()
+        assert [key for key, _ in index["key"]] == ["stock_quantity", "_id"]
+
+    @pytest.mark.asyncio
+    async def test_flag_follows_stock_and_backfill(self):
+        """Test that stock updates move products in and out of the view, and the refresh flags older products"""
+        created = await self.repository.create(product("Restocked", 2))
+        await self.database["products"].insert_one(product("Legacy", 3))
+
+        await self.repository.ensure_indexes()
+        assert await self.names(10) == ["Restocked"]
+        await self.repository.refresh_low_stock_flags()
+        assert await self.names(10) == ["Restocked", "Legacy"]
+        await self.repository.update_stock(str(created["_id"]), 30)
+        assert await self.names(10) == ["Legacy"]
+
+    @pytest.mark.asyncio
+    async def test_threshold_above_maintained_one_falls_back(self):
+        """Test that thresholds the flag does not cover use a plain stock query"""
+        await self.repository.create(product("Fifteen", 15))
+        await self.repository.create(product("Thirty", 30))
+
+        assert await self.names(20) == ["Fifteen"]
+        assert "low_stock" not in self.queries[-1]
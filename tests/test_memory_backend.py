@@ -0,0 +1,278 @@
+import re
+from datetime import datetime, timedelta
+import httpx
+import pytest
+import pytest_asyncio
+from bson import ObjectId
+from pymongo import DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+from app.cache.backends import InProcessCacheBackend
+from app.cache.tiered import shared_cache
+from app.config.database import get_database
+from app.config.settings import settings
+from app.main import app
+from app.repositories.brand_repository import BrandRepository
+from app.repositories.memory import InMemoryDatabase
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.utils.security import create_access_token
+from tests.test_bulk_import import bcrypt_available
+from tests.test_query_budget import ROUTE_BUDGETS, USERNAME, seed
+
+# Routes that hash a password cannot run where passlib cannot drive bcrypt
+HASHING_ROUTES = {("POST", "/users/"), ("POST", "/users/import")}
+
+
+@pytest_asyncio.fixture
+async def products():
+    database = InMemoryDatabase()
+    collection = database["products"]
+    await collection.insert_many([
+        {"name": "Oak Desk", "price": 120.0, "category": "Furniture", "stock_quantity": 3, "is_active": True},
+        {"name": "Steel Lamp", "price": 35.5, "category": "Lighting", "stock_quantity": 40, "is_active": True},
+        {"name": "Oak Shelf", "price": 80, "category": "Furniture", "stock_quantity": 0, "is_active": False},
+        {"name": "Desk Mat", "description": "Felt desk pad", "price": 15.0, "category": "Office", "is_active": True},
+    ])
+    return collection
+
+
+async def names(cursor):
+    return [document["name"] for document in await cursor.to_list(length=None)]
+
+
+class TestQueries:
+    """Test the query operators the repositories use"""
+
+    @pytest.mark.asyncio
+    async def test_ranges_regex_and_logical_operators(self, products):
+        """Test ranges, case-insensitive regex, $or/$and and missing fields"""
+        assert await names(products.find({"price": {"$gte": 35.5, "$lte": 120}})) == ["Oak Desk", "Steel Lamp", "Oak Shelf"]
+        assert await names(products.find({
+            "$or": [{"name": {"$regex": "desk", "$options": "i"}}, {"description": {"$regex": "desk", "$options": "i"}}]
+        })) == ["Oak Desk", "Desk Mat"]
+        assert await names(products.find({"$and": [{"category": "Furniture"}, {"is_active": True}]})) == ["Oak Desk"]
+        assert await names(products.find({"description": None})) == ["Oak Desk", "Steel Lamp", "Oak Shelf"]
+        assert await names(products.find({"stock_quantity": {"$exists": False}})) == ["Desk Mat"]
+        assert await names(products.find({"name": re.compile("^Oak")})) == ["Oak Desk", "Oak Shelf"]
+        # A boolean is never equal to a number
+        assert await products.count_documents({"is_active": 1}) == 0
+
+    @pytest.mark.asyncio
+    async def test_sort_skip_limit_and_projection(self, products):
+        """Test multi-key sorts, paging and projections on copies of the stored documents"""
+        cursor = products.find({}, {"name": 1, "_id": 0}).sort([("category", DESCENDING), ("price", 1)]).skip(1).limit(2)
+        documents = await cursor.to_list(length=None)
+
+        assert documents == [{"name": "Steel Lamp"}, {"name": "Oak Shelf"}]
+        first = await products.find_one({"name": "Oak Desk"})
+        first["name"] = "Changed"
+        assert await products.count_documents({"name": "Oak Desk"}) == 1
+        assert await products.count_documents({"category": "Furniture"}, limit=1) == 1
+
+    @pytest.mark.asyncio
+    async def test_indexed_equality_only_reads_matching_documents(self, products):
+        """Test that equality and $in on an indexed field are served from the index, in natural order"""
+        await products.create_index("category")
+
+        candidates = products._candidates({"category": {"$in": ["Office", "Furniture"]}, "is_active": True})
+
+        assert [document["name"] for document in candidates] == ["Oak Desk", "Oak Shelf", "Desk Mat"]
+        assert await names(products.find({"category": "Furniture", "is_active": True})) == ["Oak Desk"]
+        await products.update_one({"name": "Desk Mat"}, {"$set": {"category": "Furniture"}})
+        assert await products.count_documents({"category": "Office"}) == 0
+        assert await products.count_documents({"category": "Furniture"}) == 3
+
+    @pytest.mark.asyncio
+    async def test_aggregate_lookup_and_first(self, products):
+        """Test the $match/$skip/$limit/$lookup/$set pipeline used to expand brands"""
+        brand_id = ObjectId()
+        await products.database["brand"].insert_one({"_id": brand_id, "name": "Nord"})
+        await products.update_one({"name": "Oak Desk"}, {"$set": {"brand_id": brand_id}})
+
+        documents = await products.aggregate([
+            {"$match": {"is_active": True}},
+            {"$skip": 0},
+            {"$limit": 2},
+            {"$lookup": {"from": "brand", "localField": "brand_id", "foreignField": "_id", "as": "brand"}},
+            {"$set": {"brand": {"$first": "$brand"}}},
+        ]).to_list(length=2)
+
+        assert documents[0]["brand"]["name"] == "Nord"
+        assert "brand" not in documents[1]
+
+    @pytest.mark.asyncio
+    async def test_command_log_counts_round_trips(self, products):
+        """Test that the command log records one entry per command and getMore a server would see"""
+        await products.insert_many([{"name": f"Item {number}"} for number in range(150)])
+        products.database.command_log = []
+
+        await products.find({}).to_list(length=None)
+        await products.find({}).batch_size(50).to_list(length=None)
+        await products.find_one({"name": "Oak Desk"})
+        await products.count_documents({})
+        await products.bulk_write([
+            UpdateOne({"name": "Oak Desk"}, {"$set": {"price": 1}}),
+            UpdateOne({"name": "Desk Mat"}, {"$set": {"price": 2}}),
+        ])
+
+        assert [command for command, _ in products.database.command_log] == [
+            "find", "getMore", "find", "getMore", "getMore", "getMore", "find", "aggregate", "update"
+        ]
+
+
+class TestWrites:
+    """Test writes, bulk writes and the repositories' index maintenance"""
+
+    @pytest.mark.asyncio
+    async def test_bulk_upsert_and_duplicate_ids(self, products):
+        """Test upserts with $setOnInsert and per-document errors of unordered inserts"""
+        now = datetime.utcnow()
+        result = await products.bulk_write([
+            UpdateOne({"name": "Oak Desk"}, {"$set": {"price": 99.0}, "$setOnInsert": {"created_at": now}}, upsert=True),
+            UpdateOne({"name": "Glass Vase"}, {"$set": {"price": 20.0}, "$setOnInsert": {"created_at": now}}, upsert=True),
+        ], ordered=False)
+
+        assert (result.matched_count, result.modified_count, result.upserted_count) == (1, 1, 1)
+        vase = await products.find_one({"name": "Glass Vase"})
+        assert vase["created_at"] == now and "created_at" not in await products.find_one({"name": "Oak Desk"})
+
+        with pytest.raises(BulkWriteError) as error:
+            await products.insert_many([{"_id": vase["_id"]}, {"name": "Fresh"}], ordered=False)
+        assert [write_error["index"] for write_error in error.value.details["writeErrors"]] == [0]
+        assert error.value.details["nInserted"] == 1
+
+    @pytest.mark.asyncio
+    async def test_change_marker_follows_writes(self, products):
+        """Test that inserts, updates and deletes each change the collection's change marker"""
+        repository = ProductRepository(products.database)
+        markers = [await repository.get_change_marker()]
+
+        created = await repository.create({"name": "Glass Vase", "price": 20.0, "category": "Decor", "stock_quantity": 4})
+        markers.append(await repository.get_change_marker())
+        await repository.update(str(created["_id"]), {"price": 25.0})
+        markers.append(await repository.get_change_marker())
+        await products.delete_one({"name": "Desk Mat"})
+        markers.append(await repository.get_change_marker())
+
+        assert len(set(markers)) == 4
+        assert markers[0][0] == 4 and markers[-1][0] == 4
+
+    @pytest.mark.asyncio
+    async def test_product_indexes_backfill_derived_fields(self, products):
+        """Test that ensure_indexes and the low-stock refresh run their pipeline updates and $expr filter"""
+        created_at = datetime.utcnow() - timedelta(days=1)
+        await products.update_many({}, {"$set": {"created_at": created_at}})
+        repository = ProductRepository(products.database)
+
+        await repository.ensure_indexes()
+        assert "low_stock" not in await products.find_one({"name": "Oak Desk"})
+        assert await repository.refresh_low_stock_flags() == 4
+        assert await repository.refresh_low_stock_flags() == 0
+
+        desk = await products.find_one({"name": "Oak Desk"})
+        lamp = await products.find_one({"name": "Steel Lamp"})
+        assert desk["updated_at"] == created_at and desk["name_lower"] == "oak desk"
+        assert (desk["low_stock"], lamp["low_stock"]) == (True, False)
+        assert "low_stock_view" in await products.index_information()
+
+
+@pytest_asyncio.fixture
+async def memory_api(monkeypatch):
+    """The app wired to a seeded in-memory database, as the memory backend would set it up"""
+    database = InMemoryDatabase()
+    for repository in (ProductRepository(database), BrandRepository(database), UserRepository(database)):
+        await repository.ensure_indexes()
+    ids = await seed(database)
+    monkeypatch.setattr(settings, "query_cache_enabled", False)
+    monkeypatch.setattr(settings, "entity_cache_enabled", False)
+
+    async def get_test_database():
+        return database
+
+    app.dependency_overrides[get_database] = get_test_database
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': USERNAME})}"}
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", headers=headers)
+    try:
+        yield http, ids, database
+    finally:
+        await http.aclose()
+        app.dependency_overrides.pop(get_database, None)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("route", sorted(ROUTE_BUDGETS), ids=lambda route: f"{route[0]} {route[1]}")
+async def test_route_runs_against_memory_backend(memory_api, route):
+    """Test every API route end to end without a MongoDB server, within its command budget"""
+    if route in HASHING_ROUTES and not bcrypt_available():
+        pytest.skip("passlib cannot hash with the installed bcrypt")
+    http, ids, database = memory_api
+    method, _ = route
+    budget = ROUTE_BUDGETS[route]
+    request = {}
+    if route == ("POST", "/auth/login"):
+        request["data"] = {"username": USERNAME, "password": "secret"}
+    elif route == ("POST", "/auth/login-json"):
+        request["json"] = {"username": USERNAME, "password": "secret"}
+    elif budget.body is not None:
+        request["json"] = budget.body(ids)
+    elif budget.content is not None:
+        request["content"] = budget.content.encode()
+
+    database.command_log = []
+    response = await http.request(method, budget.path(ids), **request)
+    commands, database.command_log = database.command_log, None
+
+    assert response.status_code < 400, response.text
+    assert len(commands) <= budget.max_commands, commands
+
+
+@pytest.mark.asyncio
+async def test_product_lifecycle_against_memory_backend(memory_api):
+    """Test create, search, price range, update and delete through the API"""
+    http, _, _ = memory_api
+    created = await http.post("/api/v1/products/", json={
+        "name": "Walnut Bookshelf", "price": 249.5, "category": "Furniture", "stock_quantity": 2
+    })
+    assert created.status_code == 201, created.text
+    product_id = created.json()["_id"]
+
+    duplicate = await http.post("/api/v1/products/", json={
+        "name": "Walnut Bookshelf", "price": 1, "category": "Furniture", "stock_quantity": 1
+    })
+    found = await http.get("/api/v1/products/search/walnut")
+    in_range = await http.get("/api/v1/products/price-range", params={"min_price": 249, "max_price": 250})
+    updated = await http.put(f"/api/v1/products/{product_id}", json={"stock_quantity": 50})
+    deleted = await http.delete(f"/api/v1/products/{product_id}")
+    missing = await http.get(f"/api/v1/products/{product_id}")
+
+    assert duplicate.status_code == 400
+    assert [product["_id"] for product in found.json()] == [product_id]
+    assert product_id in [product["_id"] for product in in_range.json()["items"]]
+    assert updated.json()["stock_quantity"] == 50
+    assert deleted.status_code in (200, 204)
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_user_documents_are_not_cached(memory_api, monkeypatch):
+    """Test that user reads never put password hashes into the shared cache"""
+    http, ids, _ = memory_api
+    monkeypatch.setattr(settings, "query_cache_enabled", True)
+    monkeypatch.setattr(settings, "entity_cache_enabled", True)
+    backend = InProcessCacheBackend()
+    shared_cache.l1.clear()
+    await shared_cache.start(backend)
+    try:
+        for path in ("/api/v1/users/", f"/api/v1/users/{ids['user']}", f"/api/v1/users/?ids={ids['user']}", "/api/v1/products/"):
+            response = await http.get(path)
+            assert response.status_code == 200, response.text
+        l2_values = [value for value, _ in backend._values.values()]
+        l1_values = [value for value, _ in shared_cache.l1._entries.values()]
+    finally:
+        await shared_cache.close()
+        shared_cache.l1.clear()
+
+    # The product list is cached, so the cache was in use
+    assert l2_values and l1_values
+    assert not any(b"hashed_password" in value for value in l2_values)
+    assert "hashed_password" not in repr(l1_values)
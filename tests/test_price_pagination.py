@@ -0,0 +1,86 @@
+import pytest
+import pytest_asyncio
+from datetime import datetime
+from fastapi import HTTPException
+from app.repositories.memory import InMemoryDatabase
+from app.repositories.product_repository import ProductRepository
+from app.services.product_service import ProductService
+from app.utils.pagination import decode_cursor, encode_cursor
+
+PRICES = [5.0, 10.0, 10.0, 10.0, 10.0, 20.0, 30.0]
+
+
+async def walk(service, limit: int, **kwargs):
+    """Follow next_cursor through every page, returning the pages' product names"""
+    pages = []
+    cursor = None
+    while True:
+        page = await service.get_products_by_price_range(cursor=cursor, limit=limit, **kwargs)
+        pages.append([item.name for item in page.items])
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages
+
+
+@pytest_asyncio.fixture
+async def service():
+    """Product service over products sharing a price across page boundaries"""
+    database = InMemoryDatabase()
+    await database["products"].insert_many([
+        {"name": f"P{index}", "description": None, "price": price, "category": "Books", "stock_quantity": 1, "is_active": True, "created_at": datetime(2024, 1, 1)}
+        for index, price in enumerate(PRICES)
+    ])
+    return ProductService(ProductRepository(database))
+
+
+class TestPriceRangePagination:
+    """Test keyset pagination over (price, _id)"""
+
+    @pytest.mark.asyncio
+    async def test_equal_prices_across_page_boundaries(self, service):
+        """Test that ties on price continue by _id, without skipping or repeating products"""
+        pages = await walk(service, limit=2)
+
+        assert pages == [["P0", "P1"], ["P2", "P3"], ["P4", "P5"], ["P6"]]
+
+    @pytest.mark.asyncio
+    async def test_descending_with_price_bounds(self, service):
+        """Test descending order within bounds, ties included"""
+        pages = await walk(service, limit=3, min_price=10, max_price=20, descending=True)
+
+        assert pages == [["P5", "P4", "P3"], ["P2", "P1"]]
+
+    @pytest.mark.asyncio
+    async def test_last_page_has_no_cursor(self, service):
+        """Test that a page ending exactly at the last product has no next cursor"""
+        page = await service.get_products_by_price_range(limit=len(PRICES))
+
+        assert len(page.items) == len(PRICES)
+        assert page.next_cursor is None
+        assert (await service.get_products_by_price_range(min_price=100)).items == []
+
+    @pytest.mark.asyncio
+    async def test_cursor_points_at_last_item(self, service):
+        """Test that the cursor is the (price, id) keyset of the page's last product"""
+        page = await service.get_products_by_price_range(limit=3)
+
+        assert decode_cursor(page.next_cursor) == {"p": 10.0, "id": page.items[-1].id}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("cursor", [
+        "not a cursor",
+        "é",
+        encode_cursor(["p", "id"]),
+        encode_cursor({"p": 10.0}),
+        encode_cursor({"p": "cheap", "id": "507f1f77bcf86cd799439011"}),
+        encode_cursor({"p": [10], "id": "507f1f77bcf86cd799439011"}),
+        encode_cursor({"p": "nan", "id": "507f1f77bcf86cd799439011"}),
+        encode_cursor({"p": 10.0, "id": "not-an-object-id"}),
+        encode_cursor({"p": 10.0, "id": 12}),
+    ])
+    async def test_malformed_or_tampered_cursor_is_rejected(self, service, cursor):
+        """Test that bad cursors get 400 instead of failing in the query"""
+        with pytest.raises(HTTPException) as error:
+            await service.get_products_by_price_range(cursor=cursor)
+
+        assert error.value.status_code == 400
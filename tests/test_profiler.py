@@ -0,0 +1,71 @@
+import pstats
+import pytest
+from app.middleware.profiler_middleware import ProfilerMiddleware
+
+
+async def busy_endpoint():
+    return sum(index * index for index in range(20000))
+
+
+async def endpoint_app(scope, receive, send):
+    """ASGI app that records its endpoint in the scope the way the router does"""
+    scope["endpoint"] = busy_endpoint
+    await busy_endpoint()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def call(app, headers=()):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/api/v1/products/", "headers": list(headers)}
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+
+def profiler(tmp_path, **kwargs):
+    return ProfilerMiddleware(endpoint_app, output_dir=str(tmp_path), backend="cprofile", **kwargs)
+
+
+class TestProfilerMiddleware:
+    """Test opt-in per-request profiling"""
+
+    @pytest.mark.asyncio
+    async def test_admin_header_writes_tagged_pstats(self, tmp_path):
+        """Test that a valid token produces a readable pstats file named after the route"""
+        app = profiler(tmp_path, token="secret")
+
+        assert await call(app, [(b"x-profile", b"secret")]) == 200
+
+        artifacts = list(tmp_path.iterdir())
+        assert len(artifacts) == 1
+        assert "_GET_busy_endpoint_" in artifacts[0].name and artifacts[0].name.endswith("ms.pstats")
+        functions = {function for _, _, function in pstats.Stats(str(artifacts[0])).stats}
+        assert "busy_endpoint" in functions
+
+    @pytest.mark.asyncio
+    async def test_wrong_or_missing_token_is_not_profiled(self, tmp_path):
+        """Test that only the admin token triggers profiling"""
+        app = profiler(tmp_path, token="secret")
+
+        await call(app, [(b"x-profile", b"guess")])
+        await call(app)
+
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_and_artifact_retention(self, tmp_path):
+        """Test the per-minute cap on sampled profiles and the pruning of old artifacts"""
+        app = profiler(tmp_path, sample_rate=1.0, max_per_minute=3, max_artifacts=2)
+
+        for _ in range(5):
+            assert await call(app) == 200
+
+        assert (app.profiled, app.skipped) == (3, 2)
+        assert len(list(tmp_path.iterdir())) == 2
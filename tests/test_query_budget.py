@@ -0,0 +1,293 @@
+import os
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+import httpx
+import pytest
+import pytest_asyncio
+from bson import ObjectId
+from fastapi.routing import APIRoute
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from app.config.database import get_database
+from app.config.settings import settings
+from app.main import app
+from app.repositories.brand_repository import BrandRepository
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.utils.security import create_access_token
+from app.utils.text import normalize_name
+
+MONGODB_URL = os.environ.get("TEST_MONGODB_URL", settings.mongodb_url)
+TEST_DATABASE = "python_web_api_query_budget_test"
+API = "/api/v1"
+MONGODB_STATUS: Dict[str, bool] = {}
+
+PRODUCTS = 300
+BRANDS = 5
+USERS = 20
+USERNAME = "budget_user"
+NAME_WORDS = ("Alpha", "Bravo", "Charlie")
+CATEGORIES = ("Books", "Games", "Tools")
+
+# Connection handshakes and cursor cleanup are not round trips a route chose to make
+IGNORED_COMMANDS = {
+    "hello", "isMaster", "ismaster", "ping", "buildInfo", "endSessions",
+    "saslStart", "saslContinue", "killCursors",
+}
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count"}
+
+
+class Budget(NamedTuple):
+    """Most Mongo commands and documents examined one request to a route may cost"""
+    max_commands: int
+    max_docs_examined: int
+    path: Callable[[Dict[str, str]], str]
+    body: Optional[Callable[[Dict[str, str]], Any]] = None
+    content: Optional[str] = None
+    collection_scan: bool = False
+
+
+def unique(prefix: str) -> str:
+    return f"{prefix} {ObjectId()}"
+
+
+# One request per route, against the data seeded below with every cache cold; the current user
+# lookup of authenticated routes is included. Collection scans are only allowed where the query
+# cannot use an index (regex search) or reads the whole collection by design (list, export).
+ROUTE_BUDGETS: Dict[tuple, Budget] = {
+    ("POST", "/auth/login"): Budget(1, 1, lambda ids: f"{API}/auth/login"),
+    ("POST", "/auth/login-json"): Budget(1, 1, lambda ids: f"{API}/auth/login-json"),
+
+    ("POST", "/users/"): Budget(5, 5, lambda ids: f"{API}/users/", lambda ids: {
+        "username": f"new_{ObjectId()}", "email": f"{ObjectId()}@example.com", "password": "secret1"
+    }),
+    ("POST", "/users/import"): Budget(
+        4, 5, lambda ids: f"{API}/users/import?format=csv",
+        content=f"username,email,password\nimport_a,a_{ObjectId()}@example.com,secret1\nimport_b,b_{ObjectId()}@example.com,secret2\n"
+    ),
+    ("GET", "/users/"): Budget(2, 1 + USERS + 2, lambda ids: f"{API}/users/", collection_scan=True),
+    ("GET", "/users/export"): Budget(2, 1 + USERS + 2, lambda ids: f"{API}/users/export"),
+    ("GET", "/users/{user_id}"): Budget(2, 2, lambda ids: f"{API}/users/{ids['user']}"),
+    ("PUT", "/users/{user_id}"): Budget(5, 4, lambda ids: f"{API}/users/{ids['user']}", lambda ids: {
+        "email": f"{ObjectId()}@example.com"
+    }),
+    ("DELETE", "/users/{user_id}"): Budget(3, 2, lambda ids: f"{API}/users/{ids['user']}"),
+    ("GET", "/users/me/profile"): Budget(2, 2, lambda ids: f"{API}/users/me/profile"),
+
+    ("POST", "/products/"): Budget(4, 3, lambda ids: f"{API}/products/", lambda ids: {
+        "name": unique("New"), "price": 10, "category": "Books", "stock_quantity": 5
+    }),
+    ("POST", "/products/import"): Budget(
+        3, 3, lambda ids: f"{API}/products/import?format=csv",
+        content=f"name,price,category,stock_quantity\n{unique('Import')},5,Books,1\n{unique('Import')},6,Games,2\n"
+    ),
+    ("GET", "/products/export"): Budget(2, 1 + PRODUCTS, lambda ids: f"{API}/products/export?fields=name,price"),
+    ("GET", "/products/"): Budget(3, 1 + 20 + BRANDS, lambda ids: f"{API}/products/?limit=20&expand=brand", collection_scan=True),
+    ("GET", "/products/changes"): Budget(3, 1 + 51, lambda ids: f"{API}/products/changes?limit=50"),
+    ("GET", "/products/autocomplete"): Budget(2, 1 + 12, lambda ids: f"{API}/products/autocomplete?q=alp&limit=10"),
+    ("GET", "/products/price-range"): Budget(2, 1 + 21, lambda ids: f"{API}/products/price-range?min_price=10&max_price=200&limit=20"),
+    ("GET", "/products/low-stock"): Budget(2, 1 + 20, lambda ids: f"{API}/products/low-stock?limit=20"),
+    ("GET", "/products/{product_id}"): Budget(2, 2, lambda ids: f"{API}/products/{ids['product']}"),
+    ("PUT", "/products/{product_id}"): Budget(5, 4, lambda ids: f"{API}/products/{ids['product']}", lambda ids: {
+        "name": unique("Renamed"), "price": 12
+    }),
+    ("DELETE", "/products/{product_id}"): Budget(4, 2, lambda ids: f"{API}/products/{ids['product']}"),
+    ("GET", "/products/category/{category}"): Budget(2, 1 + 20, lambda ids: f"{API}/products/category/Books?limit=20"),
+    ("GET", "/products/search/{search_term}"): Budget(
+        2, 1 + PRODUCTS, lambda ids: f"{API}/products/search/bravo?limit=20", collection_scan=True
+    ),
+
+    ("POST", "/brands/"): Budget(4, 3, lambda ids: f"{API}/brands/", lambda ids: {"name": unique("Brand")}),
+    ("GET", "/brands/"): Budget(2, 1 + BRANDS, lambda ids: f"{API}/brands/", collection_scan=True),
+    ("GET", "/brands/export"): Budget(2, 1 + BRANDS, lambda ids: f"{API}/brands/export?format=csv"),
+    ("GET", "/brands/autocomplete"): Budget(2, 1 + BRANDS, lambda ids: f"{API}/brands/autocomplete?q=maker"),
+    ("GET", "/brands/{brand_id}"): Budget(2, 2, lambda ids: f"{API}/brands/{ids['brand']}"),
+    ("PUT", "/brands/{brand_id}"): Budget(5, 4, lambda ids: f"{API}/brands/{ids['brand']}", lambda ids: {
+        "name": unique("Rebranded")
+    }),
+    ("DELETE", "/brands/{brand_id}"): Budget(3, 2, lambda ids: f"{API}/brands/{ids['brand']}"),
+    ("GET", "/brands/search/{search_term}"): Budget(
+        2, 1 + BRANDS, lambda ids: f"{API}/brands/search/maker", collection_scan=True
+    ),
+}
+
+
+class CommandRecorder(monitoring.CommandListener):
+    """Records the commands sent to the test database while recording is on"""
+
+    def __init__(self):
+        self.recording = False
+        self.commands: List[Dict[str, Any]] = []
+
+    def started(self, event):
+        if self.recording and event.database_name == TEST_DATABASE and event.command_name not in IGNORED_COMMANDS:
+            self.commands.append(dict(event.command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def plain_command(command: Dict[str, Any]) -> Dict[str, Any]:
+    """A recorded command without its session and cluster fields, so it can be explained"""
+    return {key: value for key, value in command.items() if not key.startswith("$") and key not in ("lsid", "txnNumber")}
+
+
+def walk(node: Any):
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from walk(value)
+
+
+def docs_examined(explain: Dict[str, Any]) -> int:
+    return sum(node["totalDocsExamined"] for node in walk(explain) if "totalDocsExamined" in node)
+
+
+def uses_collection_scan(explain: Dict[str, Any]) -> bool:
+    plans = [node["winningPlan"] for node in walk(explain) if "winningPlan" in node]
+    return any(node.get("stage") == "COLLSCAN" for plan in plans for node in walk(plan))
+
+
+async def seed(database) -> Dict[str, str]:
+    now = datetime.utcnow()
+    brands = [
+        {"_id": ObjectId(), "name": f"Maker {index}", "description": None, "is_active": True, "created_at": now}
+        for index in range(BRANDS)
+    ]
+    for brand in brands:
+        brand["name_lower"] = normalize_name(brand["name"])
+    await database["brand"].insert_many(brands)
+
+    products = []
+    for index in range(PRODUCTS):
+        name = f"{NAME_WORDS[index % len(NAME_WORDS)]} {index:03d}"
+        stock_quantity = index % 50
+        products.append({
+            "name": name,
+            "name_lower": normalize_name(name),
+            "description": None,
+            "price": float(index + 1),
+            "category": CATEGORIES[index % len(CATEGORIES)],
+            "stock_quantity": stock_quantity,
+            "low_stock": stock_quantity <= settings.low_stock_threshold,
+            "brand_id": brands[index % BRANDS]["_id"] if index % 2 == 0 else None,
+            "is_active": index % 10 != 9,
+            "created_at": now - timedelta(minutes=PRODUCTS - index),
+            "updated_at": now - timedelta(minutes=PRODUCTS - index),
+        })
+    await database["products"].insert_many(products)
+
+    users = [
+        {
+            "username": USERNAME if index == 0 else f"user_{index}",
+            "email": f"user_{index}@example.com",
+            "hashed_password": "not-a-real-hash",
+            "is_active": True,
+            "created_at": now,
+        }
+        for index in range(USERS)
+    ]
+    await database["users"].insert_many(users)
+    return {
+        "brand": str(brands[1]["_id"]),
+        "product": str(products[10]["_id"]),
+        "user": str(users[1]["_id"]),
+    }
+
+
+@pytest_asyncio.fixture
+async def budget_env(monkeypatch):
+    """Seeded test database wired into the app, with command recording; skipped without MongoDB"""
+    if not MONGODB_STATUS.get("available", True):
+        pytest.skip(f"MongoDB is not reachable at {MONGODB_URL}")
+    recorder = CommandRecorder()
+    client = AsyncIOMotorClient(MONGODB_URL, serverSelectionTimeoutMS=500, event_listeners=[recorder])
+    try:
+        await client.admin.command("ping")
+    except Exception:
+        client.close()
+        # Skip the remaining routes without waiting for server selection again
+        MONGODB_STATUS["available"] = False
+        pytest.skip(f"MongoDB is not reachable at {MONGODB_URL}")
+
+    await client.drop_database(TEST_DATABASE)
+    database = client[TEST_DATABASE]
+    for repository in (ProductRepository(database), BrandRepository(database), UserRepository(database)):
+        await repository.ensure_indexes()
+    ids = await seed(database)
+
+    # Measure the database path, not cache hits left over from other requests
+    monkeypatch.setattr(settings, "query_cache_enabled", False)
+    monkeypatch.setattr(settings, "entity_cache_enabled", False)
+
+    async def get_test_database():
+        return database
+
+    app.dependency_overrides[get_database] = get_test_database
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': USERNAME})}"}
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", headers=headers)
+    try:
+        yield http, database, recorder, ids
+    finally:
+        await http.aclose()
+        app.dependency_overrides.pop(get_database, None)
+        await client.drop_database(TEST_DATABASE)
+        client.close()
+
+
+def api_routes():
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path.startswith(API):
+            for method in route.methods:
+                yield method, route.path[len(API):]
+
+
+def test_every_route_has_a_budget():
+    """Test that new routes cannot be added without a query budget"""
+    missing = sorted(set(api_routes()) - set(ROUTE_BUDGETS))
+    stale = sorted(set(ROUTE_BUDGETS) - set(api_routes()))
+
+    assert missing == [], f"Add query budgets for {missing}"
+    assert stale == [], f"Remove budgets of deleted routes {stale}"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("route", sorted(ROUTE_BUDGETS), ids=lambda route: f"{route[0]} {route[1]}")
+async def test_route_stays_within_query_budget(budget_env, route):
+    """Test the number of round trips and documents examined by one request to a route"""
+    http, database, recorder, ids = budget_env
+    method, _ = route
+    budget = ROUTE_BUDGETS[route]
+    request = {}
+    if route == ("POST", "/auth/login"):
+        request["data"] = {"username": USERNAME, "password": "secret"}
+    elif route == ("POST", "/auth/login-json"):
+        request["json"] = {"username": USERNAME, "password": "secret"}
+    elif budget.body is not None:
+        request["json"] = budget.body(ids)
+    elif budget.content is not None:
+        request["content"] = budget.content.encode()
+
+    recorder.recording = True
+    response = await http.request(method, budget.path(ids), **request)
+    recorder.recording = False
+
+    assert response.status_code < 400, response.text
+    commands = recorder.commands
+    assert len(commands) <= budget.max_commands, [next(iter(command)) for command in commands]
+
+    examined = 0
+    for command in commands:
+        if next(iter(command)) not in EXPLAINABLE_COMMANDS:
+            continue
+        explain = await database.command({"explain": plain_command(command), "verbosity": "executionStats"})
+        examined += docs_examined(explain)
+        if not budget.collection_scan:
+            assert not uses_collection_scan(explain), f"Collection scan for {plain_command(command)}"
+    assert examined <= budget.max_docs_examined
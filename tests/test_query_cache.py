@@ -0,0 +1,216 @@
+import asyncio
+import pytest
+from datetime import datetime
+from bson import ObjectId
+from app.cache.backends import InProcessCacheBackend
+from app.cache.lru import LRUCache
+from app.cache.query_cache import EntityCache, QueryCache
+from app.cache.tiered import TieredCache
+
+
+class TestLRUCache:
+    """Test the size-bounded LRU cache"""
+
+    def test_evicts_least_recently_used(self):
+        """Test eviction beyond max_entries"""
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        assert len(cache) == 2
+
+    def test_ttl_expiry(self, monkeypatch):
+        """Test that entries expire after their TTL"""
+        now = [1000.0]
+        monkeypatch.setattr("app.cache.lru.time.monotonic", lambda: now[0])
+        cache = LRUCache(max_entries=10, ttl_seconds=5)
+        cache.set("a", 1)
+
+        now[0] += 4
+        assert cache.get("a") == 1
+        now[0] += 2
+        assert cache.get("a") is None
+
+
+class TestQueryCache:
+    """Test query result caching with generation-based invalidation"""
+
+    @pytest.mark.asyncio
+    async def test_key_normalization(self):
+        """Test that equivalent filters share a key and different ones do not"""
+        cache = QueryCache(TieredCache())
+        object_id = ObjectId()
+
+        key = await cache.make_key("products", {"category": "Books", "is_active": True}, skip=0, limit=10)
+
+        assert key == await cache.make_key("products", {"is_active": True, "category": "Books"}, skip=0, limit=10)
+        assert key != await cache.make_key("products", {"category": "Books", "is_active": True}, skip=10, limit=10)
+        assert key != await cache.make_key("brand", {"category": "Books", "is_active": True}, skip=0, limit=10)
+        assert await cache.make_key("products", {"_id": object_id}) != await cache.make_key("products", {"_id": str(object_id)})
+
+    @pytest.mark.asyncio
+    async def test_write_invalidates_collection(self):
+        """Test that bumping a generation hides cached results of that collection only"""
+        cache = QueryCache(TieredCache())
+        await cache.set(await cache.make_key("products", {"category": "Books"}), [{"name": "Book"}])
+        await cache.set(await cache.make_key("users", {}), [{"username": "user"}])
+
+        await cache.invalidate("products")
+
+        assert await cache.get(await cache.make_key("products", {"category": "Books"})) is None
+        assert await cache.get(await cache.make_key("users", {})) == [{"username": "user"}]
+
+    @pytest.mark.asyncio
+    async def test_cached_lists_are_copies(self):
+        """Test that callers cannot change a cached result list"""
+        cache = QueryCache(TieredCache())
+        key = await cache.make_key("products", {})
+        await cache.set(key, [{"name": "Book"}])
+
+        (await cache.get(key)).append({"name": "Other"})
+
+        assert await cache.get(key) == [{"name": "Book"}]
+
+
+class TestTieredCache:
+    """Test the L1/L2 cache against the in-process Redis stand-in"""
+
+    @pytest.fixture(autouse=True)
+    def setup_workers(self):
+        """Setup two workers sharing one backend"""
+        self.backend = InProcessCacheBackend()
+        self.worker_a = TieredCache(retry_seconds=0.01)
+        self.worker_b = TieredCache(retry_seconds=0.01)
+
+    async def start_workers(self):
+        await self.worker_a.start(self.backend)
+        await self.worker_b.start(self.backend)
+        await asyncio.sleep(0)
+
+    async def stop_workers(self):
+        await self.worker_a.close()
+        await self.worker_b.close()
+
+    @pytest.mark.asyncio
+    async def test_l2_shares_hits_between_workers(self):
+        """Test that a value cached by one worker is served to another"""
+        await self.start_workers()
+        document = {"_id": ObjectId(), "name": "Book", "created_at": datetime(2024, 1, 1)}
+
+        await self.worker_a.set("document:products:1", document)
+
+        assert await self.worker_b.get("document:products:1") == document
+        await self.stop_workers()
+
+    @pytest.mark.asyncio
+    async def test_invalidation_reaches_other_workers(self):
+        """Test that pub/sub invalidation drops other workers' L1 entries"""
+        await self.start_workers()
+        await self.worker_a.set("document:products:1", {"name": "Book"})
+        assert await self.worker_b.get("document:products:1") == {"name": "Book"}
+
+        await self.worker_a.invalidate("document:products:1")
+        await asyncio.sleep(0.01)
+
+        assert self.worker_b.l1.get("document:products:1") is None
+        assert await self.worker_b.get("document:products:1") is None
+        await self.stop_workers()
+
+    @pytest.mark.asyncio
+    async def test_generations_are_shared(self):
+        """Test that generation bumps propagate and notify listeners"""
+        notified = []
+        self.worker_b.add_generation_listener(lambda name, generation: notified.append((name, generation)))
+        await self.start_workers()
+
+        await self.worker_a.bump_generation("brand")
+        await asyncio.sleep(0.01)
+
+        assert await self.worker_b.get_generation("brand") == 1
+        assert notified == [("brand", 1)]
+        await self.stop_workers()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_l1_when_l2_is_down(self):
+        """Test that an unavailable backend degrades to the in-process tier"""
+        await self.start_workers()
+        self.backend.available = False
+
+        await self.worker_a.set("key", {"value": 1})
+        generation = await self.worker_a.bump_generation("products")
+
+        assert await self.worker_a.get("key") == {"value": 1}
+        assert generation == 1
+        assert not self.worker_a.l2_available
+        await self.stop_workers()
+
+
+class TestEntityCache:
+    """Test that reads racing a write never cache the document they read before it"""
+
+    @pytest.fixture(autouse=True)
+    def setup_workers(self):
+        """Setup entity caches of two workers sharing one backend"""
+        self.backend = InProcessCacheBackend()
+        self.worker_a = TieredCache()
+        self.worker_b = TieredCache()
+        self.entities_a = EntityCache(self.worker_a)
+        self.entities_b = EntityCache(self.worker_b)
+        self.document_id = str(ObjectId())
+        self.fetched = asyncio.Event()
+        self.resume = asyncio.Event()
+
+    async def fetch_old_version(self):
+        """Read the document, then stall like a slow round trip would before it is cached"""
+        document = {"_id": ObjectId(self.document_id), "name": "Old"}
+        self.fetched.set()
+        await self.resume.wait()
+        return document
+
+    async def read_during(self, entities: EntityCache, write):
+        read = asyncio.create_task(entities.load("products", self.document_id, self.fetch_old_version))
+        await self.fetched.wait()
+        await write()
+        self.resume.set()
+        return await read
+
+    @pytest.mark.asyncio
+    async def test_read_is_not_cached_after_local_invalidation(self):
+        """Test that an invalidation in the same worker while a read is in flight skips caching it"""
+        document = await self.read_during(self.entities_a, lambda: self.entities_a.invalidate("products", self.document_id))
+
+        assert document["name"] == "Old"
+        assert await self.entities_a.get("products", self.document_id) is None
+        assert self.entities_a._reads == {}
+
+    @pytest.mark.asyncio
+    async def test_read_is_not_cached_after_another_workers_invalidation(self):
+        """Test that a pub/sub invalidation from another worker while a read is in flight skips caching it in L1 and L2"""
+        await self.worker_a.start(self.backend)
+        await self.worker_b.start(self.backend)
+        await asyncio.sleep(0)
+
+        async def write():
+            await self.entities_a.invalidate("products", self.document_id)
+            await asyncio.sleep(0.01)
+
+        await self.read_during(self.entities_b, write)
+
+        assert await self.entities_a.get("products", self.document_id) is None
+        assert await self.entities_b.get("products", self.document_id) is None
+        await self.worker_a.close()
+        await self.worker_b.close()
+
+    @pytest.mark.asyncio
+    async def test_uncontended_read_is_cached(self):
+        """Test that a read with no write in between is cached"""
+        self.resume.set()
+
+        await self.entities_a.load("products", self.document_id, self.fetch_old_version)
+
+        assert (await self.entities_a.get("products", self.document_id))["name"] == "Old"
@@ -0,0 +1,125 @@
+import asyncio
+import httpx
+import pytest
+from types import SimpleNamespace
+from app.config.settings import settings
+from app.main import app
+from app.monitoring.request_context import RequestStats, reset_current_request, set_current_request
+from app.monitoring.slow_queries import FileSlowQuerySink, SlowQueryRecorder, query_shape, slow_query_recorder
+
+EXPLAIN = {
+    "queryPlanner": {"winningPlan": {"stage": "PROJECTION_SIMPLE", "inputStage": {"stage": "COLLSCAN"}}},
+    "executionStats": {"nReturned": 2, "executionTimeMillis": 180, "totalKeysExamined": 0, "totalDocsExamined": 5000},
+}
+
+
+class ExplainDatabase:
+    """Answers explain commands the way MongoDB does for a collection scan"""
+
+    def __init__(self):
+        self.commands = []
+
+    async def command(self, command):
+        self.commands.append(command)
+        return EXPLAIN
+
+
+def run_command(recorder, request_id, command, duration_ms):
+    """Feed the listener the events the driver emits for one command"""
+    name = next(iter(command))
+    started = SimpleNamespace(
+        command_name=name,
+        command={**command, "$db": "test", "lsid": {"id": "session"}},
+        database_name="test",
+        connection_id=("localhost", 27017),
+        request_id=request_id
+    )
+    recorder.started(started)
+    recorder.succeeded(SimpleNamespace(connection_id=started.connection_id, request_id=request_id, duration_micros=duration_ms * 1000))
+
+
+async def drain(recorder, expected):
+    for _ in range(100):
+        if recorder.recorded >= expected:
+            return
+        await asyncio.sleep(0.01)
+
+
+class TestQueryShape:
+    """Test that shapes keep the query structure and drop its values"""
+
+    def test_values_are_redacted(self):
+        """Test that filter values, regexes and $in lists are replaced while operators and sort stay"""
+        shape = query_shape({
+            "find": "products",
+            "filter": {"$or": [{"name": {"$regex": "secret", "$options": "i"}}, {"category": "Books"}], "_id": {"$in": [1, 2, 3]}},
+            "sort": {"price": -1},
+            "limit": 10,
+        })
+
+        assert shape == {
+            "command": "find",
+            "collection": "products",
+            "filter": {"$or": [{"name": {"$regex": "?", "$options": "?"}}, {"category": "?"}], "_id": {"$in": ["?"]}},
+            "sort": {"price": -1},
+        }
+
+    def test_pipeline_and_update_shapes(self):
+        """Test that pipeline stages and update filters are shaped per command"""
+        pipeline = query_shape({"aggregate": "products", "pipeline": [{"$match": {"brand_id": "abc"}}, {"$sort": {"name": 1}}, {"$limit": 5}]})
+        update = query_shape({"update": "users", "updates": [{"q": {"username": "alice"}, "u": {"$set": {"is_active": False}}}]})
+
+        assert pipeline["pipeline"] == [{"$match": {"brand_id": "?"}}, {"$sort": {"name": 1}}, {"$limit": "?"}]
+        assert update == {"command": "update", "collection": "users", "filter": {"username": "?"}}
+
+
+class TestSlowQueryRecorder:
+    """Test recording, explaining and ranking slow commands"""
+
+    @pytest.mark.asyncio
+    async def test_slow_commands_are_recorded_with_route_and_explain(self, tmp_path):
+        """Test that only commands over the threshold are stored, and each shape is explained once per interval"""
+        recorder = SlowQueryRecorder()
+        database = ExplainDatabase()
+        await recorder.start(FileSlowQuerySink(str(tmp_path / "slow.jsonl")), database, threshold_ms=100)
+        stats = RequestStats("req-1", "GET", "/api/v1/products/category/Books")
+        stats.route = "/api/v1/products/category/{category}"
+        token = set_current_request(stats)
+        try:
+            run_command(recorder, 1, {"find": "products", "filter": {"category": "Books"}}, 250)
+            run_command(recorder, 2, {"find": "products", "filter": {"category": "Games"}}, 150)
+            run_command(recorder, 3, {"find": "products", "filter": {"_id": 1}}, 2)
+            run_command(recorder, 4, {"insert": "products", "documents": [{}]}, 500)
+            await drain(recorder, 2)
+        finally:
+            reset_current_request(token)
+            await recorder.stop()
+
+        [top] = await recorder.top()
+        assert (top["count"], top["total_ms"], top["max_ms"]) == (2, 400.0, 250.0)
+        assert top["shape"]["filter"] == {"category": "?"}
+        assert top["routes"] == ["GET /api/v1/products/category/{category}"]
+        assert top["explain"]["collection_scan"] and top["explain"]["docs_examined"] == 5000
+        [explained] = database.commands
+        assert explained == {"explain": {"find": "products", "filter": {"category": "Books"}}, "verbosity": "executionStats"}
+
+    @pytest.mark.asyncio
+    async def test_admin_endpoint_requires_token(self, tmp_path, monkeypatch):
+        """Test that the top shapes are listed only for the admin token, and hidden when none is set"""
+        await slow_query_recorder.start(FileSlowQuerySink(str(tmp_path / "slow.jsonl")), ExplainDatabase(), threshold_ms=50)
+        try:
+            run_command(slow_query_recorder, 1, {"count": "products", "query": {"brand_id": "abc"}}, 75)
+            await drain(slow_query_recorder, 1)
+
+            async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                hidden = await client.get("/admin/slow-queries")
+                monkeypatch.setattr(settings, "slow_query_admin_token", "secret")
+                forbidden = await client.get("/admin/slow-queries", headers={"X-Admin-Token": "wrong"})
+                listed = await client.get("/admin/slow-queries", headers={"X-Admin-Token": "secret"})
+        finally:
+            await slow_query_recorder.stop()
+
+        assert (hidden.status_code, forbidden.status_code, listed.status_code) == (404, 403, 200)
+        [shape] = listed.json()["shapes"]
+        assert shape["shape"] == {"command": "count", "collection": "products", "filter": {"brand_id": "?"}}
+        assert shape["routes"] == [] and shape["explain"]["stages"] == ["PROJECTION_SIMPLE", "COLLSCAN"]
@@ -0,0 +1,94 @@
+import json
+import httpx
+import pytest
+import pytest_asyncio
+from app.config.database import get_database
+from app.config.settings import settings
+from app.main import app
+from app.middleware.tracing_middleware import TracingMiddleware
+from app.monitoring.tracing import OTLPJsonExporter, parse_traceparent, tracer
+from app.repositories.memory import InMemoryDatabase
+from app.utils.security import create_access_token
+from tests.test_query_budget import USERNAME, seed
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest_asyncio.fixture
+async def traced_api(tmp_path, monkeypatch):
+    """The app behind the tracing middleware on a seeded in-memory database, exporting to a file"""
+    database = InMemoryDatabase()
+    ids = await seed(database)
+    monkeypatch.setattr(settings, "query_cache_enabled", False)
+    monkeypatch.setattr(settings, "entity_cache_enabled", False)
+
+    async def get_test_database():
+        return database
+
+    app.dependency_overrides[get_database] = get_test_database
+    path = tmp_path / "traces.jsonl"
+    tracer.configure(OTLPJsonExporter("test", str(path)), sample_rate=1.0)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': USERNAME})}"}
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=TracingMiddleware(app)), base_url="http://test", headers=headers)
+
+    def exported():
+        tracer.shutdown()
+        return [json.loads(line) for line in path.read_text().splitlines()]
+
+    try:
+        yield http, ids, exported
+    finally:
+        await http.aclose()
+        tracer.shutdown()
+        app.dependency_overrides.pop(get_database, None)
+
+
+def spans_of(trace):
+    return trace["resourceSpans"][0]["scopeSpans"][0]["spans"]
+
+
+@pytest.mark.asyncio
+async def test_request_spans_cover_every_layer(traced_api):
+    """Test that one trace continues the caller's traceparent and nests route, dependency, service and repository spans"""
+    http, ids, exported = traced_api
+
+    response = await http.get(f"/api/v1/products/{ids['product']}", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+
+    assert response.status_code == 200
+    assert response.headers["traceparent"].startswith(f"00-{TRACE_ID}-")
+    traces = exported()
+    assert len(traces) == 1
+    spans = {span["name"]: span for span in spans_of(traces[0])}
+    root = spans["GET /api/v1/products/{product_id}"]
+    handler = spans["handler /api/v1/products/{product_id}"]
+    assert {span["traceId"] for span in spans.values()} == {TRACE_ID}
+    assert root["parentSpanId"] == PARENT_ID and root["kind"] == 2
+    assert handler["parentSpanId"] == root["spanId"]
+    assert spans["get_current_user"]["parentSpanId"] == handler["spanId"]
+    assert spans["endpoint get_product"]["parentSpanId"] == handler["spanId"]
+    assert spans["ProductService.get_product_by_id"]["parentSpanId"] == spans["endpoint get_product"]["spanId"]
+    assert spans["BaseRepository.get_by_id"]["parentSpanId"] == spans["ProductService.get_product_by_id"]["spanId"]
+    assert spans["UserRepository.get_by_username"]["parentSpanId"] == spans["get_current_user"]["spanId"]
+    assert {"key": "http.status_code", "value": {"intValue": "200"}} in root["attributes"]
+
+
+@pytest.mark.asyncio
+async def test_unsampled_caller_and_sample_rate(traced_api):
+    """Test that a caller's unsampled flag and a zero sample rate both skip tracing"""
+    http, ids, exported = traced_api
+
+    unsampled = await http.get("/api/v1/brands/", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-00"})
+    tracer.sample_rate = 0.0
+    not_picked = await http.get("/api/v1/brands/")
+
+    assert "traceparent" not in unsampled.headers and "traceparent" not in not_picked.headers
+    assert exported() == []
+
+
+def test_parse_traceparent():
+    """Test W3C traceparent parsing"""
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID, True)
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00") == (TRACE_ID, PARENT_ID, False)
+    assert parse_traceparent(f"00-{'0' * 32}-{PARENT_ID}-01") is None
+    assert parse_traceparent("garbage") is None